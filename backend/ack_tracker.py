@@ -0,0 +1,142 @@
+import itertools
+import os
+import threading
+import time
+from config import Config
+
+# Upper bounds (ms) of the publish->ack latency histogram buckets
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with approximate percentiles"""
+
+    def __init__(self, bounds=LATENCY_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        index = 0
+        while index < len(self.bounds) and ms > self.bounds[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of samples"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return self.bounds[index] if index < len(self.bounds) else self.max
+        return self.max
+
+    def get_stats(self):
+        buckets = {f"le_{bound}": count for bound, count in zip(self.bounds, self.counts)}
+        buckets['le_inf'] = self.counts[-1]
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total / self.count, 2) if self.count else 0.0,
+            'p50_ms': self.percentile(0.5),
+            'p90_ms': self.percentile(0.9),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': round(self.max, 2),
+            'buckets': buckets
+        }
+
+class PendingCommand:
+    __slots__ = ('cid', 'sector', 'sensor', 'action', 'sent_at', 'acked', 'latency_ms', 'ack_status')
+
+    def __init__(self, cid, sector, sensor, action):
+        self.cid = cid
+        self.sector = sector
+        self.sensor = sensor
+        self.action = action
+        self.sent_at = time.monotonic()
+        self.acked = False
+        self.latency_ms = None
+        self.ack_status = None
+
+class AckTracker:
+    """Correlates control commands with acknowledgements from the ESP32 nodes"""
+
+    def __init__(self):
+        self.pending = {}
+        self.condition = threading.Condition()
+        self.histogram = LatencyHistogram()
+        # Process-unique prefix so ids don't collide across restarts
+        self.prefix = os.urandom(3).hex()
+        self.counter = itertools.count(1)
+        self.sent = 0
+        self.acked = 0
+        self.timeouts = 0
+        self.late_acks = 0
+
+    def next_cid(self):
+        return f"{self.prefix}-{next(self.counter)}"
+
+    def track(self, cid, sector, sensor, action):
+        command = PendingCommand(cid, sector, sensor, action)
+        with self.condition:
+            self.pending[cid] = command
+            self.sent += 1
+        return command
+
+    def discard(self, cid):
+        with self.condition:
+            if self.pending.pop(cid, None) is not None:
+                self.sent -= 1
+
+    def acknowledge(self, cid, status='ok'):
+        """Record an ack for cid; returns False for unknown or expired ids"""
+        # Other backend processes share the ack topic; their ids are not ours to count
+        if not str(cid).startswith(f"{self.prefix}-"):
+            return False
+        now = time.monotonic()
+        with self.condition:
+            command = self.pending.pop(cid, None)
+            if command is None:
+                self.late_acks += 1
+                return False
+            command.acked = True
+            command.ack_status = status
+            command.latency_ms = (now - command.sent_at) * 1000
+            self.acked += 1
+            self.histogram.add(command.latency_ms)
+            self.condition.notify_all()
+        return True
+
+    def wait(self, commands, timeout=None):
+        """Wait until every command is acked or the timeout passes, then expire the rest"""
+        if timeout is None:
+            timeout = Config.MQTT_ACK_TIMEOUT
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while not all(command.acked for command in commands):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            for command in commands:
+                if not command.acked and self.pending.pop(command.cid, None) is not None:
+                    self.timeouts += 1
+        return commands
+
+    def get_stats(self):
+        with self.condition:
+            return {
+                'sent': self.sent,
+                'acked': self.acked,
+                'timeouts': self.timeouts,
+                'late_acks': self.late_acks,
+                'pending': len(self.pending),
+                'latency': self.histogram.get_stats()
+            }
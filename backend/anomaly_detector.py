@@ -0,0 +1,291 @@
+import logging
+import math
+import threading
+import time
+from array import array
+from config import Config
+from metrics import REGISTRY
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Per-sensor state: (attribute, initial value, dtype). A NaN last value never
+# equals a reading, so a new sensor's first value counts as a change.
+STATE_ARRAYS = (
+    ('count', 0.0, 'float64'),
+    ('mean', 0.0, 'float64'),
+    ('m2', 0.0, 'float64'),
+    ('last', float('nan'), 'float64'),
+    ('run_length', 0, 'int64'),
+    ('last_spike_alert', float('-inf'), 'float64'),
+    ('last_stuck_alert', float('-inf'), 'float64')
+)
+
+SCORE_SECONDS = REGISTRY.histogram('smartcam_anomaly_score_seconds', 'Time to score one batch of sensor readings')
+
+class AnomalyDetector:
+    """Streaming spike and stuck-sensor detection over every sensor, scored a batch at a time.
+
+    Ingest workers queue readings; every interval the whole batch is scored in
+    a few NumPy passes. Each sensor keeps count/mean/M2 arrays that are merged
+    with the batch statistics (Chan's parallel form of Welford's update). The
+    count is capped at `window`, so old readings fade out as they would with
+    an EWMA and a sensor that moves to a new level stops alerting.
+    """
+
+    def __init__(self, on_anomaly=None, interval=None, window=None, threshold=None, stuck_readings=None):
+        self.on_anomaly = on_anomaly
+        self.interval = interval or Config.ANOMALY_INTERVAL
+        self.window = window or Config.ANOMALY_WINDOW
+        self.threshold = threshold or Config.ANOMALY_Z_THRESHOLD
+        self.stuck_readings = Config.ANOMALY_STUCK_READINGS if stuck_readings is None else stuck_readings
+        self.min_samples = Config.ANOMALY_MIN_SAMPLES
+        self.cooldown = Config.ANOMALY_ALERT_COOLDOWN
+        self.enabled = Config.ANOMALY_DETECTION and np is not None
+        if Config.ANOMALY_DETECTION and np is None:
+            logger.warning("numpy is not installed, sensor anomaly detection is disabled")
+
+        # (sector, sensor) -> slot in the state arrays
+        self.slots = {}
+        self.keys = []
+        self.pending_slots = array('q')
+        self.pending_values = array('d')
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+
+        # Per-slot state, only touched by the scoring thread
+        self.capacity = 0
+        if self.enabled:
+            self.ensure_capacity(64)
+
+        self.scored = 0
+        self.batches = 0
+        self.dropped = 0
+        self.spikes = 0
+        self.stuck = 0
+        self.score_time = 0.0
+
+    def ensure_capacity(self, size):
+        """Grow the per-slot state arrays to hold at least `size` sensors"""
+        if size <= self.capacity:
+            return
+        grow = max(size, self.capacity * 2) - self.capacity
+        for name, fill, dtype in STATE_ARRAYS:
+            current = getattr(self, name, None)
+            extra = np.full(grow, fill, dtype=dtype)
+            setattr(self, name, extra if current is None else np.concatenate([current, extra]))
+        self.capacity += grow
+
+    def add(self, sector, sensor, value):
+        """Queue a numeric reading for the next scoring pass (called on ingest workers)"""
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return False
+        # Convert before touching the queues, so a failed append can't leave slots and values out of step
+        try:
+            value = float(value)
+        except OverflowError:
+            return False
+        if not math.isfinite(value):
+            return False
+        key = (sector, sensor)
+        with self.lock:
+            if len(self.pending_values) >= Config.ANOMALY_MAX_PENDING:
+                self.dropped += 1
+                return False
+            slot = self.slots.get(key)
+            if slot is None:
+                slot = len(self.keys)
+                self.slots[key] = slot
+                self.keys.append(key)
+            self.pending_slots.append(slot)
+            self.pending_values.append(value)
+        return True
+
+    def score(self, now=None):
+        """Score and fold in every queued reading; returns the anomalies raised"""
+        with self.lock:
+            if not self.pending_values:
+                return []
+            slots, values = self.pending_slots, self.pending_values
+            self.pending_slots, self.pending_values = array('q'), array('d')
+            size = len(self.keys)
+            keys = self.keys
+        if now is None:
+            now = time.time()
+
+        start = time.perf_counter()
+        self.ensure_capacity(size)
+        idx = np.frombuffer(slots, dtype=np.int64)
+        x = np.frombuffer(values, dtype=np.float64)
+        finite = np.isfinite(x)
+        if not finite.all():
+            idx, x = idx[finite], x[finite]
+
+        # Score against the statistics from before this batch
+        count = self.count[idx]
+        mean = self.mean[idx]
+        std = np.sqrt(self.m2[idx] / np.maximum(count - 1, 1))
+        # Floor the deviation so a perfectly flat signal does not divide by zero
+        std = np.maximum(std, 1e-3 * np.abs(mean) + 1e-6)
+        z = np.abs(x - mean) / std
+        z[count < self.min_samples] = 0.0
+
+        # Merge each sensor's batch count/mean/M2 into its running state
+        batch_count = np.bincount(idx, minlength=size).astype(np.float64)
+        batch_sum = np.bincount(idx, weights=x, minlength=size)
+        touched = np.flatnonzero(batch_count)
+        batch_mean = batch_sum / np.maximum(batch_count, 1)
+        deviation = x - batch_mean[idx]
+        batch_m2 = np.bincount(idx, weights=deviation * deviation, minlength=size)[touched]
+
+        n_a = self.count[touched]
+        n_b = batch_count[touched]
+        total = n_a + n_b
+        delta = batch_mean[touched] - self.mean[touched]
+        self.mean[touched] += delta * n_b / total
+        m2 = self.m2[touched] + batch_m2 + delta * delta * n_a * n_b / total
+        # Scaling count and M2 together caps the memory without changing the variance
+        scale = np.minimum(1.0, self.window / total)
+        self.count[touched] = total * scale
+        self.m2[touched] = m2 * scale
+
+        anomalies = self.find_spikes(idx, x, z, mean, std, keys, now)
+        if self.stuck_readings:
+            anomalies += self.find_stuck(idx, x, keys, now)
+
+        elapsed = time.perf_counter() - start
+        SCORE_SECONDS.observe(elapsed)
+        self.scored += len(x)
+        self.batches += 1
+        self.score_time += elapsed
+
+        if anomalies and self.on_anomaly:
+            try:
+                self.on_anomaly(anomalies)
+            except Exception as e:
+                logger.error(f"Error handling sensor anomalies: {e}")
+        return anomalies
+
+    def claim_alerts(self, slots, now, last_alert):
+        """Return the slots whose alert cooldown has expired and start a new cooldown for them"""
+        ready = slots[now - last_alert[slots] >= self.cooldown]
+        last_alert[ready] = now
+        return ready
+
+    def find_spikes(self, idx, x, z, mean, std, keys, now):
+        flagged = np.flatnonzero(z > self.threshold)
+        if not len(flagged):
+            return []
+        # Strongest reading per sensor
+        flagged = flagged[np.argsort(-z[flagged], kind='stable')]
+        _, first = np.unique(idx[flagged], return_index=True)
+        chosen = flagged[first]
+        ready = set(self.claim_alerts(idx[chosen], now, self.last_spike_alert).tolist())
+        self.spikes += len(ready)
+
+        anomalies = []
+        for i in chosen.tolist():
+            slot = int(idx[i])
+            if slot not in ready:
+                continue
+            sector, sensor = keys[slot]
+            anomalies.append({
+                'kind': 'spike',
+                'sector': sector,
+                'sensor': sensor,
+                'value': float(x[i]),
+                'mean': round(float(mean[i]), 3),
+                'std': round(float(std[i]), 3),
+                'z': round(float(z[i]), 1)
+            })
+        return anomalies
+
+    def find_stuck(self, idx, x, keys, now):
+        """Track how many identical readings each sensor has sent in a row"""
+        order = np.argsort(idx, kind='stable')
+        sorted_idx = idx[order]
+        sorted_x = x[order]
+        positions = np.arange(len(sorted_x))
+
+        group_start = np.ones(len(sorted_x), dtype=bool)
+        group_start[1:] = sorted_idx[1:] != sorted_idx[:-1]
+        previous = np.empty_like(sorted_x)
+        previous[1:] = sorted_x[:-1]
+        previous[group_start] = self.last[sorted_idx[group_start]]
+        changed = sorted_x != previous
+
+        # Position of the last change per sensor, or -1 if the whole batch repeated the old value
+        last_change = np.full(self.capacity, -1, dtype=np.int64)
+        np.maximum.at(last_change, sorted_idx[changed], positions[changed])
+        group_end = np.flatnonzero(np.append(group_start[1:], True))
+        ends_idx = sorted_idx[group_end]
+        first_pos = np.flatnonzero(group_start)
+
+        before = self.run_length[ends_idx]
+        changed_at = last_change[ends_idx]
+        run_length = np.where(changed_at >= 0, group_end - changed_at + 1, before + group_end - first_pos + 1)
+        self.run_length[ends_idx] = run_length
+        self.last[ends_idx] = sorted_x[group_end]
+
+        # A sensor that never varied (a switch left off) is not stuck, only one that stopped varying
+        crossed = ends_idx[(run_length >= self.stuck_readings) & (before < self.stuck_readings) & (self.m2[ends_idx] > 0)]
+        if not len(crossed):
+            return []
+        ready = self.claim_alerts(crossed, now, self.last_stuck_alert)
+        self.stuck += len(ready)
+
+        anomalies = []
+        for slot in ready.tolist():
+            sector, sensor = keys[slot]
+            anomalies.append({
+                'kind': 'stuck',
+                'sector': sector,
+                'sensor': sensor,
+                'value': float(self.last[slot]),
+                'readings': int(self.run_length[slot])
+            })
+        return anomalies
+
+    def run(self):
+        """Scoring loop, one pass per interval"""
+        while self.running:
+            time.sleep(self.interval)
+            try:
+                self.score()
+            except Exception as e:
+                logger.error(f"Error scoring sensor readings: {e}")
+
+    def start(self):
+        if self.running or not self.enabled:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        logger.info(f"Sensor anomaly detector started ({int(self.interval * 1000)} ms batches, "
+                    f"z > {self.threshold}, stuck after {self.stuck_readings} readings)")
+
+    def stop(self):
+        self.running = False
+
+    def get_stats(self):
+        """Return detector counters and scoring cost"""
+        with self.lock:
+            pending = len(self.pending_values)
+            sensors = len(self.keys)
+        return {
+            'enabled': self.enabled,
+            'sensors': sensors,
+            'pending': pending,
+            'scored': self.scored,
+            'batches': self.batches,
+            'dropped': self.dropped,
+            'spikes': self.spikes,
+            'stuck': self.stuck,
+            'avg_us_per_reading': round(self.score_time / self.scored * 1e6, 3) if self.scored else 0.0
+        }
@@ -1,22 +1,32 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO, emit, join_room, leave_room
+import hmac
 import logging
+import math
 import threading
 import time
 from datetime import datetime
+from urllib.parse import unquote_plus
 
 from config import Config
 from mqtt_handler import MQTTHandler
 from system_monitor import SystemMonitor
 from security_monitor import SecurityMonitor
 from email_alerts import EmailAlerts
+from response_cache import ResponseCache
+from shared_state import open_sensor_table
+from message_hub import create_client_manager
+from metrics import REGISTRY, SOCKET_EMITS, timed_event
+from profiler import SamplingProfiler
+from subscriptions import SubscriptionRegistry, EVENT_ROOMS
+from change_journal import ChangeJournal, group_changes
+from ingest_service import IngestService, IngestClient
 
 # Initialize Flask app
 app = Flask(__name__)
 app.config['SECRET_KEY'] = Config.SECRET_KEY
 CORS(app, resources={r"/*": {"origins": "*"}})
-<<<<<<< HEAD
 socketio = SocketIO(
     app,
     cors_allowed_origins="*",
@@ -24,17 +34,108 @@ socketio = SocketIO(
     ping_timeout=60,
     ping_interval=25,
     logger=True,
-    engineio_logger=True
+    engineio_logger=True,
+    client_manager=create_client_manager()
 )
-=======
-socketio = SocketIO(app, cors_allowed_origins="*")
->>>>>>> 4513f3dbe49a135911df4895bf01bc2e063e2c0f
 
 # Initialize handlers
-mqtt_handler = MQTTHandler(socketio=socketio)
+subscriptions = SubscriptionRegistry()
+# One sequence across sensor and security changes, so a client needs a single cursor
+journal = ChangeJournal()
+mqtt_handler = MQTTHandler(socketio=socketio, shared_table=open_sensor_table(), subscriptions=subscriptions,
+                           journal=journal)
 system_monitor = SystemMonitor(socketio=socketio)
-security_monitor = SecurityMonitor(socketio=socketio)
 email_alerts = EmailAlerts()
+security_monitor = SecurityMonitor(socketio=socketio, email_alerts=email_alerts, journal=journal)
+response_cache = ResponseCache()
+profiler = SamplingProfiler()
+
+def log_sensor_anomalies(anomalies):
+    for anomaly in anomalies:
+        security_monitor.log_sensor_anomaly(anomaly)
+
+mqtt_handler.on_anomaly = log_sensor_anomalies
+
+def get_security_stats_data():
+    """(packet sample count, attack stats with packet rates); the count versions the cached response"""
+    stats = security_monitor.get_attack_stats()
+    stats['packet_rates'] = security_monitor.get_packet_rates()
+    return security_monitor.packet_samples, stats
+
+def send_daily_report():
+    system_stats = system_monitor.get_all_stats()
+    report_data = {
+        **security_monitor.get_attack_stats(),
+        'avg_cpu': system_stats['cpu'],
+        'avg_memory': system_stats['memory'],
+        'max_temp': system_stats['temperature'],
+        'blocked_ips': len(security_monitor.blocked_ips)
+    }
+    return email_alerts.send_daily_report(report_data)
+
+# State only the process that ingests MQTT holds; workers ask the ingest process for it.
+# In multi-process mode that is also the MQTT connection, the samplers and the security state.
+INGEST_QUERIES = {
+    'sensor_history': mqtt_handler.get_sensor_history,
+    'history_stats': mqtt_handler.history.get_stats,
+    'anomaly_stats': mqtt_handler.anomalies.get_stats,
+    'node_health': mqtt_handler.get_node_health,
+    'emit_stats': mqtt_handler.emitter.get_stats,
+    'ingest_stats': mqtt_handler.get_ingest_stats,
+    'sync_stats': journal.get_stats,
+    'mqtt_connected': lambda: mqtt_handler.is_connected,
+    'control_sensor': mqtt_handler.control_sensor,
+    'control_sensors': mqtt_handler.control_sensors,
+    'control_stats': mqtt_handler.get_control_stats,
+    'system_stats': system_monitor.get_all_stats,
+    'security_stats': get_security_stats_data,
+    'arp_stats': security_monitor.arp_watcher.get_stats,
+    'log_attack': security_monitor.log_attack,
+    'count_failed_login': security_monitor.count_failed_login,
+    'block_ips': security_monitor.block_ips,
+    'unblock_ips': security_monitor.unblock_ips,
+    'blocked_ips': lambda: sorted(security_monitor.blocked_ips),
+    'firewall_stats': security_monitor.get_firewall_stats,
+    'email_stats': email_alerts.get_outbox_stats,
+    'email_toggle': email_alerts.toggle_alerts,
+    'send_report': send_daily_report
+}
+# Changes to ingest-owned state; a worker that can't reach the ingest process must not apply them locally
+INGEST_COMMANDS = {'control_sensor', 'control_sensors', 'log_attack', 'count_failed_login',
+                   'block_ips', 'unblock_ips', 'email_toggle', 'send_report'}
+ingest_service = IngestService(INGEST_QUERIES) if Config.PROCESS_ROLE == 'ingest' else None
+ingest_client = IngestClient(timeouts={
+    'block_ips': Config.FIREWALL_WAIT_TIMEOUT + Config.INGEST_QUERY_TIMEOUT,
+    'unblock_ips': Config.FIREWALL_WAIT_TIMEOUT + Config.INGEST_QUERY_TIMEOUT,
+    'control_sensors': Config.MQTT_ACK_TIMEOUT_MAX + Config.INGEST_QUERY_TIMEOUT
+}) if Config.PROCESS_ROLE == 'worker' else None
+
+def query_ingest(name, *args):
+    """Answer an INGEST_QUERIES query here, or in the ingest process when this is a worker"""
+    if ingest_client is not None:
+        try:
+            return ingest_client.call(name, *args)
+        except OSError as e:
+            if name in INGEST_COMMANDS:
+                raise
+            logger.warning(f"{e}; answering from this worker's own state")
+    return INGEST_QUERIES[name](*args)
+
+if ingest_client is not None:
+    # Attacks a worker detects (payload inspection) are logged, emitted and emailed by the ingest process
+    security_monitor.forward_attack = lambda alert: ingest_client.call('log_attack', alert)
+
+# Scrape-time metrics from each component
+for component in (mqtt_handler, system_monitor, security_monitor, email_alerts, response_cache):
+    REGISTRY.add_collector(component.collect_metrics)
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram('smartcam_http_request_duration_seconds',
+                                          'Flask request handling time', ('endpoint', 'method'))
+HTTP_REQUEST_CPU_SECONDS = REGISTRY.histogram('smartcam_http_request_cpu_seconds',
+                                              'Flask request CPU time', ('endpoint', 'method'))
+HTTP_REQUESTS = REGISTRY.counter('smartcam_http_requests_total', 'Flask requests by status',
+                                 ('endpoint', 'method', 'status'))
+SYSTEM_STATS_EMITS = SOCKET_EMITS.labels('system_stats')
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -47,11 +148,11 @@ def background_monitoring():
         try:
             # Get system stats
             stats = system_monitor.get_all_stats()
-            socketio.emit('system_stats', stats)
+            socketio.emit('system_stats', stats, to=EVENT_ROOMS['system'])
+            SYSTEM_STATS_EMITS.inc()
             
-            # Check for attacks (simulated)
-            if stats['connections'] > 100:
-                security_monitor.detect_dos_attack(stats['connections'])
+            # Check for attacks
+            security_monitor.detect_dos_attack(stats['connection_summary'])
             
             # Send warnings if any
             if stats.get('warnings'):
@@ -64,6 +165,82 @@ def background_monitoring():
             logger.error(f"Error in background monitoring: {e}")
             time.sleep(5)
 
+# Request timing (hooks are only registered when Config.ROUTE_TIMING is on)
+
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.request_cpu_started = time.thread_time()
+
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is not None:
+        endpoint = request.endpoint or 'unmatched'
+        HTTP_REQUEST_CPU_SECONDS.labels(endpoint, request.method).observe(time.thread_time() - g.request_cpu_started)
+        HTTP_REQUEST_SECONDS.labels(endpoint, request.method).observe(time.perf_counter() - started)
+        HTTP_REQUESTS.labels(endpoint, request.method, response.status_code).inc()
+    return response
+
+if Config.ROUTE_TIMING:
+    app.before_request(start_request_timer)
+    app.after_request(record_request_metrics)
+
+# Request inspection
+
+@app.before_request
+def inspect_request():
+    """Scan query strings and JSON bodies for injection signatures"""
+    body = request.get_data(cache=True, as_text=True) if request.is_json else ''
+    query = unquote_plus(request.query_string.decode('utf-8', 'replace'))
+    
+    if security_monitor.detect_sql_injection(query, body, source=request.remote_addr or 'Input Validation'):
+        if Config.PAYLOAD_INSPECTION_BLOCK:
+            return jsonify({'success': False, 'error': 'Request blocked by payload inspection'}), 403
+
+# Reconnect delta sync
+
+def build_sync(since=None, epoch=None, sid=None):
+    """Changes after a client's (epoch, seq) cursor, or a full snapshot when the journal can't answer"""
+    # Worker processes only see the shared sensor table, which has no per-change history
+    if since is not None:
+        try:
+            since = int(since)
+        except (TypeError, ValueError, OverflowError):
+            # A malformed cursor from the client gets a snapshot, like one the journal no longer covers
+            since = None
+    result = journal.since(since, epoch) if mqtt_handler.ingest else None
+    if result is None:
+        # Read the seq first: changes racing the snapshot are simply sent again in the next delta
+        seq = journal.seq
+        payload = {
+            'full': True,
+            'sensors': mqtt_handler.get_sensor_data(),
+            'blocked_ips': query_ingest('blocked_ips'),
+            'attacks': security_monitor.get_attack_log(limit=Config.SYNC_SNAPSHOT_ATTACKS)
+        }
+    else:
+        seq, changes = result
+        payload = group_changes(changes)
+    
+    if sid is not None:
+        payload['sensors'] = subscriptions.filter_sensor_data(sid, payload['sensors'])
+    payload['epoch'] = journal.epoch
+    payload['seq'] = seq
+    return payload
+
+# Conditional responses
+
+def cached_json(key, version, build):
+    """Serve build() as JSON, reusing the encoded body and answering 304 while the version is unchanged"""
+    etag, body = response_cache.get(key, version, build)
+    if request.if_none_match.contains(etag):
+        response_cache.count_not_modified()
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 # API Routes
 
 @app.route('/')
@@ -72,14 +249,14 @@ def index():
         'status': 'online',
         'message': 'Smart Campus Backend API',
         'version': '1.0',
-        'mqtt_connected': mqtt_handler.is_connected
+        'mqtt_connected': query_ingest('mqtt_connected')
     })
 
 @app.route('/api/sensors', methods=['GET'])
 def get_sensors():
     """Get all sensor data"""
     try:
-        return jsonify({
+        return cached_json('sensors', mqtt_handler.get_sensor_version(), lambda: {
             'success': True,
             'data': mqtt_handler.get_sensor_data()
         })
@@ -87,6 +264,100 @@ def get_sensors():
         logger.error(f"Error getting sensors: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/sensors/history', methods=['GET'])
+def get_sensor_history():
+    """Get min/max/avg sensor history buckets for a time range"""
+    try:
+        sector = request.args.get('sector')
+        sensor = request.args.get('sensor')
+        start = request.args.get('start', type=float)
+        end = request.args.get('end', type=float)
+        resolution = request.args.get('resolution', type=int)
+        if any(value is not None and not math.isfinite(value) for value in (start, end)):
+            return jsonify({'success': False, 'error': 'start and end must be finite timestamps'}), 400
+        if start is not None and end is not None and end < start:
+            return jsonify({'success': False, 'error': 'end must not be before start'}), 400
+        
+        return jsonify({
+            'success': True,
+            'data': query_ingest('sensor_history', sector, sensor, start, end, resolution),
+            'stats': query_ingest('history_stats')
+        })
+    except Exception as e:
+        logger.error(f"Error getting sensor history: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/sync', methods=['GET'])
+def get_sync():
+    """Get changes since ?since=<seq>&epoch=<epoch>, or a full snapshot"""
+    try:
+        since = request.args.get('since', type=int)
+        epoch = request.args.get('epoch')
+        return jsonify({'success': True, 'data': build_sync(since, epoch)})
+    except Exception as e:
+        logger.error(f"Error building sync: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/sync/stats', methods=['GET'])
+def get_sync_stats():
+    """Get change journal statistics"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': query_ingest('sync_stats')
+        })
+    except Exception as e:
+        logger.error(f"Error getting sync stats: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/sensors/anomaly-stats', methods=['GET'])
+def get_anomaly_stats():
+    """Get sensor anomaly detector statistics"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': query_ingest('anomaly_stats')
+        })
+    except Exception as e:
+        logger.error(f"Error getting anomaly stats: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/nodes/health', methods=['GET'])
+def get_node_health():
+    """Get ESP32 node liveness and per-sensor last-seen ages, optionally for one sector"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': query_ingest('node_health', request.args.get('sector'))
+        })
+    except Exception as e:
+        logger.error(f"Error getting node health: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/sensors/emit-stats', methods=['GET'])
+def get_emit_stats():
+    """Get sensor_batch fan-out statistics"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': query_ingest('emit_stats')
+        })
+    except Exception as e:
+        logger.error(f"Error getting emit stats: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/mqtt/stats', methods=['GET'])
+def get_mqtt_stats():
+    """Get MQTT ingest pipeline metrics"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': query_ingest('ingest_stats')
+        })
+    except Exception as e:
+        logger.error(f"Error getting MQTT stats: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/sensors/control', methods=['POST'])
 def control_sensor():
     """Control a sensor"""
@@ -96,7 +367,7 @@ def control_sensor():
         sensor = data.get('sensor')
         action = data.get('action')
         
-        success = mqtt_handler.control_sensor(sector, sensor, action)
+        success = query_ingest('control_sensor', sector, sensor, action)
         
         return jsonify({
             'success': success,
@@ -106,11 +377,54 @@ def control_sensor():
         logger.error(f"Error controlling sensor: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/sensors/control/bulk', methods=['POST'])
+def control_sensors_bulk():
+    """Send a batch of sensor commands and report per-command ack status"""
+    try:
+        data = request.json
+        commands = data.get('commands', [])
+        qos = data.get('qos', Config.MQTT_CONTROL_QOS)
+        
+        if qos not in (0, 1, 2):
+            return jsonify({'success': False, 'error': f"Invalid QoS: {qos}"}), 400
+        try:
+            timeout = float(data.get('timeout', Config.MQTT_ACK_TIMEOUT))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'timeout must be a number of seconds'}), 400
+        if not math.isfinite(timeout):
+            return jsonify({'success': False, 'error': 'timeout must be finite'}), 400
+        timeout = min(max(timeout, Config.MQTT_ACK_TIMEOUT_MIN), Config.MQTT_ACK_TIMEOUT_MAX)
+        
+        results = query_ingest('control_sensors', commands, qos, timeout)
+        acked = sum(1 for result in results if result['status'] == 'acked')
+        
+        return jsonify({
+            'success': acked == len(results),
+            'acked': acked,
+            'total': len(results),
+            'results': results
+        })
+    except Exception as e:
+        logger.error(f"Error sending bulk sensor control: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/sensors/control/latency', methods=['GET'])
+def get_control_latency():
+    """Get publish-to-ack latency distribution for sensor commands"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': query_ingest('control_stats')
+        })
+    except Exception as e:
+        logger.error(f"Error getting control latency: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/system/stats', methods=['GET'])
 def get_system_stats():
     """Get system statistics"""
     try:
-        stats = system_monitor.get_all_stats()
+        stats = query_ingest('system_stats')
         return jsonify({
             'success': True,
             'data': stats
@@ -121,13 +435,27 @@ def get_system_stats():
 
 @app.route('/api/security/attacks', methods=['GET'])
 def get_attacks():
-    """Get attack log"""
+    """Get attack log, newest first, paginated with ?before=<id cursor>"""
     try:
-        attacks = security_monitor.get_attack_log()
-        return jsonify({
-            'success': True,
-            'data': attacks
-        })
+        limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+        
+        def build():
+            attacks = security_monitor.get_attack_log(
+                limit=limit,
+                before=request.args.get('before', type=int),
+                category=request.args.get('category'),
+                source=request.args.get('source'),
+                since=request.args.get('since', type=float)
+            )
+            return {
+                'success': True,
+                'data': attacks,
+                'next_cursor': attacks[-1]['id'] if len(attacks) == limit else None
+            }
+        
+        key = 'attacks?' + request.query_string.decode('utf-8', 'replace')
+        # The attack log is shared through SQLite, so attacks logged by any process change the version
+        return cached_json(key, security_monitor.get_attack_version(), build)
     except Exception as e:
         logger.error(f"Error getting attacks: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -136,13 +464,94 @@ def get_attacks():
 def get_security_stats():
     """Get attack statistics"""
     try:
-        stats = security_monitor.get_attack_stats()
+        samples, stats = query_ingest('security_stats')
+        
+        # Packet rates move with every sampler tick, not just on attacks
+        version = (security_monitor.get_attack_version(), samples)
+        return cached_json('security_stats', version, lambda: {'success': True, 'data': stats})
+    except Exception as e:
+        logger.error(f"Error getting security stats: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition of every registered metric"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/admin/profile', methods=['POST'])
+def run_profile():
+    """Sample every thread for ?seconds=N and return collapsed stacks for flamegraph.pl or speedscope"""
+    try:
+        if not Config.PROFILER_TOKEN:
+            return jsonify({'success': False, 'error': 'Profiling is disabled (PROFILER_TOKEN is not set)'}), 404
+        token = request.headers.get('X-Profiler-Token', '')
+        if not hmac.compare_digest(token.encode(), Config.PROFILER_TOKEN.encode()):
+            return jsonify({'success': False, 'error': 'Invalid profiler token'}), 403
+        
+        seconds = request.args.get('seconds', 10, type=float)
+        result = profiler.profile(seconds)
+        if result is None:
+            return jsonify({'success': False, 'error': 'A profile is already running'}), 409
+        
+        response = Response(SamplingProfiler.format_collapsed(result['stacks']), mimetype='text/plain')
+        response.headers['X-Profile-Samples'] = str(result['samples'])
+        response.headers['X-Profile-Duration'] = str(result['duration'])
+        response.headers['X-Profile-Overhead'] = str(result['overhead'])
+        return response
+    except Exception as e:
+        logger.error(f"Error running profiler: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Get response cache hit and 304 counters"""
+    try:
         return jsonify({
             'success': True,
-            'data': stats
+            'data': response_cache.get_stats()
         })
     except Exception as e:
-        logger.error(f"Error getting security stats: {e}")
+        logger.error(f"Error getting cache stats: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/security/inspection-stats', methods=['GET'])
+def get_inspection_stats():
+    """Get request payload inspection statistics"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': security_monitor.get_inspection_stats()
+        })
+    except Exception as e:
+        logger.error(f"Error getting inspection stats: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/security/arp-stats', methods=['GET'])
+def get_arp_stats():
+    """Get ARP watcher statistics and the MACs currently claiming several IPs"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': query_ingest('arp_stats')
+        })
+    except Exception as e:
+        logger.error(f"Error getting ARP stats: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/security/failed-login', methods=['POST'])
+def report_failed_login():
+    """Report a failed login attempt from the calling address for brute force tracking"""
+    try:
+        # Only the connecting address counts; a client-supplied IP would let anyone get any host blocked
+        failures, detected = query_ingest('count_failed_login', request.remote_addr)
+        
+        return jsonify({
+            'success': True,
+            'brute_force': detected,
+            'failures': failures
+        })
+    except Exception as e:
+        logger.error(f"Error recording failed login: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/security/block-ip', methods=['POST'])
@@ -152,7 +561,7 @@ def block_ip():
         data = request.json
         ip = data.get('ip')
         
-        success = security_monitor.block_ip(ip)
+        success = ip in query_ingest('block_ips', [ip])
         
         return jsonify({
             'success': success,
@@ -162,6 +571,48 @@ def block_ip():
         logger.error(f"Error blocking IP: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/security/block-ips', methods=['POST'])
+def block_ips():
+    """Block or unblock many IP addresses in one firewall batch"""
+    try:
+        data = request.json
+        ips = data.get('ips', [])
+        action = data.get('action', 'block')
+        
+        if action not in ('block', 'unblock'):
+            return jsonify({'success': False, 'error': f"Unknown action: {action}"}), 400
+        
+        start = time.perf_counter()
+        if action == 'block':
+            applied = query_ingest('block_ips', ips)
+        else:
+            applied = query_ingest('unblock_ips', ips)
+        elapsed = time.perf_counter() - start
+        
+        applied_set = set(applied)
+        return jsonify({
+            'success': len(applied) > 0,
+            'applied': applied,
+            'skipped': [ip for ip in ips if ip not in applied_set],
+            'elapsed': round(elapsed, 3),
+            'ips_per_second': round(len(applied) / elapsed, 1) if elapsed > 0 else 0.0
+        })
+    except Exception as e:
+        logger.error(f"Error bulk blocking IPs: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/security/firewall-stats', methods=['GET'])
+def get_firewall_stats():
+    """Get firewall batching statistics"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': query_ingest('firewall_stats')
+        })
+    except Exception as e:
+        logger.error(f"Error getting firewall stats: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/security/unblock-ip', methods=['POST'])
 def unblock_ip():
     """Unblock an IP address"""
@@ -169,7 +620,7 @@ def unblock_ip():
         data = request.json
         ip = data.get('ip')
         
-        success = security_monitor.unblock_ip(ip)
+        success = ip in query_ingest('unblock_ips', [ip])
         
         return jsonify({
             'success': success,
@@ -212,24 +663,28 @@ def toggle_mitigation():
 def send_email_report():
     """Send email report"""
     try:
-        report_data = {
-            **security_monitor.get_attack_stats(),
-            'avg_cpu': system_monitor.get_cpu_usage(),
-            'avg_memory': system_monitor.get_memory_usage(),
-            'max_temp': system_monitor.get_temperature(),
-            'blocked_ips': len(security_monitor.blocked_ips)
-        }
-        
-        success = email_alerts.send_daily_report(report_data)
+        success = query_ingest('send_report')
         
         return jsonify({
             'success': success,
-            'message': "Email report sent" if success else "Failed to send email"
+            'message': "Email report queued" if success else "Failed to send email"
         })
     except Exception as e:
         logger.error(f"Error sending email: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/email/stats', methods=['GET'])
+def get_email_stats():
+    """Get email outbox statistics"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': query_ingest('email_stats')
+        })
+    except Exception as e:
+        logger.error(f"Error getting email stats: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/email/toggle', methods=['POST'])
 def toggle_email_alerts():
     """Toggle email alerts"""
@@ -237,7 +692,7 @@ def toggle_email_alerts():
         data = request.json
         enabled = data.get('enabled')
         
-        success = email_alerts.toggle_alerts(enabled)
+        success = query_ingest('email_toggle', enabled)
         
         return jsonify({
             'success': success,
@@ -250,35 +705,83 @@ def toggle_email_alerts():
 # SocketIO Events
 
 @socketio.on('connect')
+@timed_event('connect')
 def handle_connect():
     logger.info(f"Client connected: {request.sid}")
-    emit('connection_status', {'status': 'connected'})
+    # Everything until the client narrows it with a subscribe event
+    join, _, _ = subscriptions.subscribe(request.sid)
+    for room in join:
+        join_room(room)
+    # The journal cursor lets the client ask for a delta after a reconnect
+    emit('connection_status', {'status': 'connected', 'epoch': journal.epoch, 'seq': journal.seq})
 
 @socketio.on('disconnect')
+@timed_event('disconnect')
 def handle_disconnect():
     logger.info(f"Client disconnected: {request.sid}")
+    subscriptions.unsubscribe(request.sid)
+
+@socketio.on('subscribe')
+@timed_event('subscribe')
+def handle_subscribe(data=None):
+    """{"sectors": [...], "events": [...]}; an omitted key means all sectors or all event types"""
+    data = data or {}
+    join, leave, subscription = subscriptions.subscribe(request.sid, data.get('sectors'), data.get('events'))
+    for room in leave:
+        leave_room(room)
+    for room in join:
+        join_room(room)
+    emit('subscribed', subscription)
 
 @socketio.on('request_sensor_data')
+@timed_event('request_sensor_data')
 def handle_sensor_request():
-    data = mqtt_handler.get_sensor_data()
+    data = subscriptions.filter_sensor_data(request.sid, mqtt_handler.get_sensor_data())
     emit('sensor_data', data)
 
+@socketio.on('sync')
+@timed_event('sync')
+def handle_sync(data=None):
+    """{"since": seq, "epoch": epoch} from a reconnecting client; answered with a delta or a snapshot"""
+    if not isinstance(data, dict):
+        data = {}
+    emit('sync', build_sync(data.get('since'), data.get('epoch'), request.sid))
+
 @socketio.on('request_system_stats')
+@timed_event('request_system_stats')
 def handle_stats_request():
-    stats = system_monitor.get_all_stats()
+    stats = query_ingest('system_stats')
     emit('system_stats', stats)
 
 # Startup
-if __name__ == '__main__':
+def start_services():
+    """Start MQTT, the samplers and the background monitoring thread (not run in multi-process workers)"""
     # Connect MQTT
     mqtt_handler.connect()
     logger.info("MQTT handler started")
     
-    # Start background monitoring
+    # Start system stats sampler
+    system_monitor.start_sampler()
+    
+    # Start packet rate sampler
+    security_monitor.start_packet_sampler()
+    
+    # Let worker processes query ingest-only state
+    if ingest_service is not None:
+        ingest_service.start()
+    
+    # Start background monitoring and the ARP watcher
+    security_monitor.start_arp_watcher()
     monitor_thread = threading.Thread(target=background_monitoring, daemon=True)
     monitor_thread.start()
     logger.info("Background monitoring started")
+
+if __name__ == '__main__':
+    start_services()
     
     # Run Flask app
     logger.info(f"Starting Smart Campus Backend on {Config.FLASK_HOST}:{Config.FLASK_PORT}")
-    socketio.run(app, host=Config.FLASK_HOST, port=Config.FLASK_PORT, debug=Config.DEBUG)
\ No newline at end of file
+    # Werkzeug's threaded server is the deployed server here (multiprocess.py uses it too);
+    # without this flag socketio.run refuses to start it when FLASK_DEBUG is off
+    socketio.run(app, host=Config.FLASK_HOST, port=Config.FLASK_PORT, debug=Config.DEBUG,
+                 allow_unsafe_werkzeug=True)
@@ -0,0 +1,329 @@
+import logging
+import socket
+import struct
+import threading
+import time
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# /proc/net/arp flag for a resolved entry (ATF_COM)
+ATF_COMPLETE = 0x2
+EMPTY_MAC = '00:00:00:00:00:00'
+
+# rtnetlink constants from <linux/rtnetlink.h> and <linux/neighbour.h>
+RTMGRP_NEIGH = 0x4
+RTM_NEWNEIGH = 28
+RTM_DELNEIGH = 29
+NDA_DST = 1
+NDA_LLADDR = 2
+NUD_INCOMPLETE = 0x01
+NUD_FAILED = 0x20
+NLMSG_HEADER = struct.Struct('=IHHII')
+NDMSG = struct.Struct('=BxxxiHBB')
+RTATTR = struct.Struct('=HH')
+
+def parse_arp_table(text):
+    """Yield (ip, mac, device) for every resolved entry in /proc/net/arp text"""
+    lines = iter(text.splitlines())
+    next(lines, None)  # header
+    for line in lines:
+        # IP address, HW type, Flags, HW address, Mask, Device
+        fields = line.split()
+        if len(fields) < 6:
+            continue
+        try:
+            flags = int(fields[2], 16)
+        except ValueError:
+            continue
+        mac = fields[3].lower()
+        if flags & ATF_COMPLETE and mac != EMPTY_MAC:
+            yield fields[0], mac, fields[5]
+
+def parse_neighbour_messages(data):
+    """Yield (action, ip, mac, ifindex) for the IPv4 neighbour messages in a netlink datagram.
+
+    action is 'set' for a resolved entry and 'delete' for one that was
+    removed or failed; entries still being resolved are skipped.
+    """
+    offset = 0
+    while offset + NLMSG_HEADER.size <= len(data):
+        length, msg_type, _, _, _ = NLMSG_HEADER.unpack_from(data, offset)
+        if length < NLMSG_HEADER.size:
+            break
+        end = offset + length
+        body = offset + NLMSG_HEADER.size
+        if msg_type in (RTM_NEWNEIGH, RTM_DELNEIGH) and body + NDMSG.size <= end:
+            family, ifindex, state, _, _ = NDMSG.unpack_from(data, body)
+            ip = mac = None
+            attr = body + NDMSG.size
+            while attr + RTATTR.size <= end:
+                attr_length, attr_type = RTATTR.unpack_from(data, attr)
+                if attr_length < RTATTR.size:
+                    break
+                value = data[attr + RTATTR.size:attr + attr_length]
+                if attr_type == NDA_DST and len(value) == 4:
+                    ip = socket.inet_ntoa(value)
+                elif attr_type == NDA_LLADDR and len(value) == 6:
+                    mac = ':'.join(f"{byte:02x}" for byte in value)
+                attr += (attr_length + 3) & ~3
+            if family == socket.AF_INET and ip is not None:
+                if msg_type == RTM_DELNEIGH or state & NUD_FAILED:
+                    yield 'delete', ip, None, ifindex
+                elif mac is not None and mac != EMPTY_MAC and not state & NUD_INCOMPLETE:
+                    yield 'set', ip, mac, ifindex
+        offset += (length + 3) & ~3
+
+class ArpTable:
+    """(IP, interface)->MAC and MAC->entries indexes, updated one entry at a time.
+
+    Entries are kept per interface, since a multi-homed host legitimately
+    sees the same IP behind a different MAC on each of its links. Every
+    update reports what it changed: an IP whose MAC on that interface is
+    different from before (a poisoned cache or a replaced device), or a MAC
+    that now answers for more than one IP (the usual sign of a man in the
+    middle).
+    """
+
+    def __init__(self, shared_macs=None):
+        self.shared_macs = set(Config.ARP_SHARED_MACS if shared_macs is None else shared_macs)
+        self.ip_to_mac = {}
+        self.mac_to_entries = {}
+
+    def set(self, ip, mac, device=None):
+        """Record ip -> mac on device and return the findings the change raises"""
+        findings = []
+        key = (ip, device)
+        old = self.ip_to_mac.get(key)
+        if old == mac:
+            return findings
+        if old is not None:
+            self.unlink(key, old)
+            findings.append({'kind': 'mac_changed', 'ip': ip, 'old_mac': old, 'mac': mac, 'device': device})
+        self.ip_to_mac[key] = mac
+        entries = self.mac_to_entries.setdefault(mac, set())
+        entries.add(key)
+        ips = self.ips_for(mac)
+        if len(ips) > 1 and mac not in self.shared_macs:
+            findings.append({'kind': 'mac_conflict', 'mac': mac, 'ips': ips, 'device': device})
+        return findings
+
+    def delete(self, ip, device=None):
+        key = (ip, device)
+        mac = self.ip_to_mac.pop(key, None)
+        if mac is not None:
+            self.unlink(key, mac)
+
+    def unlink(self, key, mac):
+        entries = self.mac_to_entries.get(mac)
+        if entries is not None:
+            entries.discard(key)
+            if not entries:
+                del self.mac_to_entries[mac]
+
+    def ips_for(self, mac):
+        """Distinct IPs a MAC answers for, across interfaces"""
+        return sorted({ip for ip, _ in self.mac_to_entries.get(mac, ())})
+
+    def sync(self, entries):
+        """Bring the indexes in line with a full table, returning the findings"""
+        findings = []
+        present = set()
+        for ip, mac, device in entries:
+            present.add((ip, device))
+            findings += self.set(ip, mac, device)
+        for ip, device in [key for key in self.ip_to_mac if key not in present]:
+            self.delete(ip, device)
+        return findings
+
+    def conflicts(self):
+        """MACs currently answering for more than one IP"""
+        conflicts = {}
+        for mac in self.mac_to_entries:
+            ips = self.ips_for(mac)
+            if len(ips) > 1 and mac not in self.shared_macs:
+                conflicts[mac] = ips
+        return conflicts
+
+class ArpWatcher:
+    """Watches the kernel ARP cache without running `arp`.
+
+    In netlink mode the thread sleeps in recv() until the kernel reports a
+    neighbour change, and re-reads /proc/net/arp every resync interval in
+    case events were dropped. Poll mode re-reads the table on an interval,
+    and skips parsing when the content has not changed. Poll mode also
+    replays fixture files given as `path`.
+    """
+
+    def __init__(self, on_finding=None, path=None, mode=None, interval=None, shared_macs=None):
+        self.on_finding = on_finding
+        self.path = path or Config.ARP_TABLE_PATH
+        self.mode = mode or Config.ARP_WATCH_MODE
+        if self.mode == 'auto':
+            netlink = hasattr(socket, 'AF_NETLINK') and self.path == '/proc/net/arp'
+            self.mode = 'netlink' if netlink else 'poll'
+        self.interval = interval or Config.ARP_POLL_INTERVAL
+        self.resync_interval = Config.ARP_RESYNC_INTERVAL
+        self.cooldown = Config.ARP_ALERT_COOLDOWN
+        self.table = ArpTable(shared_macs)
+        self.lock = threading.Lock()
+        self.last_raw = None
+        # Monotonic time of the last table read, so netlink mode resyncs even under steady traffic
+        self.last_scan = None
+        self.last_alert = {}
+        self.interfaces = {}
+        self.running = False
+        self.thread = None
+
+        self.reads = 0
+        self.unchanged = 0
+        self.events = 0
+        self.findings = {'mac_changed': 0, 'mac_conflict': 0}
+        self.suppressed = 0
+
+    def scan(self):
+        """Read the table and apply it; returns the findings raised by this read"""
+        self.last_scan = time.monotonic()
+        try:
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+        except OSError as e:
+            logger.error(f"Error reading {self.path}: {e}")
+            return []
+        with self.lock:
+            self.reads += 1
+            if raw == self.last_raw:
+                self.unchanged += 1
+                return []
+            self.last_raw = raw
+            findings = self.table.sync(parse_arp_table(raw.decode('ascii', 'replace')))
+            alerts = self.filter_alerts(findings)
+        self.notify(alerts)
+        return findings
+
+    def apply_events(self, data):
+        """Apply a netlink datagram of neighbour changes"""
+        findings = []
+        with self.lock:
+            for action, ip, mac, ifindex in parse_neighbour_messages(data):
+                self.events += 1
+                if action == 'delete':
+                    self.table.delete(ip, self.interface_name(ifindex))
+                else:
+                    findings += self.table.set(ip, mac, self.interface_name(ifindex))
+            # The next resync must re-read the table even if it looks the same as last time
+            self.last_raw = None
+            alerts = self.filter_alerts(findings)
+        self.notify(alerts)
+        return findings
+
+    def interface_name(self, ifindex):
+        name = self.interfaces.get(ifindex)
+        if name is None:
+            try:
+                name = socket.if_indextoname(ifindex)
+            except OSError:
+                name = str(ifindex)
+            self.interfaces[ifindex] = name
+        return name
+
+    def filter_alerts(self, findings, now=None):
+        """Count findings and return those outside the alert cooldown for their IP and interface, or MAC"""
+        if now is None:
+            now = time.monotonic()
+        alerts = []
+        for finding in findings:
+            self.findings[finding['kind']] += 1
+            if finding['kind'] == 'mac_changed':
+                key = (finding['kind'], finding['ip'], finding['device'])
+            else:
+                key = (finding['kind'], finding['mac'])
+            if now - self.last_alert.get(key, float('-inf')) < self.cooldown:
+                self.suppressed += 1
+                continue
+            self.last_alert[key] = now
+            alerts.append(finding)
+        return alerts
+
+    def notify(self, alerts):
+        if not self.on_finding:
+            return
+        for finding in alerts:
+            try:
+                self.on_finding(finding)
+            except Exception as e:
+                logger.error(f"Error in ARP finding callback: {e}")
+
+    def open_netlink(self):
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+        sock.bind((0, RTMGRP_NEIGH))
+        sock.settimeout(self.resync_interval)
+        return sock
+
+    def run_netlink(self):
+        try:
+            sock = self.open_netlink()
+        except OSError as e:
+            logger.warning(f"Netlink neighbour events unavailable ({e}), polling {self.path} instead")
+            self.mode = 'poll'
+            return self.run_poll()
+        try:
+            while self.running:
+                # A busy segment keeps recv() from ever timing out, so the resync is due by the clock
+                due = (self.last_scan or 0) + self.resync_interval - time.monotonic()
+                if due <= 0:
+                    self.scan()
+                    continue
+                sock.settimeout(due)
+                try:
+                    self.apply_events(sock.recv(65536))
+                except socket.timeout:
+                    self.scan()
+                except OSError as e:
+                    # ENOBUFS: the kernel dropped events, so re-read the whole table
+                    logger.warning(f"Netlink neighbour events lost ({e}), resyncing ARP table")
+                    self.scan()
+        finally:
+            sock.close()
+
+    def run_poll(self):
+        while self.running:
+            time.sleep(self.interval)
+            self.scan()
+
+    def run(self):
+        self.scan()
+        try:
+            if self.mode == 'netlink':
+                self.run_netlink()
+            else:
+                self.run_poll()
+        except Exception as e:
+            logger.error(f"ARP watcher stopped: {e}")
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        logger.info(f"ARP watcher started ({self.mode} mode, {self.path})")
+
+    def stop(self):
+        self.running = False
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'mode': self.mode,
+                'path': self.path,
+                'entries': len(self.table.ip_to_mac),
+                'macs': len(self.table.mac_to_entries),
+                'conflicts': self.table.conflicts(),
+                'reads': self.reads,
+                'unchanged_reads': self.unchanged,
+                'netlink_events': self.events,
+                'findings': dict(self.findings),
+                'alerts_suppressed': self.suppressed
+            }
@@ -0,0 +1,156 @@
+"""Asyncio entry point: python-socketio AsyncServer on uvicorn.
+
+Socket clients and the MQTT connection live on one event loop, so a
+connected dashboard costs a coroutine instead of an OS thread. The REST
+routes are the Flask app from app.py mounted through a bounded thread pool.
+Blocking psutil, subprocess and SMTP work stays in the existing sampler,
+firewall and outbox threads, or goes through asyncio.to_thread.
+
+Run with: python asgi_app.py  (or uvicorn asgi_app:app)
+"""
+import asyncio
+import logging
+import socketio
+from a2wsgi import WSGIMiddleware
+
+from config import Config
+from mqtt_asyncio import AsyncioMQTTLoop
+from metrics import timed_event
+from app import (app as flask_app, mqtt_handler, system_monitor, security_monitor, email_alerts,
+                 subscriptions, journal, build_sync, SYSTEM_STATS_EMITS)
+from subscriptions import EVENT_ROOMS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+sio = socketio.AsyncServer(
+    async_mode='asgi',
+    cors_allowed_origins='*',
+    ping_timeout=60,
+    ping_interval=25
+)
+
+# Strong references so background tasks are not garbage collected
+background_tasks = set()
+
+class ThreadsafeEmitter:
+    """socketio.emit() for worker threads, scheduled onto the server's event loop"""
+
+    def __init__(self, server, loop):
+        self.server = server
+        self.loop = loop
+
+    def emit(self, event, data=None, **kwargs):
+        asyncio.run_coroutine_threadsafe(self.server.emit(event, data, **kwargs), self.loop)
+
+# SocketIO Events
+
+@sio.event
+@timed_event('connect')
+async def connect(sid, environ):
+    logger.info(f"Client connected: {sid}")
+    join, _, _ = subscriptions.subscribe(sid)
+    for room in join:
+        await sio.enter_room(sid, room)
+    await sio.emit('connection_status', {'status': 'connected', 'epoch': journal.epoch, 'seq': journal.seq}, to=sid)
+
+@sio.event
+@timed_event('disconnect')
+async def disconnect(sid):
+    logger.info(f"Client disconnected: {sid}")
+    subscriptions.unsubscribe(sid)
+
+@sio.on('subscribe')
+@timed_event('subscribe')
+async def handle_subscribe(sid, data=None):
+    data = data or {}
+    join, leave, subscription = subscriptions.subscribe(sid, data.get('sectors'), data.get('events'))
+    for room in leave:
+        await sio.leave_room(sid, room)
+    for room in join:
+        await sio.enter_room(sid, room)
+    await sio.emit('subscribed', subscription, to=sid)
+
+@sio.on('request_sensor_data')
+@timed_event('request_sensor_data')
+async def handle_sensor_request(sid, data=None):
+    await sio.emit('sensor_data', subscriptions.filter_sensor_data(sid, mqtt_handler.get_sensor_data()), to=sid)
+
+@sio.on('sync')
+@timed_event('sync')
+async def handle_sync(sid, data=None):
+    if not isinstance(data, dict):
+        data = {}
+    # The snapshot path reads the attack log from SQLite
+    payload = await asyncio.to_thread(build_sync, data.get('since'), data.get('epoch'), sid)
+    await sio.emit('sync', payload, to=sid)
+
+@sio.on('request_system_stats')
+@timed_event('request_system_stats')
+async def handle_stats_request(sid, data=None):
+    # Samples with psutil if the sampler has not produced a snapshot yet
+    stats = await asyncio.to_thread(system_monitor.get_all_stats)
+    await sio.emit('system_stats', stats, to=sid)
+
+# Background monitoring
+
+async def background_monitoring():
+    """Asyncio counterpart of app.background_monitoring"""
+    while True:
+        try:
+            # Normally the sampler thread's snapshot, but the first read may sample with psutil
+            stats = await asyncio.to_thread(system_monitor.get_all_stats)
+            await sio.emit('system_stats', stats, to=EVENT_ROOMS['system'])
+            SYSTEM_STATS_EMITS.inc()
+
+            # Flood detection may shell out to the firewall
+            await asyncio.to_thread(security_monitor.detect_dos_attack, stats['connection_summary'])
+
+            # Only queues the message; the outbox thread talks SMTP
+            if stats.get('warnings') and email_alerts.enabled:
+                email_alerts.send_system_warning(stats)
+        except Exception as e:
+            logger.error(f"Error in background monitoring: {e}")
+        await asyncio.sleep(5)
+
+def spawn(coro):
+    task = asyncio.get_running_loop().create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+async def startup():
+    loop = asyncio.get_running_loop()
+
+    # Components emit from their own threads; route those onto the loop
+    emitter = ThreadsafeEmitter(sio, loop)
+    for component in (mqtt_handler, mqtt_handler.emitter, system_monitor, security_monitor):
+        component.socketio = emitter
+
+    mqtt_handler.start_workers()
+    spawn(AsyncioMQTTLoop(loop, mqtt_handler.client).run())
+    logger.info("MQTT handler started")
+
+    system_monitor.start_sampler()
+    security_monitor.start_packet_sampler()
+    security_monitor.start_arp_watcher()
+    spawn(background_monitoring())
+    logger.info("Background monitoring started")
+
+async def shutdown():
+    for task in list(background_tasks):
+        task.cancel()
+    mqtt_handler.emitter.stop()
+
+app = socketio.ASGIApp(
+    sio,
+    other_asgi_app=WSGIMiddleware(flask_app, workers=Config.ASGI_WSGI_WORKERS),
+    on_startup=startup,
+    on_shutdown=shutdown
+)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    logger.info(f"Starting Smart Campus Backend (asyncio) on {Config.FLASK_HOST}:{Config.FLASK_PORT}")
+    uvicorn.run(app, host=Config.FLASK_HOST, port=Config.FLASK_PORT, log_level='info')
@@ -0,0 +1,123 @@
+import logging
+import sqlite3
+import threading
+import time
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ATTACK_FIELDS = ('type', 'category', 'message', 'time', 'severity', 'source')
+
+def normalize_category(category):
+    """Turn a display category ('DoS Attack') into a stats key ('dos_attack')"""
+    return category.lower().replace(' ', '_')
+
+class AttackStore:
+    """Persistent attack log in SQLite (WAL mode) with in-memory category counters"""
+
+    def __init__(self, path=None):
+        self.path = path or Config.ATTACK_DB_PATH
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self._init_schema()
+        # Other processes write to the same database; counters are reloaded when the newest id moves
+        self.counts_id = self.latest_id()
+        self.counts = self._load_counts()
+
+    def _init_schema(self):
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS attacks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    created REAL NOT NULL,
+                    type TEXT,
+                    category TEXT NOT NULL,
+                    message TEXT,
+                    time TEXT,
+                    severity TEXT,
+                    source TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_attacks_created ON attacks (created);
+                CREATE INDEX IF NOT EXISTS idx_attacks_category ON attacks (category, id);
+                CREATE INDEX IF NOT EXISTS idx_attacks_source ON attacks (source, id);
+                CREATE TABLE IF NOT EXISTS attack_counts (
+                    category TEXT PRIMARY KEY,
+                    count INTEGER NOT NULL
+                );
+            """)
+            self.conn.commit()
+
+    def _load_counts(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT category, count FROM attack_counts").fetchall()
+        return {row['category']: row['count'] for row in rows}
+
+    def add(self, alert):
+        """Persist an alert and bump its category counter, returning the new row id"""
+        key = normalize_category(alert['category'])
+        values = [alert.get(field) for field in ATTACK_FIELDS]
+
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT INTO attacks (created, type, category, message, time, severity, source) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [time.time()] + values
+            )
+            self.conn.execute(
+                "INSERT INTO attack_counts (category, count) VALUES (?, 1) "
+                "ON CONFLICT(category) DO UPDATE SET count = count + 1",
+                (key,)
+            )
+            self.conn.commit()
+            self.counts[key] = self.counts.get(key, 0) + 1
+            return cursor.lastrowid
+
+    def query(self, limit=100, before=None, category=None, source=None, since=None):
+        """Return up to `limit` alerts newest first, starting below the `before` id cursor"""
+        clauses = []
+        params = []
+        if before is not None:
+            clauses.append("id < ?")
+            params.append(before)
+        if category is not None:
+            clauses.append("category = ?")
+            params.append(category)
+        if source is not None:
+            clauses.append("source = ?")
+            params.append(source)
+        if since is not None:
+            clauses.append("created >= ?")
+            params.append(since)
+
+        sql = "SELECT * FROM attacks"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def latest_id(self):
+        """Id of the newest alert from any process; changes whenever an alert is added"""
+        with self.lock:
+            return self.conn.execute("SELECT max(id) FROM attacks").fetchone()[0] or 0
+
+    def get_counts(self):
+        """Return a copy of the per-category counters, including alerts other processes logged"""
+        latest = self.latest_id()
+        if latest != self.counts_id:
+            counts = self._load_counts()
+            with self.lock:
+                self.counts, self.counts_id = counts, latest
+        with self.lock:
+            return dict(self.counts)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,87 @@
+"""Benchmark sensor anomaly detection at fleet scale.
+
+Simulates `sensors` sensors reporting at `rate` Hz. Each scoring interval's
+readings are queued through AnomalyDetector.add (the per-message cost paid
+by the ingest workers), then scored in one AnomalyDetector.score pass.
+A few sensors are given spikes, and one gets stuck, to check that they
+are caught.
+
+Reports the CPU used per simulated second; below 1.0 means one core keeps up.
+
+Usage: python benchmarks/bench_anomaly_detector.py [sensors] [rate_hz] [duration_s]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+logging.disable(logging.INFO)
+
+import numpy as np
+from anomaly_detector import AnomalyDetector
+
+def main():
+    sensors = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    duration = float(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    detector = AnomalyDetector(stuck_readings=100)
+    interval = detector.interval
+    per_batch = int(sensors * rate * interval)
+    rng = np.random.default_rng(5)
+    baselines = rng.uniform(10, 40, sensors)
+    names = [(f"sector{i % 8}", f"sensor{i}") for i in range(sensors)]
+    spiky = set(range(0, sensors, max(1, sensors // 10)))
+    stuck_sensor = sensors - 1
+
+    add_time = 0.0
+    score_time = 0.0
+    found = {'spike': set(), 'stuck': set()}
+    batches = int(duration / interval)
+
+    for batch in range(batches):
+        # Readings arrive round-robin across sensors, as a steady fleet would send them
+        slots = np.arange(batch * per_batch, (batch + 1) * per_batch) % sensors
+        values = baselines[slots] + rng.normal(0, 0.5, per_batch)
+        halfway = batch >= batches // 2
+        if halfway:
+            values[slots == stuck_sensor] = 21.0
+            if batch == batches // 2:
+                for i in np.flatnonzero(np.isin(slots, list(spiky)))[:len(spiky)]:
+                    values[i] += 50
+        readings = [(names[s][0], names[s][1], v) for s, v in zip(slots.tolist(), values.tolist())]
+
+        start = time.perf_counter()
+        for sector, sensor, value in readings:
+            detector.add(sector, sensor, value)
+        add_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        anomalies = detector.score(now=batch * interval)
+        score_time += time.perf_counter() - start
+        for anomaly in anomalies:
+            found[anomaly['kind']].add(int(anomaly['sensor'][6:]))
+
+    simulated = batches * interval
+    readings = batches * per_batch
+    print(json.dumps({
+        'sensors': sensors,
+        'rate_hz': rate,
+        'readings': readings,
+        'add_us_per_reading': round(add_time / readings * 1e6, 3),
+        'score_us_per_reading': round(score_time / readings * 1e6, 3),
+        'score_ms_per_batch': round(score_time / batches * 1000, 2),
+        'cpu_seconds_per_second': round((add_time + score_time) / simulated, 3),
+        'spikes_injected': len(spiky),
+        'spikes_found': len(found['spike'] & spiky),
+        # The stuck sensor also jumps to a new level, which is a genuine spike
+        'false_spikes': len(found['spike'] - spiky - {stuck_sensor}),
+        'stuck_found': stuck_sensor in found['stuck'],
+        'false_stuck': len(found['stuck'] - {stuck_sensor})
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Benchmark ARP spoofing checks: forking `arp -a` vs the in-process ArpWatcher.
+
+Writes a fixture /proc/net/arp with `entries` hosts and times:
+
+- fork: one `arp -a` run against the host's real table (or `cat` of the
+  fixture when arp is not installed), which the old detect_arp_spoofing
+  paid on every check
+- unchanged: ArpWatcher.scan when the table is the same as last time
+- changed: ArpWatcher.scan after one entry's MAC changes
+- event: applying one netlink neighbour message
+
+Reports the CPU used per hour of continuous watching at the poll interval.
+
+`replay` applies /proc/net/arp snapshots in order and prints each one's
+findings instead. benchmarks/fixtures has a clean table (including a
+multi-homed host seen on eth0 and wlan0), one where the gateway's MAC also
+claims a node's IP (mac_conflict), and one where a node's MAC changed:
+
+    python benchmarks/bench_arp_watcher.py replay benchmarks/fixtures/arp_clean benchmarks/fixtures/arp_mac_changed
+
+Usage: python benchmarks/bench_arp_watcher.py [entries] [poll_interval_s]
+       python benchmarks/bench_arp_watcher.py replay table [table ...]
+"""
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+logging.disable(logging.WARNING)
+
+from arp_watcher import ArpTable, ArpWatcher, parse_arp_table, NDMSG, NLMSG_HEADER, RTATTR, RTM_NEWNEIGH, NDA_DST, NDA_LLADDR
+
+HEADER = 'IP address       HW type     Flags       HW address            Mask     Device\n'
+
+def write_table(path, entries, changed=None):
+    with open(path, 'w') as f:
+        f.write(HEADER)
+        for i in range(entries):
+            mac = f"02:00:00:{i >> 16 & 0xff:02x}:{i >> 8 & 0xff:02x}:{i & 0xff:02x}"
+            if i == changed:
+                mac = '02:ff:ff:ff:ff:ff'
+            f.write(f"10.{i >> 16 & 0xff}.{i >> 8 & 0xff}.{i & 0xff:<13} 0x1         0x2         {mac}     *        eth0\n")
+
+def neighbour_message(ip, mac):
+    attrs = b''
+    for attr_type, value in ((NDA_DST, socket.inet_aton(ip)), (NDA_LLADDR, bytes.fromhex(mac.replace(':', '')))):
+        length = RTATTR.size + len(value)
+        attrs += RTATTR.pack(length, attr_type) + value + b'\0' * (-length % 4)
+    body = NDMSG.pack(socket.AF_INET, 1, 0x02, 0, 1) + attrs
+    return NLMSG_HEADER.pack(NLMSG_HEADER.size + len(body), RTM_NEWNEIGH, 0, 0, 0) + body
+
+def cpu_time(fn, runs):
+    start = time.process_time()
+    for _ in range(runs):
+        fn()
+    return (time.process_time() - start) / runs
+
+def replay(paths):
+    table = ArpTable(shared_macs=())
+    for path in paths:
+        with open(path) as f:
+            findings = table.sync(parse_arp_table(f.read()))
+        print(json.dumps({'table': path, 'entries': len(table.ip_to_mac), 'findings': findings}, indent=2))
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'replay':
+        return replay(sys.argv[2:])
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    interval = float(sys.argv[2]) if len(sys.argv) > 2 else 2
+
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'arp')
+    write_table(path, entries)
+    watcher = ArpWatcher(path=path, mode='poll', shared_macs=())
+
+    command = ['arp', '-a'] if shutil.which('arp') else ['cat', path]
+    start = time.perf_counter()
+    for _ in range(20):
+        subprocess.run(command, capture_output=True, text=True)
+    fork_wall = (time.perf_counter() - start) / 20
+
+    first = cpu_time(watcher.scan, 1)
+    unchanged = cpu_time(watcher.scan, 2000)
+    findings = 0
+    changed = 0.0
+    for i in range(50):
+        write_table(path, entries, changed=i)
+        start = time.process_time()
+        findings += len(watcher.scan())
+        changed += time.process_time() - start
+    changed /= 50
+    shutil.rmtree(workdir)
+
+    message = neighbour_message('10.0.0.1', '02:aa:aa:aa:aa:aa')
+    event = cpu_time(lambda: watcher.apply_events(message), 20000)
+
+    print(json.dumps({
+        'entries': entries,
+        'poll_interval_s': interval,
+        'fork_command': ' '.join(command[:2]),
+        'fork_wall_ms': round(fork_wall * 1000, 2),
+        'first_scan_ms': round(first * 1000, 3),
+        'unchanged_scan_us': round(unchanged * 1e6, 1),
+        'changed_scan_ms': round(changed * 1000, 3),
+        'event_us': round(event * 1e6, 2),
+        'findings': findings,
+        'poll_cpu_ms_per_hour': round(unchanged * 3600 / interval * 1000, 1),
+        'stats': watcher.get_stats()
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
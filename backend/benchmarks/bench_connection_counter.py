@@ -0,0 +1,81 @@
+"""Benchmark ConnectionCounter against psutil.net_connections on synthetic /proc files.
+
+Usage: python benchmarks/bench_connection_counter.py [rows]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connection_counter import ConnectionCounter
+
+TCP_HEADER = ("  sl  local_address rem_address   st tx_queue rx_queue tr tm->when "
+              "retrnsmt   uid  timeout inode\n")
+ROW = ("{sl:4d}: {local}:{lport:04X} {remote}:{rport:04X} {state} 00000000:00000000 "
+       "00:00000000 00000000  1000        0 {inode} 1 0000000000000000 20 4 30 10 -1\n")
+STATES = ['01'] * 6 + ['03', '06', '08', '0A']
+
+def write_proc_files(directory, rows):
+    """Write net/tcp, net/tcp6 and empty net/udp{,6} with `rows` TCP entries"""
+    net = os.path.join(directory, 'net')
+    os.makedirs(net, exist_ok=True)
+    rng = random.Random(42)
+    remotes = [f"{rng.getrandbits(32):08X}" for _ in range(5000)]
+
+    with open(os.path.join(net, 'tcp'), 'w') as f:
+        f.write(TCP_HEADER)
+        for i in range(rows // 2):
+            f.write(ROW.format(sl=i, local='6501A8C0', lport=5000, remote=rng.choice(remotes),
+                               rport=rng.randrange(1024, 65535), state=rng.choice(STATES), inode=i))
+    with open(os.path.join(net, 'tcp6'), 'w') as f:
+        f.write(TCP_HEADER)
+        for i in range(rows - rows // 2):
+            remote = '0000000000000000FFFF0000' + rng.choice(remotes)
+            f.write(ROW.format(sl=i, local='0' * 32, lport=5000, remote=remote,
+                               rport=rng.randrange(1024, 65535), state=rng.choice(STATES), inode=i))
+    for name in ('udp', 'udp6'):
+        with open(os.path.join(net, name), 'w') as f:
+            f.write(TCP_HEADER)
+    return [os.path.join(net, 'tcp'), os.path.join(net, 'tcp6')]
+
+def timeit(func, repeat=5):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_proc_files(directory, rows)
+
+        counter = ConnectionCounter(paths=paths)
+        elapsed, summary = timeit(counter.count)
+        print(f"ConnectionCounter: {rows} rows in {elapsed * 1000:.1f} ms "
+              f"({summary['established']} established, {summary['unique_remotes']} remotes)")
+
+        try:
+            import psutil
+        except ImportError:
+            print("psutil not installed, skipping comparison")
+            return
+
+        psutil.PROCFS_PATH = directory
+
+        def psutil_count():
+            connections = psutil.net_connections(kind='inet')
+            return len([conn for conn in connections if conn.status == 'ESTABLISHED'])
+
+        psutil_elapsed, established = timeit(psutil_count)
+        print(f"psutil.net_connections: {rows} rows in {psutil_elapsed * 1000:.1f} ms "
+              f"({established} established)")
+        print(f"Speedup: {psutil_elapsed / elapsed:.1f}x")
+
+if __name__ == '__main__':
+    main()
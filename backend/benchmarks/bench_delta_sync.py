@@ -0,0 +1,80 @@
+"""Benchmark reconnect traffic: full sensor snapshot vs journal delta.
+
+Fills MQTTHandler with `sensors` sensors, then simulates clients that drop
+off the campus Wi-Fi for `offline_s` seconds while `rate` readings per
+second keep arriving. Compares the JSON bytes of a full snapshot with the
+compacted "changes since seq N" delta. It also times ChangeJournal.since and
+the per-reading cost of stamping changes.
+
+Usage: python benchmarks/bench_delta_sync.py [sensors] [rate_per_s] [offline_s]
+"""
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+logging.disable(logging.INFO)
+
+from change_journal import group_changes
+from mqtt_handler import MQTTHandler
+
+SECTORS = ['building_a', 'building_b', 'parking', 'park']
+
+def publish(handler, rng, sensors, count):
+    for _ in range(count):
+        node = rng.randrange(sensors)
+        topic = f"campus/{SECTORS[node % 4]}/node{node}/temperature"
+        payload = json.dumps({'value': round(rng.uniform(15, 35), 2), 'unit': 'C', 'active': True}).encode()
+        handler.process_message(topic, payload)
+
+def main():
+    sensors = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+    offline = [float(sys.argv[3])] if len(sys.argv) > 3 else [1, 5, 30, 120]
+
+    handler = MQTTHandler()
+    rng = random.Random(7)
+    for node in range(sensors):
+        topic = f"campus/{SECTORS[node % 4]}/node{node}/temperature"
+        handler.process_message(topic, b'{"value": 20.0, "unit": "C", "active": true}')
+
+    start = time.perf_counter()
+    publish(handler, rng, sensors, 20000)
+    per_reading = (time.perf_counter() - start) / 20000
+
+    snapshot_bytes = len(json.dumps({'full': True, 'sensors': handler.get_sensor_data()}))
+    results = []
+    for seconds in offline:
+        cursor = handler.journal.seq
+        publish(handler, rng, sensors, int(rate * seconds))
+        start = time.perf_counter()
+        result = handler.journal.since(cursor, handler.journal.epoch)
+        since_ms = (time.perf_counter() - start) * 1000
+        if result is None:
+            results.append({'offline_s': seconds, 'delta': 'fell out of the journal, full snapshot sent'})
+            continue
+        delta_bytes = len(json.dumps(group_changes(result[1])))
+        results.append({
+            'offline_s': seconds,
+            'changes': int(rate * seconds),
+            'delta_sensors': len(result[1]),
+            'delta_bytes': delta_bytes,
+            'saving': f"{(1 - delta_bytes / snapshot_bytes) * 100:.1f}%",
+            'since_ms': round(since_ms, 2)
+        })
+
+    print(json.dumps({
+        'sensors': sensors,
+        'rate_per_s': rate,
+        'full_snapshot_bytes': snapshot_bytes,
+        'process_us_per_reading': round(per_reading * 1e6, 2),
+        'journal': handler.journal.get_stats(),
+        'reconnects': results
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Benchmark the email outbox against a local SMTP stand-in.
+
+Queues N messages, waits for delivery and reports throughput and
+queue-to-delivery latency. Then injects failures to exercise the retry
+path (a rejected send with backoff, a dropped connection, a message that
+exhausts its retries), checks that a burst of attack alerts is merged into
+a single digest, and floods the digest past EMAIL_DIGEST_MAX_PENDING to
+check the pending list stays capped while every alert is still counted.
+
+Usage: python benchmarks/bench_email_outbox.py [messages]
+"""
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from smtp_standin import SMTPStandin
+
+logging.disable(logging.ERROR)
+
+def attack(i):
+    return {'category': 'DoS Attack', 'severity': 'CRITICAL', 'time': time.strftime('%H:%M:%S'),
+            'message': f'burst {i}', 'source': '203.0.113.7'}
+
+def body_text(message):
+    return ''.join(part.get_content() for part in message.walk() if part.get_content_maintype() == 'text')
+
+def timed_send(alerts, subject):
+    """Send one message through the outbox; return (seconds, stats delta)"""
+    before = alerts.get_outbox_stats()
+    start = time.perf_counter()
+    alerts.send_email(subject, "<p>benchmark</p>")
+    alerts.outbox.join()
+    elapsed = time.perf_counter() - start
+    after = alerts.get_outbox_stats()
+    delta = {key: after[key] - before[key] for key in ('sent', 'failed', 'retries', 'connections_opened')}
+    return elapsed, delta
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    server = SMTPStandin().start()
+
+    Config.SMTP_SERVER = '127.0.0.1'
+    Config.SMTP_PORT = server.port
+    Config.SMTP_USE_TLS = False
+    Config.EMAIL_ADDRESS = 'bench@localhost'
+    Config.EMAIL_PASSWORD = 'unused'
+    Config.EMAIL_DIGEST_WINDOW = 0.5
+    Config.EMAIL_MAX_RETRIES = 3
+    Config.EMAIL_RETRY_BACKOFF = 0.05
+
+    from email_alerts import EmailAlerts
+    alerts = EmailAlerts()
+
+    try:
+        start = time.perf_counter()
+        for i in range(count):
+            alerts.send_email(f"Benchmark {i}", "<p>benchmark</p>")
+        alerts.outbox.join()
+        elapsed = time.perf_counter() - start
+
+        stats = alerts.get_outbox_stats()
+        print(f"{stats['sent']} emails in {elapsed:.2f} s ({stats['sent'] / elapsed:.0f} msg/s) "
+              f"over {stats['connections_opened']} connection(s)")
+        print(f"queue-to-delivery latency: p50 {stats.get('latency_p50_ms')} ms, "
+              f"p99 {stats.get('latency_p99_ms')} ms")
+
+        # Retry path: the first failure on a reused connection reconnects at once, later ones back off
+        backoff = [0 if attempt == 0 else Config.EMAIL_RETRY_BACKOFF * (2 ** attempt)
+                   for attempt in range(Config.EMAIL_MAX_RETRIES)]
+        server.fail_next(2)
+        elapsed, delta = timed_send(alerts, "Retry after 451")
+        print(f"2 x 451 then accepted: {delta} in {elapsed:.2f} s (expected backoff {sum(backoff[:2]):.2f} s)")
+
+        server.fail_next(1, 'drop')
+        elapsed, delta = timed_send(alerts, "Retry after dropped connection")
+        print(f"dropped connection then accepted: {delta} in {elapsed:.2f} s (expected backoff 0.00 s)")
+
+        server.fail_next(Config.EMAIL_MAX_RETRIES + 1)
+        elapsed, delta = timed_send(alerts, "Exhausts retries")
+        print(f"{Config.EMAIL_MAX_RETRIES + 1} x 451: {delta} in {elapsed:.2f} s "
+              f"(expected backoff {sum(backoff):.2f} s)")
+
+        received = len(server.parsed())
+        for i in range(50):
+            alerts.send_attack_alert(attack(i))
+        time.sleep(Config.EMAIL_DIGEST_WINDOW + 0.5)
+        alerts.outbox.join()
+        messages = server.parsed()
+        print(f"50 attack alerts delivered as {len(messages) - received} email(s): {messages[-1]['Subject']}")
+
+        # Flood well past the pending cap within one digest window
+        flood = Config.EMAIL_DIGEST_MAX_PENDING * 20
+        received = len(messages)
+        start = time.perf_counter()
+        for i in range(flood):
+            alerts.send_attack_alert(attack(i))
+        elapsed = time.perf_counter() - start
+        with alerts.stats_lock:
+            kept = len(alerts.pending_alerts)
+            counted = sum(alerts.pending_counts.values())
+        print(f"{flood} attack alerts queued in {elapsed * 1000:.1f} ms ({elapsed / flood * 1e6:.2f} us/alert): "
+              f"{kept} kept (cap {Config.EMAIL_DIGEST_MAX_PENDING}), {counted} counted")
+
+        time.sleep(Config.EMAIL_DIGEST_WINDOW + 0.5)
+        alerts.outbox.join()
+        messages = server.parsed()
+        digest = messages[-1]
+        more = flood - Config.EMAIL_DIGEST_ROWS
+        print(f"delivered as {len(messages) - received} email(s): {digest['Subject']}; "
+              f"'+{more} more' row present: {f'+{more} more' in body_text(digest)}")
+    finally:
+        alerts.close_connection()
+        server.shutdown()
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
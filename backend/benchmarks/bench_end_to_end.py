@@ -0,0 +1,297 @@
+"""End-to-end load test: ESP32 fleet -> MQTT -> backend -> Socket.IO and REST.
+
+Runs fully offline. It starts the MQTT broker stand-in and the backend
+(app.py, asgi_app.py or multiprocess.py) as subprocesses. A synthetic fleet
+publishes through the broker while headless Socket.IO clients listen for
+sensor updates. There are two phases:
+
+- fanout: fleet and socket clients only
+- rest: the same, plus concurrent GETs against the read-heavy REST routes
+
+For each phase it reports:
+- publish -> sensor_batch/sensor_update latency (p50/p90/p99/max)
+- REST requests/s and latency per route
+- backend CPU and RSS, summed over the backend's process tree
+
+Results are written as JSON, tagged with the git commit. Compare two runs
+with benchmarks/compare_results.py.
+
+Usage: python benchmarks/bench_end_to_end.py [--nodes 2000] [--rate 0.5] [--duration 15]
+           [--socket-clients 20] [--rest-concurrency 16] [--entry app.py] [--output result.json]
+Requires: pip install -r benchmarks/requirements.txt (python-socketio's asyncio client and aiohttp)
+
+benchmarks/results/end_to_end_single_core.json is a reference run on a
+one-CPU x86_64 host (200 nodes, 5 socket clients, 4 REST connections).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+try:
+    import socketio
+    import aiohttp
+except ImportError:
+    print("python-socketio and aiohttp are required: pip install -r benchmarks/requirements.txt")
+    sys.exit(1)
+
+import psutil
+from esp32_fleet import ESP32Fleet
+
+BROKER_PORT = 18883
+BACKEND_PORT = 5057
+REST_ROUTES = ['/api/sensors', '/api/security/stats', '/api/security/attacks', '/api/system/stats']
+
+def percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def summarize_ms(samples):
+    return {
+        'count': len(samples),
+        'p50_ms': round(percentile(samples, 0.5) * 1000, 2) if samples else None,
+        'p90_ms': round(percentile(samples, 0.9) * 1000, 2) if samples else None,
+        'p99_ms': round(percentile(samples, 0.99) * 1000, 2) if samples else None,
+        'max_ms': round(max(samples) * 1000, 2) if samples else None
+    }
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                       text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class Phase:
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.updates = 0
+        self.cpu = []
+        self.rss = []
+        self.rest = {}
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def summary(self, published):
+        rest = {}
+        for route, stats in self.rest.items():
+            rest[route] = {
+                'requests_per_second': round(len(stats['latencies']) / self.elapsed, 1),
+                'errors': stats['errors'],
+                **summarize_ms(stats['latencies'])
+            }
+        return {
+            'duration_s': round(self.elapsed, 2),
+            'published': published,
+            'updates_received': self.updates,
+            'latency': summarize_ms(self.latencies),
+            'rest': rest,
+            'rest_requests_per_second': round(sum(r['requests_per_second'] for r in rest.values()), 1),
+            'backend_cpu_percent': {
+                'avg': round(sum(self.cpu) / len(self.cpu), 1) if self.cpu else None,
+                'max': round(max(self.cpu), 1) if self.cpu else None
+            },
+            'backend_rss_mb': {
+                'max': round(max(self.rss) / 1048576, 1) if self.rss else None
+            }
+        }
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.url = f"http://127.0.0.1:{BACKEND_PORT}"
+        self.phase = None
+        self.processes = []
+
+    def start_subprocesses(self):
+        broker = subprocess.Popen([sys.executable, os.path.join(BENCH_DIR, 'broker_standin.py'), str(BROKER_PORT)],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.processes.append(broker)
+
+        self.workdir = tempfile.mkdtemp(prefix='smartcam-e2e-')
+        env = dict(os.environ,
+                   MQTT_BROKER='127.0.0.1',
+                   MQTT_PORT=str(BROKER_PORT),
+                   FLASK_PORT=str(BACKEND_PORT),
+                   FLASK_DEBUG='False',
+                   ATTACK_DB_PATH=os.path.join(self.workdir, 'attacks.db'),
+                   SENSOR_TABLE_NAME=f"smartcam_e2e_{os.getpid()}",
+                   MESSAGE_HUB_ADDRESS=os.path.join(self.workdir, 'hub.sock'))
+        self.backend = subprocess.Popen([sys.executable, self.args.entry], cwd=BACKEND_DIR, env=env,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.processes.append(self.backend)
+
+    def stop_subprocesses(self):
+        for process in reversed(self.processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    async def wait_for_backend(self, session, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(self.url + '/') as response:
+                    if response.status == 200 and (await response.json()).get('mqtt_connected'):
+                        return True
+            except (aiohttp.ClientError, ValueError):
+                pass
+            await asyncio.sleep(0.5)
+        return False
+
+    def record_updates(self, updates):
+        now = time.time()
+        phase = self.phase
+        if phase is None:
+            return
+        for update in updates:
+            data = update.get('data') or {}
+            if data.get('unit') == 'ts':
+                phase.latencies.append(now - data['value'])
+                phase.updates += 1
+
+    async def open_socket_client(self):
+        client = socketio.AsyncClient(reconnection=False)
+        client.on('sensor_batch', lambda batch: self.record_updates(batch.get('updates', [])))
+        # Backends from before batched emits sent one sensor_update per reading
+        client.on('sensor_update', lambda update: self.record_updates([update]))
+        await client.connect(self.url, transports=['websocket'])
+        return client
+
+    async def sample_resources(self):
+        """Sum CPU and RSS over the backend's process tree once per second"""
+        root = psutil.Process(self.backend.pid)
+        tracked = {}
+        while True:
+            try:
+                processes = [root] + root.children(recursive=True)
+            except psutil.NoSuchProcess:
+                return
+            cpu = 0.0
+            rss = 0
+            for process in processes:
+                try:
+                    if process.pid not in tracked:
+                        tracked[process.pid] = process
+                        process.cpu_percent(None)
+                    cpu += tracked[process.pid].cpu_percent(None)
+                    rss += process.memory_info().rss
+                except psutil.NoSuchProcess:
+                    pass
+            if self.phase is not None:
+                self.phase.cpu.append(cpu)
+                self.phase.rss.append(rss)
+            await asyncio.sleep(1)
+
+    async def rest_worker(self, session, index, end):
+        position = index
+        while time.monotonic() < end:
+            route = REST_ROUTES[position % len(REST_ROUTES)]
+            position += 1
+            stats = self.phase.rest.setdefault(route, {'latencies': [], 'errors': 0})
+            start = time.perf_counter()
+            try:
+                async with session.get(self.url + route) as response:
+                    await response.read()
+                    ok = response.status == 200
+            except aiohttp.ClientError:
+                ok = False
+            if ok:
+                stats['latencies'].append(time.perf_counter() - start)
+            else:
+                stats['errors'] += 1
+
+    async def run_phase(self, name, fleet, session=None):
+        published_before = fleet.published
+        self.phase = Phase(name)
+        end = time.monotonic() + self.args.duration
+        if session is not None:
+            await asyncio.gather(*(self.rest_worker(session, i, end)
+                                   for i in range(self.args.rest_concurrency)))
+        else:
+            await asyncio.sleep(self.args.duration)
+        phase = self.phase
+        phase.elapsed = time.perf_counter() - phase.started
+        self.phase = None
+        return phase.summary(fleet.published - published_before)
+
+    async def run(self):
+        args = self.args
+        connector = aiohttp.TCPConnector(limit=args.rest_concurrency)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            if not await self.wait_for_backend(session):
+                return {'error': 'backend did not start or never connected to the broker'}
+
+            clients = await asyncio.gather(*(self.open_socket_client() for _ in range(args.socket_clients)))
+            sampler = asyncio.get_running_loop().create_task(self.sample_resources())
+
+            fleet = ESP32Fleet(args.nodes, args.rate, port=BROKER_PORT)
+            total = args.warmup + 2 * args.duration + 5
+            fleet_task = asyncio.get_running_loop().create_task(fleet.run(total))
+
+            await asyncio.sleep(args.warmup)
+            phases = {
+                'fanout': await self.run_phase('fanout', fleet),
+                'rest': await self.run_phase('rest', fleet, session)
+            }
+
+            fleet.stop()
+            await fleet_task
+            sampler.cancel()
+            await asyncio.gather(*(client.disconnect() for client in clients), return_exceptions=True)
+            phases['fleet'] = {'published': fleet.published, 'errors': fleet.errors}
+            return phases
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end backend load test')
+    parser.add_argument('--nodes', type=int, default=2000, help='virtual ESP32 nodes')
+    parser.add_argument('--rate', type=float, default=0.5, help='messages per second per node')
+    parser.add_argument('--duration', type=float, default=15, help='seconds per phase')
+    parser.add_argument('--warmup', type=float, default=3, help='seconds before measuring')
+    parser.add_argument('--socket-clients', type=int, default=20)
+    parser.add_argument('--rest-concurrency', type=int, default=16)
+    parser.add_argument('--entry', default='app.py', help='app.py, asgi_app.py or multiprocess.py')
+    parser.add_argument('--output', help='write the JSON result here as well as to stdout')
+    args = parser.parse_args()
+
+    test = LoadTest(args)
+    test.start_subprocesses()
+    try:
+        phases = asyncio.run(test.run())
+    finally:
+        test.stop_subprocesses()
+
+    result = {
+        'benchmark': 'end_to_end',
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'params': vars(args),
+        'host': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count()
+        },
+        'phases': phases
+    }
+    output = json.dumps(result, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Benchmark FailureTracker under a distributed scan of distinct source IPs.
+
+Records one failure from each of N distinct addresses, interleaved with a
+real attacker retrying every 1000 records, and reports throughput, tracked entries and memory.
+
+Usage: python benchmarks/bench_failure_tracker.py [distinct_ips] [capacity]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from failure_tracker import FailureTracker
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    capacity = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    ips = (f"{i >> 24 & 255}.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(16777216, 16777216 + count))
+
+    tracemalloc.start()
+    tracker = FailureTracker(window=300, capacity=capacity)
+    now = 1000.0
+    attacker_hits = 0
+
+    start = time.perf_counter()
+    for i, ip in enumerate(ips):
+        tracker.record(ip, now)
+        if i % 1000 == 0:
+            attacker_hits = tracker.record('203.0.113.7', now)
+        now += 0.0001
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = tracker.get_stats()
+    print(f"{count} distinct IPs in {elapsed:.2f} s ({count / elapsed:,.0f} records/s)")
+    print(f"tracked {stats['tracked']} (capacity {capacity}), {stats['evictions']} evicted, "
+          f"{stats['expirations']} expired")
+    print(f"memory: {current / 1e6:.1f} MB current, {peak / 1e6:.1f} MB peak")
+    print(f"attacker failures still counted in window: {attacker_hits}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""Benchmark bulk IP blocking: one call per address versus one call per batch.
+
+Uses MemoryBackend with a simulated per-subprocess cost, so it runs without root.
+
+Usage: python benchmarks/bench_firewall.py [ips] [call_latency_ms]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from firewall import FirewallQueue, MemoryBackend
+
+def run(backend, ips):
+    queue = FirewallQueue(backend, interval=0.05)
+    start = time.perf_counter()
+    batch = queue.submit('block', ips)
+    applied = queue.wait(batch, ips, timeout=600)
+    elapsed = time.perf_counter() - start
+    return len(applied), elapsed, queue.get_stats()
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 20) / 1000
+    ips = [f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}" for i in range(1, count + 1)]
+
+    for label, backend in (('per-address (ufw-like)', MemoryBackend(latency, per_ip=True)),
+                           ('batched (ipset/nftables-like)', MemoryBackend(latency))):
+        applied, elapsed, stats = run(backend, ips)
+        print(f"{label}: {applied} IPs in {elapsed:.2f} s, {backend.calls} calls, "
+              f"{applied / elapsed:.0f} blocks/s (backend {stats['ips_per_second']} blocks/s)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark MQTT ingestion with an in-process broker stand-in.
+
+Feeds synthetic ESP32 messages straight into MQTTHandler.on_message, the
+way paho's network thread would, and compares:
+
+- inline: decoding and state updates on the network thread (the old path)
+- pipeline: on_message only enqueues, a worker pool does the rest
+
+`process_delay_us` adds blocking time to every message to stand in for a
+slow downstream call (socket emit, disk, logging handler).
+
+Usage: python benchmarks/bench_ingest_pipeline.py [messages] [process_delay_us] [workers]
+"""
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+logging.disable(logging.INFO)
+
+from ingest_pipeline import IngestPipeline
+from mqtt_handler import MQTTHandler
+
+class FakeMessage:
+    __slots__ = ('topic', 'payload')
+
+    def __init__(self, topic, payload):
+        self.topic = topic
+        self.payload = payload
+
+class SlowMQTTHandler(MQTTHandler):
+    def __init__(self, delay, **kwargs):
+        self.delay = delay
+        super().__init__(**kwargs)
+
+    def process_message(self, topic, raw_payload):
+        if self.delay:
+            time.sleep(self.delay)
+        super().process_message(topic, raw_payload)
+
+def make_messages(count):
+    rng = random.Random(3)
+    sectors = ['building_a', 'building_b', 'parking', 'park']
+    sensors = ['temperature', 'humidity', 'light', 'motion', 'co2', 'noise', 'occupancy', 'power', 'door', 'smoke']
+    return [
+        FakeMessage(f"campus/{rng.choice(sectors)}/{rng.choice(sensors)}",
+                    json.dumps({'value': round(rng.uniform(0, 100), 2), 'unit': 'u', 'active': True}).encode())
+        for _ in range(count)
+    ]
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    delay = (float(sys.argv[2]) if len(sys.argv) > 2 else 100) / 1e6
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    messages = make_messages(count)
+
+    handler = SlowMQTTHandler(delay)
+    start = time.perf_counter()
+    for msg in messages:
+        handler.process_message(msg.topic, msg.payload)
+    inline = time.perf_counter() - start
+    print(f"inline:   {count / inline:,.0f} msg/s, network thread busy {inline / count * 1e6:.1f} us/msg")
+
+    handler = SlowMQTTHandler(delay)
+    handler.pipeline = IngestPipeline(handler.process_message, workers=workers, overflow='block')
+    handler.pipeline.start()
+    start = time.perf_counter()
+    for msg in messages:
+        handler.on_message(None, None, msg)
+    handler.pipeline.join()
+    drained = time.perf_counter() - start
+
+    stats = handler.get_ingest_stats()
+    print(f"pipeline: {count / drained:,.0f} msg/s with {workers} workers, network thread busy "
+          f"{stats['latency']['submit']['avg_us']} us/msg (p99 {stats['latency']['submit']['p99_us']} us)")
+    print(f"          queue wait p99 {stats['latency']['queue_wait']['p99_us']} us, "
+          f"process p99 {stats['latency']['process']['p99_us']} us, {stats['dropped']} dropped")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Benchmark the cost of the /metrics instrumentation on the MQTT hot path.
+
+Each MQTT message records three histogram observations: submit time on
+the network thread, then queue wait and process time on a worker. This
+script measures:
+
+- the raw cost of Counter.inc and Histogram.observe, single-threaded and
+  with several threads updating the same metric
+- IngestPipeline.submit with the real histogram vs a no-op stand-in, which
+  is the overhead added to paho's network thread
+- the full per-message instrumentation cost (all three observations)
+
+Usage: python benchmarks/bench_metrics.py [messages] [threads]
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+logging.disable(logging.INFO)
+
+import ingest_pipeline
+from ingest_pipeline import IngestPipeline
+from metrics import Registry
+
+class NullHistogram:
+    def observe(self, value):
+        pass
+
+def per_call_ns(function, count):
+    start = time.perf_counter()
+    function(count)
+    return (time.perf_counter() - start) / count * 1e9
+
+def threaded_ns(function, count, threads):
+    """Average per-call time while `threads` threads run function(count) at once"""
+    barrier = threading.Barrier(threads + 1)
+    def run():
+        barrier.wait()
+        function(count)
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - start) / (count * threads) * 1e9
+
+def submit_ns(count, histogram):
+    ingest_pipeline.SUBMIT_SECONDS = histogram
+    # No workers are started and the queue holds every message, so only submit() is timed
+    pipeline = IngestPipeline(lambda topic, payload: None, workers=1, maxsize=count, overflow='drop_newest')
+    topics = [f"campus/building_a/node{i}/temperature" for i in range(64)]
+    payload = b'{"value": 21.5, "unit": "C", "active": true}'
+    start = time.perf_counter()
+    for i in range(count):
+        pipeline.submit(topics[i & 63], payload)
+    return (time.perf_counter() - start) / count * 1e9
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    registry = Registry()
+    counter = registry.counter('bench_total', 'bench')
+    histogram = registry.histogram('bench_seconds', 'bench')
+
+    def inc(n):
+        for _ in range(n):
+            counter.inc()
+
+    def observe(n):
+        for _ in range(n):
+            histogram.observe(0.000042)
+
+    def loop(n):
+        for _ in range(n):
+            pass
+
+    baseline = per_call_ns(loop, count)
+    print(f"Counter.inc:        {per_call_ns(inc, count) - baseline:6.0f} ns/call, "
+          f"{threaded_ns(inc, count, threads) - baseline:6.0f} ns/call across {threads} threads")
+    print(f"Histogram.observe:  {per_call_ns(observe, count) - baseline:6.0f} ns/call, "
+          f"{threaded_ns(observe, count, threads) - baseline:6.0f} ns/call across {threads} threads")
+
+    real = ingest_pipeline.SUBMIT_SECONDS
+    bare = min(submit_ns(count, NullHistogram()) for _ in range(3))
+    instrumented = min(submit_ns(count, real) for _ in range(3))
+    ingest_pipeline.SUBMIT_SECONDS = real
+    print(f"pipeline.submit:    {bare:6.0f} ns bare, {instrumented:6.0f} ns instrumented "
+          f"(+{instrumented - bare:.0f} ns on the network thread)")
+
+    # submit + queue wait + process observations for one message
+    per_message = 3 * (per_call_ns(observe, count) - baseline)
+    verdict = 'under' if per_message < 1000 else 'OVER'
+    print(f"per message:        {per_message:6.0f} ns of instrumentation ({verdict} the 1 us budget)")
+
+    start = time.perf_counter()
+    body = registry.render()
+    print(f"render:             {(time.perf_counter() - start) * 1e6:.0f} us for {len(body)} bytes")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""Benchmark /api/sensors throughput as HTTP worker processes are added.
+
+For each worker count, starts `python multiprocess.py`, seeds the shared
+sensor table with synthetic readings and keeps updating it at a fixed rate.
+The updates stand in for the ingest process, since no broker is needed.
+Load-generator processes then hammer /api/sensors.
+
+Reports requests/s per worker count, and the scaling efficiency relative to
+a single worker (1.0 means linear). Throughput can only scale with spare
+cores; the load generators share the machine. server_cpu_us_per_request is
+the CPU the backend processes spent per request. If it stays flat as workers
+are added, they are not contending with each other, so throughput is bounded
+by cores rather than by the design. That is the number to compare on a
+single-core host.
+
+Usage: python benchmarks/bench_multiprocess.py [max_workers] [duration_s] [clients] [updates_per_s]
+"""
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+import psutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PORT = 5056
+TABLE_NAME = 'smartcam_bench_sensors'
+SECTORS = ['building_a', 'building_b', 'library', 'cafeteria', 'parking', 'lab']
+SENSORS = ['temperature', 'humidity', 'light', 'motion', 'co2', 'noise', 'door', 'power']
+
+def load_client(duration, results):
+    """Issue GET /api/sensors on one keep-alive connection for `duration` seconds"""
+    done = 0
+    errors = 0
+    conn = http.client.HTTPConnection('127.0.0.1', PORT, timeout=10)
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        try:
+            conn.request('GET', '/api/sensors')
+            response = conn.getresponse()
+            response.read()
+            if response.status == 200:
+                done += 1
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', PORT, timeout=10)
+    results.put((done, errors))
+
+def wait_for_server(timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', PORT, timeout=2)
+            conn.request('GET', '/')
+            if conn.getresponse().status == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.5)
+    return False
+
+def feed_table(stop, updates_per_second):
+    from shared_state import SharedSensorTable
+
+    table = SharedSensorTable.attach(TABLE_NAME, writable=True)
+    rng = random.Random(7)
+    for sector in SECTORS:
+        for sensor in SENSORS:
+            table.update(sector, sensor, round(rng.uniform(0, 100), 2), 'u')
+    interval = 1.0 / updates_per_second if updates_per_second else None
+    while not stop.is_set():
+        if interval is None:
+            stop.wait(0.5)
+            continue
+        table.update(rng.choice(SECTORS), rng.choice(SENSORS), round(rng.uniform(0, 100), 2), 'u')
+        stop.wait(interval)
+    table.close()
+
+def server_cpu_time(launcher):
+    """CPU seconds used so far by the launcher's ingest and worker processes"""
+    total = 0.0
+    for child in psutil.Process(launcher.pid).children(recursive=True):
+        try:
+            times = child.cpu_times()
+        except psutil.NoSuchProcess:
+            continue
+        total += times.user + times.system
+    return total
+
+def run(workers, duration, clients, updates_per_second):
+    env = dict(os.environ,
+               HTTP_WORKERS=str(workers),
+               FLASK_PORT=str(PORT),
+               FLASK_DEBUG='False',
+               SENSOR_TABLE_NAME=TABLE_NAME,
+               MESSAGE_HUB_ADDRESS=f"/tmp/smartcam-bench-hub-{os.getpid()}.sock")
+    launcher = subprocess.Popen([sys.executable, 'multiprocess.py'], cwd=BACKEND_DIR, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    stop = threading.Event()
+    feeder = None
+    try:
+        if not wait_for_server():
+            return {'workers': workers, 'error': 'server did not start'}
+
+        feeder = threading.Thread(target=feed_table, args=(stop, updates_per_second), daemon=True)
+        feeder.start()
+        time.sleep(1)
+
+        results = multiprocessing.Queue()
+        loaders = [multiprocessing.Process(target=load_client, args=(duration, results))
+                   for _ in range(clients)]
+        cpu_start = server_cpu_time(launcher)
+        for loader in loaders:
+            loader.start()
+        totals = [results.get() for _ in loaders]
+        cpu_used = server_cpu_time(launcher) - cpu_start
+        for loader in loaders:
+            loader.join()
+
+        done = sum(t[0] for t in totals)
+        errors = sum(t[1] for t in totals)
+        return {
+            'workers': workers,
+            'requests': done,
+            'errors': errors,
+            'requests_per_second': round(done / duration, 1),
+            'server_cpu_us_per_request': round(cpu_used / done * 1e6, 1) if done else None
+        }
+    finally:
+        stop.set()
+        if feeder is not None:
+            feeder.join()
+        launcher.terminate()
+        try:
+            launcher.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            launcher.kill()
+
+def main():
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else min(4, os.cpu_count() or 1)
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    clients = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+    updates_per_second = float(sys.argv[4]) if len(sys.argv) > 4 else 50
+
+    counts = []
+    workers = 1
+    while workers <= max_workers:
+        counts.append(workers)
+        workers *= 2
+    if counts[-1] != max_workers:
+        counts.append(max_workers)
+
+    results = []
+    for workers in counts:
+        result = run(workers, duration, clients, updates_per_second)
+        results.append(result)
+        print(f"{workers} worker(s): {result.get('requests_per_second')} req/s, "
+              f"{result.get('server_cpu_us_per_request')} us server CPU/request "
+              f"({result.get('errors', 0)} errors)")
+
+    baseline = results[0].get('requests_per_second')
+    for result in results:
+        if baseline and 'requests_per_second' in result:
+            result['scaling_efficiency'] = round(
+                result['requests_per_second'] / (baseline * result['workers']), 3)
+
+    print(json.dumps({
+        'benchmark': 'multiprocess_rest',
+        'duration_s': duration,
+        'clients': clients,
+        'updates_per_second': updates_per_second,
+        'cpu_count': os.cpu_count(),
+        'results': results
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
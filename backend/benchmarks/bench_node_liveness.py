@@ -0,0 +1,112 @@
+"""Benchmark ESP32 node staleness detection: hashed timer wheel vs a full scan per tick.
+
+Simulates `nodes` nodes, each reporting every `period` seconds, on a fake
+monotonic clock. Partway through, 1% of the nodes go silent. Both detectors
+see the same messages and are checked once per tick:
+
+- wheel: NodeLiveness, one wheel entry per online node, re-armed lazily
+- scan: every tick compares every node's last-seen time with the timeout
+
+Reports the per-message cost, the checking cost per tick and how long each
+detector took to notice the silent nodes.
+
+Usage: python benchmarks/bench_node_liveness.py [nodes] [period_s] [duration_s] [timeout_s]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+logging.disable(logging.WARNING)
+
+from node_liveness import NodeLiveness
+
+SECTORS = ['building_a', 'building_b', 'parking', 'park']
+
+def full_scan(last_seen, offline, now, timeout):
+    """The naive detector: look at every node every tick"""
+    found = []
+    for node, seen in last_seen.items():
+        if node not in offline and now - seen >= timeout:
+            offline.add(node)
+            found.append(node)
+    return found
+
+def main():
+    nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    period = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    duration = float(sys.argv[3]) if len(sys.argv) > 3 else 300
+    timeout = float(sys.argv[4]) if len(sys.argv) > 4 else 30
+
+    tick = 1.0
+    base = time.monotonic()
+    went_offline = {}
+    liveness = NodeLiveness(on_change=lambda name, event: went_offline.setdefault(event['node'], None),
+                            timeout=timeout, tick=tick)
+    keys = [(SECTORS[i % 4], f"node{i}/temperature") for i in range(nodes)]
+    ids = [f"{sector}/node{i}" for i, (sector, _) in enumerate(keys)]
+    silent = set(range(0, nodes, 100))
+    silent_at = duration / 3
+
+    last_seen = {}
+    scan_offline = set()
+    scan_found = {}
+    wheel_found = {}
+    seen_time = scan_time = check_time = 0.0
+    messages = 0
+    ticks = int(duration / tick)
+
+    for step in range(ticks):
+        start_t = step * tick
+        # Nodes are staggered across the period so each tick carries an even share
+        due = [i for i in range(nodes) if int((i * period / nodes + start_t) // period) !=
+               int((i * period / nodes + start_t - tick) // period) or step == 0]
+        for i in due:
+            if start_t >= silent_at and i in silent:
+                continue
+            now = base + start_t + (i % 1000) / 1000 * tick
+            sector, sensor = keys[i]
+            start = time.perf_counter()
+            liveness.seen(sector, sensor, now)
+            seen_time += time.perf_counter() - start
+            last_seen[ids[i]] = now
+            messages += 1
+
+        now = base + start_t + tick
+        start = time.perf_counter()
+        for node in full_scan(last_seen, scan_offline, now, timeout):
+            scan_found[node] = start_t + tick
+        scan_time += time.perf_counter() - start
+
+        went_offline.clear()
+        start = time.perf_counter()
+        liveness.check(now)
+        check_time += time.perf_counter() - start
+        for node in went_offline:
+            wheel_found[node] = start_t + tick
+
+    silent_ids = {ids[i] for i in silent}
+    print(json.dumps({
+        'nodes': nodes,
+        'period_s': period,
+        'timeout_s': timeout,
+        'messages': messages,
+        'seen_us_per_message': round(seen_time / messages * 1e6, 3),
+        'wheel_check_us_per_tick': round(check_time / ticks * 1e6, 1),
+        'scan_check_us_per_tick': round(scan_time / ticks * 1e6, 1),
+        'silent_nodes': len(silent_ids),
+        'wheel_detected': len(set(wheel_found) & silent_ids),
+        'scan_detected': len(set(scan_found) & silent_ids),
+        'false_offline': len(set(wheel_found) - silent_ids),
+        'wheel_max_detect_s': round(max(wheel_found[n] for n in silent_ids if n in wheel_found) - silent_at, 1)
+        if wheel_found else None,
+        'scan_max_detect_s': round(max(scan_found[n] for n in silent_ids if n in scan_found) - silent_at, 1)
+        if scan_found else None,
+        'liveness': liveness.get_stats()
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Microbenchmark MQTT payload codecs on realistic ESP32 sensor payloads.
+
+Usage: python benchmarks/bench_payload_codecs.py [iterations]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from payload_codecs import CodecRegistry
+
+PAYLOADS = {
+    'reading': {'value': 23.47, 'unit': 'C', 'active': True},
+    'node_report': {
+        'node': 'ESP32-Node-01', 'seq': 184467, 'rssi': -61, 'uptime': 863412,
+        'readings': [
+            {'sensor': 'temperature', 'value': 23.47, 'unit': 'C'},
+            {'sensor': 'humidity', 'value': 58.2, 'unit': '%'},
+            {'sensor': 'light', 'value': 412, 'unit': 'lux'},
+            {'sensor': 'motion', 'value': 0, 'unit': ''},
+            {'sensor': 'co2', 'value': 618, 'unit': 'ppm'}
+        ]
+    }
+}
+
+def bench(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e9
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    registry = CodecRegistry(topic_codecs={})
+    names = [name for name in ('stdlib_json', 'orjson', 'msgpack', 'cbor') if name in registry.codecs]
+
+    for label, payload in PAYLOADS.items():
+        print(f"{label}:")
+        for name in names:
+            codec = registry.codecs[name]
+            data = codec.encode(payload)
+            assert codec.decode(data) == payload
+            encode_ns = bench(lambda: codec.encode(payload), iterations)
+            decode_ns = bench(lambda: codec.decode(data), iterations)
+            print(f"  {name:12s} {len(data):4d} bytes  encode {encode_ns:6.0f} ns  decode {decode_ns:6.0f} ns")
+
+        # Full dispatch path as used by MQTTHandler (marker byte lookup + decode)
+        for name in names:
+            data = registry.encode('campus/building_a/temperature', payload, name)
+            assert registry.decode('campus/building_a/temperature', data) == payload
+            dispatch_ns = bench(lambda: registry.decode('campus/building_a/temperature', data), iterations)
+            print(f"  registry.decode of a {name} frame: {dispatch_ns:6.0f} ns")
+
+if __name__ == '__main__':
+    main()
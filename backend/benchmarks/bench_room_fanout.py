@@ -0,0 +1,106 @@
+"""Benchmark per-sector Socket.IO rooms against broadcasting every sensor batch.
+
+200 simulated clients: a quarter subscribe to everything, half to one
+sector and a quarter to two sectors. Ticks of random sensor updates are
+flushed through EmitScheduler. A fake server does the room fan-out and
+counts the frames and JSON bytes each client would receive.
+
+- broadcast: the old behaviour, every client gets every update
+- rooms: SubscriptionRegistry rooms, one frame per distinct sector set
+
+Usage: python benchmarks/bench_room_fanout.py [clients] [ticks] [updates_per_tick]
+"""
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+logging.disable(logging.INFO)
+
+from emit_scheduler import EmitScheduler
+from subscriptions import SubscriptionRegistry
+
+class FanoutServer:
+    """Stands in for the Socket.IO server: room membership plus per-client accounting"""
+
+    def __init__(self, sids):
+        self.sids = list(sids)
+        self.rooms = {}
+        self.frames = dict.fromkeys(self.sids, 0)
+        self.bytes = dict.fromkeys(self.sids, 0)
+        self.encode_time = 0.0
+
+    def join(self, sid, room):
+        self.rooms.setdefault(room, set()).add(sid)
+
+    def emit(self, event, data, to=None):
+        start = time.perf_counter()
+        size = len(json.dumps([event, data]))
+        self.encode_time += time.perf_counter() - start
+        for sid in (self.sids if to is None else self.rooms.get(to, ())):
+            self.frames[sid] += 1
+            self.bytes[sid] += size
+
+def run(clients, ticks, updates_per_tick, use_rooms):
+    registry = SubscriptionRegistry(local=True)
+    sectors = list(registry.sectors)
+    sids = [f"client{i}" for i in range(clients)]
+    server = FanoutServer(sids)
+    rng = random.Random(11)
+
+    subscribed = {}
+    for i, sid in enumerate(sids):
+        if i % 4 == 0:
+            chosen = None
+        elif i % 4 == 3:
+            chosen = rng.sample(sectors, 2)
+        else:
+            chosen = [sectors[i % len(sectors)]]
+        join, _, subscription = registry.subscribe(sid, chosen, ['sensors'])
+        for room in join:
+            server.join(sid, room)
+        subscribed[sid] = len(subscription['sectors'])
+
+    scheduler = EmitScheduler(socketio=server, interval=0.1, rooms=registry.sensor_rooms if use_rooms else None)
+    for _ in range(ticks):
+        for _ in range(updates_per_tick):
+            sector = rng.choice(sectors)
+            sensor = f"node{rng.randrange(200)}/temperature"
+            scheduler.queue_update(sector, sensor, {'value': round(rng.uniform(15, 35), 2), 'unit': 'C',
+                                                    'active': True, 'timestamp': '2025-01-01T00:00:00'})
+        scheduler.flush()
+
+    def summary(selector):
+        group = [sid for sid in sids if selector(subscribed[sid])]
+        return {
+            'clients': len(group),
+            'frames_per_client': round(sum(server.frames[sid] for sid in group) / len(group), 1),
+            'kb_per_client': round(sum(server.bytes[sid] for sid in group) / len(group) / 1024, 1)
+        }
+
+    return {
+        'all_sectors': summary(lambda n: n == len(sectors)),
+        'two_sectors': summary(lambda n: n == 2),
+        'one_sector': summary(lambda n: n == 1),
+        'total_mb_sent': round(sum(server.bytes.values()) / 1048576, 2),
+        'server_encode_ms_per_tick': round(server.encode_time / ticks * 1000, 3)
+    }
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    updates = int(sys.argv[3]) if len(sys.argv) > 3 else 40
+    print(json.dumps({
+        'clients': clients,
+        'ticks': ticks,
+        'updates_per_tick': updates,
+        'broadcast': run(clients, ticks, updates, use_rooms=False),
+        'rooms': run(clients, ticks, updates, use_rooms=True)
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""Benchmark how many concurrent socket clients each server mode holds.
+
+Starts the backend as a subprocess pinned to a fixed set of cores (4 by
+default, to stand in for a Pi-class box). It then ramps up headless
+python-socketio clients in steps. After every step it reports how many
+clients are still connected, the round-trip time of a request_system_stats
+call, and the server's threads, CPU and RSS.
+
+The ramp stops at max_clients, when more than 1% of a step fails to
+connect, or when the round trip exceeds 1s.
+
+Modes:
+- threading: python app.py (Flask-SocketIO, async_mode='threading')
+- asgi: python asgi_app.py (python-socketio AsyncServer on uvicorn)
+
+No MQTT broker is needed; the MQTT client just keeps retrying.
+
+Usage: python benchmarks/bench_socket_clients.py [mode|both] [max_clients] [step] [cores]
+Requires: python-socketio[asyncio_client] (aiohttp), psutil
+"""
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import socketio
+    import aiohttp  # noqa: F401 - websocket transport for AsyncClient
+except ImportError:
+    print("python-socketio and aiohttp are required: pip install 'python-socketio[asyncio_client]'")
+    sys.exit(1)
+
+import psutil
+
+ENTRY_POINTS = {
+    'threading': 'app.py',
+    'asgi': 'asgi_app.py'
+}
+PORT = 5055
+MAX_FAILURE_RATE = 0.01
+MAX_ROUND_TRIP = 1.0
+
+def start_server(mode, cores):
+    env = dict(os.environ, FLASK_PORT=str(PORT), FLASK_DEBUG='False')
+    process = subprocess.Popen(
+        [sys.executable, ENTRY_POINTS[mode]],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    available = sorted(os.sched_getaffinity(0))
+    os.sched_setaffinity(process.pid, available[:cores])
+    # Keep the clients off the server's cores when the machine has spare ones
+    if len(available) > cores:
+        os.sched_setaffinity(0, available[cores:])
+    return process
+
+async def wait_for_server(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(url + '/') as response:
+                    if response.status == 200:
+                        return True
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.5)
+    return False
+
+async def open_client(url):
+    client = socketio.AsyncClient(reconnection=False)
+    try:
+        await client.connect(url, transports=['websocket'], wait_timeout=10)
+        return client
+    except Exception:
+        return None
+
+async def round_trip(client):
+    """Time request_system_stats -> system_stats on one client"""
+    received = asyncio.get_running_loop().create_future()
+
+    def on_stats(data):
+        if not received.done():
+            received.set_result(time.perf_counter())
+
+    client.on('system_stats', on_stats)
+    start = time.perf_counter()
+    await client.emit('request_system_stats')
+    try:
+        return await asyncio.wait_for(received, MAX_ROUND_TRIP * 5) - start
+    except asyncio.TimeoutError:
+        return None
+
+def server_usage(process):
+    with process.oneshot():
+        return {
+            'threads': process.num_threads(),
+            'rss_mb': round(process.memory_info().rss / 1048576, 1),
+            'cpu_percent': process.cpu_percent(interval=1.0)
+        }
+
+async def run_mode(mode, max_clients, step, cores):
+    url = f"http://127.0.0.1:{PORT}"
+    server = start_server(mode, cores)
+    usage_process = psutil.Process(server.pid)
+    clients = []
+    steps = []
+    attempted = 0
+    held = 0
+
+    try:
+        if not await wait_for_server(url):
+            return {'mode': mode, 'error': 'server did not start'}
+
+        while attempted < max_clients:
+            batch = min(step, max_clients - attempted)
+            opened = await asyncio.gather(*(open_client(url) for _ in range(batch)))
+            connected = [client for client in opened if client is not None]
+            clients.extend(connected)
+            attempted += batch
+            await asyncio.sleep(2)
+
+            alive = [client for client in clients if client.connected]
+            rtt = await round_trip(alive[0]) if alive else None
+            usage = server_usage(usage_process)
+            failure_rate = 1 - len(connected) / batch
+            steps.append({
+                'attempted': attempted,
+                'connected': len(alive),
+                'step_failure_rate': round(failure_rate, 4),
+                'round_trip_ms': round(rtt * 1000, 2) if rtt is not None else None,
+                **usage
+            })
+            print(f"[{mode}] {len(alive)} connected, rtt "
+                  f"{steps[-1]['round_trip_ms']} ms, {usage['threads']} threads, "
+                  f"{usage['rss_mb']} MB, {usage['cpu_percent']}% CPU")
+
+            if failure_rate > MAX_FAILURE_RATE or rtt is None or rtt > MAX_ROUND_TRIP:
+                break
+            held = len(alive)
+    finally:
+        await asyncio.gather(*(client.disconnect() for client in clients), return_exceptions=True)
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    return {'mode': mode, 'cores': cores, 'max_clients_held': held, 'steps': steps}
+
+def main():
+    mode = sys.argv[1] if len(sys.argv) > 1 else 'both'
+    max_clients = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    step = int(sys.argv[3]) if len(sys.argv) > 3 else 250
+    cores = int(sys.argv[4]) if len(sys.argv) > 4 else 4
+    modes = list(ENTRY_POINTS) if mode == 'both' else [mode]
+
+    # Every client holds a socket; make sure the benchmark process can open them
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    results = [asyncio.run(run_mode(m, max_clients, step, cores)) for m in modes]
+
+    print(json.dumps({'benchmark': 'socket_clients', 'results': results}, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""Minimal in-memory MQTT 3.1.1 broker for offline benchmarks.
+
+Supports CONNECT, SUBSCRIBE/UNSUBSCRIBE with '+' and '#' wildcards, PUBLISH
+at QoS 0/1 (delivered to subscribers at QoS 0), PINGREQ and DISCONNECT.
+There are no retained messages, sessions or authentication; it only has to
+be fast enough not to be the bottleneck.
+
+Usage: python benchmarks/broker_standin.py [port]
+"""
+import asyncio
+import struct
+import sys
+
+CONNECT = 1
+PUBLISH = 3
+PUBACK = 4
+SUBSCRIBE = 8
+UNSUBSCRIBE = 10
+PINGREQ = 12
+DISCONNECT = 14
+
+def encode_length(length):
+    out = bytearray()
+    while True:
+        byte = length % 128
+        length //= 128
+        if length:
+            byte |= 0x80
+        out.append(byte)
+        if not length:
+            return bytes(out)
+
+def encode_string(text):
+    data = text.encode()
+    return struct.pack('!H', len(data)) + data
+
+def packet(first_byte, body):
+    return bytes([first_byte]) + encode_length(len(body)) + body
+
+def publish_packet(topic, payload, qos=0, packet_id=0):
+    body = encode_string(topic)
+    if qos:
+        body += struct.pack('!H', packet_id)
+    return packet(0x30 | (qos << 1), body + payload)
+
+def connect_packet(client_id, keepalive=60):
+    body = encode_string('MQTT') + bytes([4, 0x02]) + struct.pack('!H', keepalive) + encode_string(client_id)
+    return packet(0x10, body)
+
+def subscribe_packet(packet_id, topic, qos=0):
+    return packet(0x82, struct.pack('!H', packet_id) + encode_string(topic) + bytes([qos]))
+
+async def read_packet(reader):
+    """Return (type, flags, body) or None at EOF"""
+    header = await reader.read(1)
+    if not header:
+        return None
+    length = 0
+    multiplier = 1
+    while True:
+        byte = (await reader.readexactly(1))[0]
+        length += (byte & 0x7F) * multiplier
+        if not byte & 0x80:
+            break
+        multiplier *= 128
+    body = await reader.readexactly(length) if length else b''
+    return header[0] >> 4, header[0] & 0x0F, body
+
+def topic_matches(pattern, topic):
+    pattern_parts = pattern.split('/')
+    topic_parts = topic.split('/')
+    for i, part in enumerate(pattern_parts):
+        if part == '#':
+            return True
+        if i >= len(topic_parts) or (part != '+' and part != topic_parts[i]):
+            return False
+    return len(pattern_parts) == len(topic_parts)
+
+class BrokerStandin:
+    def __init__(self):
+        # writer -> set of subscribed patterns
+        self.subscriptions = {}
+        # topic -> list of writers, rebuilt whenever subscriptions change
+        self.route_cache = {}
+        self.received = 0
+        self.delivered = 0
+
+    def subscribers(self, topic):
+        writers = self.route_cache.get(topic)
+        if writers is None:
+            writers = [writer for writer, patterns in self.subscriptions.items()
+                       if any(topic_matches(pattern, topic) for pattern in patterns)]
+            self.route_cache[topic] = writers
+        return writers
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                item = await read_packet(reader)
+                if item is None:
+                    break
+                kind, flags, body = item
+
+                if kind == PUBLISH:
+                    qos = (flags >> 1) & 0x03
+                    topic_length = struct.unpack_from('!H', body)[0]
+                    topic = body[2:2 + topic_length].decode()
+                    offset = 2 + topic_length
+                    if qos:
+                        packet_id = body[offset:offset + 2]
+                        offset += 2
+                        writer.write(packet(0x40, packet_id))
+                    self.received += 1
+                    frame = publish_packet(topic, body[offset:])
+                    for subscriber in self.subscribers(topic):
+                        subscriber.write(frame)
+                        self.delivered += 1
+                    if writer.transport.get_write_buffer_size() > 1 << 20:
+                        await writer.drain()
+                elif kind == CONNECT:
+                    writer.write(packet(0x20, b'\x00\x00'))
+                elif kind == SUBSCRIBE:
+                    packet_id = body[:2]
+                    offset = 2
+                    granted = bytearray()
+                    patterns = self.subscriptions.setdefault(writer, set())
+                    while offset < len(body):
+                        length = struct.unpack_from('!H', body, offset)[0]
+                        patterns.add(body[offset + 2:offset + 2 + length].decode())
+                        offset += 2 + length + 1
+                        granted.append(0)
+                    self.route_cache.clear()
+                    writer.write(packet(0x90, packet_id + bytes(granted)))
+                elif kind == UNSUBSCRIBE:
+                    packet_id = body[:2]
+                    offset = 2
+                    patterns = self.subscriptions.get(writer, set())
+                    while offset < len(body):
+                        length = struct.unpack_from('!H', body, offset)[0]
+                        patterns.discard(body[offset + 2:offset + 2 + length].decode())
+                        offset += 2 + length
+                    self.route_cache.clear()
+                    writer.write(packet(0xB0, packet_id))
+                elif kind == PINGREQ:
+                    writer.write(b'\xd0\x00')
+                elif kind == DISCONNECT:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if self.subscriptions.pop(writer, None) is not None:
+                self.route_cache.clear()
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=1883):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        async with server:
+            await server.serve_forever()
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 1883
+    print(f"MQTT broker stand-in listening on 127.0.0.1:{port}", flush=True)
+    try:
+        asyncio.run(BrokerStandin().serve(port=port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
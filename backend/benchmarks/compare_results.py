@@ -0,0 +1,56 @@
+"""Compare two bench_end_to_end.py result files.
+
+Prints the headline metrics of each phase side by side with the relative
+change. Latency, CPU and RSS are better when lower; throughput is better
+when higher.
+
+Usage: python benchmarks/compare_results.py baseline.json candidate.json
+"""
+import json
+import sys
+
+# (label, path within a phase, higher is better)
+METRICS = [
+    ('latency p50 (ms)', ('latency', 'p50_ms'), False),
+    ('latency p99 (ms)', ('latency', 'p99_ms'), False),
+    ('updates received', ('updates_received',), True),
+    ('REST req/s', ('rest_requests_per_second',), True),
+    ('backend CPU avg (%)', ('backend_cpu_percent', 'avg'), False),
+    ('backend RSS max (MB)', ('backend_rss_mb', 'max'), False)
+]
+
+def lookup(data, path):
+    for key in path:
+        if not isinstance(data, dict) or key not in data:
+            return None
+        data = data[key]
+    return data
+
+def main():
+    if len(sys.argv) != 3:
+        print(__doc__)
+        sys.exit(1)
+    with open(sys.argv[1]) as f:
+        baseline = json.load(f)
+    with open(sys.argv[2]) as f:
+        candidate = json.load(f)
+
+    print(f"baseline {baseline.get('commit')} vs candidate {candidate.get('commit')}")
+    if baseline.get('params') != candidate.get('params'):
+        print("warning: runs used different parameters")
+
+    for phase in ('fanout', 'rest'):
+        print(f"\n[{phase}]")
+        print(f"{'metric':<24}{'baseline':>12}{'candidate':>12}{'change':>10}")
+        for label, path, higher_is_better in METRICS:
+            old = lookup(baseline.get('phases', {}).get(phase), path)
+            new = lookup(candidate.get('phases', {}).get(phase), path)
+            change = ''
+            if old and new is not None:
+                delta = (new - old) / old * 100
+                better = delta > 0 if higher_is_better else delta < 0
+                change = f"{delta:+.1f}%{' ✓' if better and abs(delta) >= 5 else ''}"
+            print(f"{label:<24}{str(old):>12}{str(new):>12}{change:>10}")
+
+if __name__ == '__main__':
+    main()
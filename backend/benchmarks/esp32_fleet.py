@@ -0,0 +1,133 @@
+"""Synthetic ESP32 fleet: thousands of virtual sensor nodes publishing over MQTT.
+
+Virtual nodes are multiplexed over a small number of raw MQTT connections,
+so a fleet of 5000 nodes does not need 5000 sockets. Each node publishes
+to campus/<sector>/node<id>/<sensor> at `rate` messages per second.
+Publishes are paced and their start times jittered, so the load is
+smooth rather than bursty.
+
+The reading's `value` is the wall-clock send time, and `unit` is 'ts'.
+That lets a socket client on the same host measure publish -> emit
+latency from the sensor updates alone.
+
+Usage: python benchmarks/esp32_fleet.py [nodes] [rate_per_node] [duration_s] [host] [port]
+"""
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from broker_standin import connect_packet, publish_packet
+
+# Sectors from Config.MQTT_TOPICS, so every reading is routed
+SECTORS = ['building_a', 'building_b', 'parking', 'park']
+SENSORS = ['temperature', 'humidity', 'light', 'motion']
+
+class ESP32Fleet:
+    def __init__(self, nodes=1000, rate=1.0, connections=None, host='127.0.0.1', port=1883, qos=0):
+        self.nodes = nodes
+        self.rate = rate
+        self.connections = connections or max(1, min(64, nodes // 100))
+        self.host = host
+        self.port = port
+        self.qos = qos
+        self.published = 0
+        self.errors = 0
+        self.running = False
+
+    def topics(self, connection_index):
+        """Topics of the virtual nodes assigned to one connection"""
+        topics = []
+        for node in range(connection_index, self.nodes, self.connections):
+            sector = SECTORS[node % len(SECTORS)]
+            sensor = SENSORS[node // len(SECTORS) % len(SENSORS)]
+            topics.append(f"campus/{sector}/node{node}/{sensor}")
+        return topics
+
+    async def run_connection(self, index, duration):
+        topics = self.topics(index)
+        if not topics:
+            return
+        try:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        except OSError:
+            self.errors += 1
+            return
+
+        writer.write(connect_packet(f"fleet-{os.getpid()}-{index}"))
+        await reader.readexactly(4)
+
+        # Drain PUBACKs so the broker's send buffer never fills
+        async def discard_acks():
+            try:
+                while await reader.read(65536):
+                    pass
+            except ConnectionError:
+                pass
+        ack_task = asyncio.get_running_loop().create_task(discard_acks())
+
+        interval = 1.0 / (self.rate * len(topics))
+        rng = random.Random(index)
+        await asyncio.sleep(rng.uniform(0, interval))
+        next_send = time.monotonic()
+        end = next_send + duration
+        packet_id = 0
+        position = 0
+
+        try:
+            while self.running and time.monotonic() < end:
+                topic = topics[position]
+                position = (position + 1) % len(topics)
+                payload = json.dumps({'value': time.time(), 'unit': 'ts', 'active': True}).encode()
+                packet_id = packet_id % 65535 + 1
+                writer.write(publish_packet(topic, payload, self.qos, packet_id))
+                self.published += 1
+
+                next_send += interval
+                delay = next_send - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                elif position == 0:
+                    # Falling behind: yield once per round so the loop stays responsive
+                    await asyncio.sleep(0)
+                if writer.transport.get_write_buffer_size() > 1 << 20:
+                    await writer.drain()
+        except ConnectionError:
+            self.errors += 1
+        finally:
+            ack_task.cancel()
+            writer.close()
+
+    async def run(self, duration):
+        self.running = True
+        await asyncio.gather(*(self.run_connection(i, duration) for i in range(self.connections)))
+        self.running = False
+
+    def stop(self):
+        self.running = False
+
+def main():
+    nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    duration = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+    host = sys.argv[4] if len(sys.argv) > 4 else '127.0.0.1'
+    port = int(sys.argv[5]) if len(sys.argv) > 5 else 1883
+
+    fleet = ESP32Fleet(nodes, rate, host=host, port=port)
+    start = time.perf_counter()
+    asyncio.run(fleet.run(duration))
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        'nodes': nodes,
+        'target_rate': nodes * rate,
+        'published': fleet.published,
+        'achieved_rate': round(fleet.published / elapsed, 1),
+        'errors': fleet.errors
+    }))
+
+if __name__ == '__main__':
+    main()
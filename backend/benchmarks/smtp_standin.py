@@ -0,0 +1,106 @@
+"""Minimal SMTP responder for offline benchmarks.
+
+Speaks enough SMTP for smtplib: EHLO/HELO (no AUTH, no STARTTLS), MAIL,
+RCPT, DATA, RSET, NOOP and QUIT. Messages are counted and kept in memory.
+Failures can be injected to exercise the client's retry path: the next N
+messages are answered with a 451, or their connection is dropped before the
+reply.
+
+Usage: python benchmarks/smtp_standin.py [port]
+"""
+import email
+import email.policy
+import socketserver
+import sys
+import threading
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        self.reply('220 smtp-standin ready')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command == b'EHLO':
+                self.wfile.write(b'250-smtp-standin\r\n250 8BITMIME\r\n')
+            elif command == b'HELO':
+                self.reply('250 smtp-standin')
+            elif command in (b'MAIL', b'RCPT', b'RSET', b'NOOP'):
+                self.reply('250 OK')
+            elif command == b'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data:
+                        return
+                    if data == b'.\r\n':
+                        break
+                    lines.append(data[1:] if data.startswith(b'..') else data)
+                failure = server.take_failure()
+                if failure == 'drop':
+                    return
+                if failure == 'reject':
+                    self.reply('451 Temporary failure, try again')
+                    continue
+                server.store(b''.join(lines))
+                self.reply('250 OK')
+            elif command == b'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+class SMTPStandin(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), SMTPHandler)
+        self.lock = threading.Lock()
+        self.messages = []
+        self.failures = []
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def fail_next(self, count, mode='reject'):
+        """Answer the next `count` messages with a 451 ('reject') or by closing the connection ('drop')"""
+        with self.lock:
+            self.failures.extend([mode] * count)
+
+    def take_failure(self):
+        with self.lock:
+            return self.failures.pop(0) if self.failures else None
+
+    def store(self, content):
+        with self.lock:
+            self.messages.append(content)
+
+    def parsed(self):
+        """Received messages as email.message.EmailMessage objects"""
+        with self.lock:
+            messages = list(self.messages)
+        return [email.message_from_bytes(content, policy=email.policy.default) for content in messages]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8025
+    server = SMTPStandin(port=port)
+    print(f"SMTP stand-in listening on 127.0.0.1:{server.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
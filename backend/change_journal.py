@@ -0,0 +1,72 @@
+import os
+import threading
+from collections import deque
+from config import Config
+
+def group_changes(changes):
+    """Turn journal entries into a delta payload shaped like a full snapshot"""
+    delta = {'full': False, 'sensors': {}, 'blocked': [], 'unblocked': [], 'attacks': []}
+    for seq, kind, key, value in changes:
+        if kind == 'sensor':
+            delta['sensors'].setdefault(key[0], {})[key[1]] = value
+        elif kind == 'blocked_ip':
+            delta['blocked' if value else 'unblocked'].append(key)
+        elif kind == 'attack':
+            delta['attacks'].append({**value, 'seq': seq})
+    return delta
+
+class ChangeJournal:
+    """Bounded log of state changes, each stamped with a sequence number.
+
+    Sequence numbers increase by one per change, so a client that has seen
+    up to seq N can be sent every later change. The epoch is new for every
+    process start; a client holding a cursor from an earlier epoch, or one
+    older than the journal keeps, needs a full snapshot instead.
+    """
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity or Config.SYNC_JOURNAL_SIZE
+        self.epoch = os.urandom(4).hex()
+        self.entries = deque(maxlen=self.capacity)
+        self.seq = 0
+        self.lock = threading.Lock()
+        # Held from record() until the change is handed to SocketIO, so a frame's cursor never passes an unsent change
+        self.publish_lock = threading.Lock()
+        self.deltas = 0
+        self.snapshots = 0
+
+    def record(self, kind, key, value):
+        """Append a change and return its sequence number"""
+        with self.lock:
+            self.seq += 1
+            self.entries.append((self.seq, kind, key, value))
+            return self.seq
+
+    def since(self, seq, epoch=None):
+        """Return (current seq, changes after seq with only the latest per key), or None if a snapshot is needed"""
+        with self.lock:
+            current = self.seq
+            oldest = self.entries[0][0] if self.entries else current + 1
+            if seq is None or epoch != self.epoch or seq > current or seq < oldest - 1:
+                self.snapshots += 1
+                return None
+
+            latest = {}
+            for entry in reversed(self.entries):
+                if entry[0] <= seq:
+                    break
+                latest.setdefault((entry[1], entry[2]), entry)
+            self.deltas += 1
+        return current, sorted(latest.values())
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'epoch': self.epoch,
+                'seq': self.seq,
+                'entries': len(self.entries),
+                'capacity': self.capacity,
+                'oldest_seq': self.entries[0][0] if self.entries else None,
+                'deltas_served': self.deltas,
+                'snapshots_served': self.snapshots
+            }
@@ -9,11 +9,34 @@ class Config:
     FLASK_HOST = '0.0.0.0'
     FLASK_PORT = int(os.getenv('FLASK_PORT', 5000))
     DEBUG = os.getenv('FLASK_DEBUG', 'True') == 'True'
+    ASGI_WSGI_WORKERS = int(os.getenv('ASGI_WSGI_WORKERS', 16))  # threads serving REST routes in asgi_app.py
+    
+    # Multi-process Deployment (multiprocess.py)
+    PROCESS_ROLE = os.getenv('PROCESS_ROLE', 'standalone')  # standalone, ingest or worker
+    HTTP_WORKERS = int(os.getenv('HTTP_WORKERS', 4))  # HTTP/socket worker processes
+    SENSOR_TABLE_NAME = os.getenv('SENSOR_TABLE_NAME', 'smartcam_sensors')  # shared memory segment
+    SENSOR_TABLE_SLOTS = int(os.getenv('SENSOR_TABLE_SLOTS', 512))  # max sensors in the shared table
+    MESSAGE_HUB_ADDRESS = os.getenv('MESSAGE_HUB_ADDRESS', '/tmp/smartcam-hub.sock')
+    INGEST_SERVICE_ADDRESS = os.getenv('INGEST_SERVICE_ADDRESS', '/tmp/smartcam-ingest.sock')  # worker -> ingest queries
+    INGEST_QUERY_TIMEOUT = 5  # seconds a worker waits for the ingest process to answer
+    PROCESS_AUTHKEY = b''  # random per launch; multiprocess.py sets it in every process
     
     # MQTT Configuration
     MQTT_BROKER = os.getenv('MQTT_BROKER', 'localhost')
     MQTT_PORT = int(os.getenv('MQTT_PORT', 1883))
     MQTT_KEEPALIVE = 60
+    MQTT_CONTROL_QOS = int(os.getenv('MQTT_CONTROL_QOS', 1))
+    MQTT_ACK_TOPIC = 'campus/ack'  # ESP32 nodes reply here with {"cid": ..., "status": "ok"}
+    MQTT_ACK_TIMEOUT = 2.0  # seconds to wait for control acknowledgements
+    MQTT_ACK_TIMEOUT_MIN = 0.1  # shortest ack wait a bulk control request may ask for
+    MQTT_ACK_TIMEOUT_MAX = 30.0  # longest ack wait a bulk control request may ask for
+    MQTT_INGEST_WORKERS = int(os.getenv('MQTT_INGEST_WORKERS', 2))
+    MQTT_INGEST_QUEUE_SIZE = int(os.getenv('MQTT_INGEST_QUEUE_SIZE', 10000))  # messages buffered across workers
+    MQTT_INGEST_OVERFLOW = os.getenv('MQTT_INGEST_OVERFLOW', 'drop_oldest')  # drop_oldest, drop_newest or block
+    MQTT_DEFAULT_CODEC = os.getenv('MQTT_DEFAULT_CODEC', 'json')  # json, stdlib_json, orjson, msgpack or cbor
+    MQTT_TOPIC_CODECS = {
+        # Topic pattern -> codec, e.g. 'campus/+/+/bin': 'msgpack'
+    }
     MQTT_TOPICS = {
         'building_a': 'campus/building_a/#',
         'building_b': 'campus/building_b/#',
@@ -27,10 +50,27 @@ class Config:
     EMAIL_ADDRESS = os.getenv('EMAIL_ADDRESS', '')
     EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD', '')
     ADMIN_EMAIL = os.getenv('ADMIN_EMAIL', 'admin@rnsinstitute.edu.in')
+    SMTP_USE_TLS = os.getenv('SMTP_USE_TLS', 'True') == 'True'
+    SMTP_TIMEOUT = 30  # seconds
+    SMTP_IDLE_TIMEOUT = 60  # seconds before an idle connection is closed
+    EMAIL_OUTBOX_SIZE = 500  # queued messages
+    EMAIL_MAX_RETRIES = 5
+    EMAIL_RETRY_BACKOFF = 2  # seconds, doubled after each failed attempt
+    EMAIL_RETRY_BACKOFF_MAX = 120  # seconds
+    EMAIL_DIGEST_WINDOW = float(os.getenv('EMAIL_DIGEST_WINDOW', 30))  # seconds attack alerts are merged over
+    EMAIL_DIGEST_MAX_PENDING = 1000  # alerts kept for one digest; later ones are only counted by category
+    EMAIL_DIGEST_ROWS = 20  # alerts listed in a digest before a "+N more" row
     
     # Security Thresholds
     DOS_PACKET_THRESHOLD = 1000  # packets per second
+    DOS_RATE_WINDOWS = (1, 10, 60)  # seconds
+    DOS_RATE_WINDOW = 10  # window compared against DOS_PACKET_THRESHOLD
+    PACKET_SAMPLE_INTERVAL = 0.5  # seconds between net_io_counters samples
     BRUTE_FORCE_THRESHOLD = 5  # failed attempts
+    BRUTE_FORCE_WINDOW = 300  # seconds failed attempts are counted over
+    BRUTE_FORCE_TRACKER_CAPACITY = int(os.getenv('BRUTE_FORCE_TRACKER_CAPACITY', 20000))  # source IPs tracked
+    SYN_FLOOD_THRESHOLD = 200  # half-open (SYN_RECV) connections
+    CONNECTIONS_PER_IP_THRESHOLD = 100  # connections from a single remote address
     SQL_INJECTION_PATTERNS = [
         "' OR '1'='1",
         "'; DROP TABLE",
@@ -39,12 +79,73 @@ class Config:
         "<script>",
         "javascript:"
     ]
+    PAYLOAD_SIGNATURES_FILE = os.getenv('PAYLOAD_SIGNATURES_FILE', '')  # extra signatures, one per line
+    PAYLOAD_INSPECTION_BLOCK = os.getenv('PAYLOAD_INSPECTION_BLOCK', 'True') == 'True'
+    
+    # Firewall
+    FIREWALL_BACKEND = os.getenv('FIREWALL_BACKEND', 'ufw')  # ufw, ipset, nftables or memory
+    FIREWALL_SET_NAME = os.getenv('FIREWALL_SET_NAME', 'smartcam_blocked')
+    FIREWALL_FLUSH_INTERVAL = 0.2  # seconds operations are coalesced before being applied
+    FIREWALL_MAX_BATCH = 1000  # pending operations that trigger an immediate flush
+    FIREWALL_WAIT_TIMEOUT = 30  # seconds a request waits for its batch
+    # Never blocked besides loopback and the ESP32 nodes, e.g. the admin subnet; comma-separated IPs or CIDRs
+    FIREWALL_NEVER_BLOCK = [net.strip() for net in os.getenv('FIREWALL_NEVER_BLOCK', '').split(',') if net.strip()]
+    
+    # ARP Watcher
+    ARP_TABLE_PATH = os.getenv('ARP_TABLE_PATH', '/proc/net/arp')  # point at a fixture file to replay a table
+    ARP_WATCH_MODE = os.getenv('ARP_WATCH_MODE', 'auto')  # netlink, poll or auto (netlink when available)
+    ARP_POLL_INTERVAL = float(os.getenv('ARP_POLL_INTERVAL', 2))  # seconds between reads in poll mode
+    ARP_RESYNC_INTERVAL = 60  # seconds between full table reads in netlink mode
+    ARP_ALERT_COOLDOWN = 300  # seconds between alerts for the same IP or MAC
+    # MACs allowed to answer for several IPs, e.g. a proxy-ARP router; comma-separated
+    ARP_SHARED_MACS = [mac.strip().lower() for mac in os.getenv('ARP_SHARED_MACS', '').split(',') if mac.strip()]
+    
+    # Attack Log
+    ATTACK_DB_PATH = os.getenv('ATTACK_DB_PATH', 'attacks.db')  # SQLite database, WAL mode
     
     # System Monitoring
     CPU_WARNING_THRESHOLD = 80  # percentage
     MEMORY_WARNING_THRESHOLD = 85  # percentage
     TEMP_WARNING_THRESHOLD = 70  # Celsius
     DISK_WARNING_THRESHOLD = 90  # percentage
+    SYSTEM_STATS_INTERVAL = float(os.getenv('SYSTEM_STATS_INTERVAL', 2))  # seconds between samples
+    PROC_NET_TCP_PATHS = ['/proc/net/tcp', '/proc/net/tcp6']
+    CONNECTION_TOP_N = 10  # remote addresses reported per sample
+    
+    # Sensor History
+    SENSOR_HISTORY_RETENTION = int(os.getenv('SENSOR_HISTORY_RETENTION', 86400))  # seconds
+    SENSOR_HISTORY_RESOLUTION = int(os.getenv('SENSOR_HISTORY_RESOLUTION', 15))  # seconds per stored bucket
+    
+    # SocketIO Fan-out
+    SOCKET_EMIT_INTERVAL = float(os.getenv('SOCKET_EMIT_INTERVAL', 0.1))  # seconds between sensor_batch frames
+    
+    # Sensor Anomaly Detection
+    ANOMALY_DETECTION = os.getenv('ANOMALY_DETECTION', 'True') == 'True'  # needs numpy
+    ANOMALY_INTERVAL = float(os.getenv('ANOMALY_INTERVAL', 0.5))  # seconds between batch scoring passes
+    ANOMALY_WINDOW = int(os.getenv('ANOMALY_WINDOW', 300))  # readings remembered by the rolling mean/variance
+    ANOMALY_MIN_SAMPLES = 30  # readings before a sensor is scored
+    ANOMALY_Z_THRESHOLD = float(os.getenv('ANOMALY_Z_THRESHOLD', 6.0))  # standard deviations that count as a spike
+    ANOMALY_STUCK_READINGS = int(os.getenv('ANOMALY_STUCK_READINGS', 600))  # identical readings in a row, 0 disables
+    ANOMALY_ALERT_COOLDOWN = 300  # seconds between alerts for the same sensor
+    ANOMALY_MAX_PENDING = 500000  # queued readings before new ones are dropped
+    
+    # Reconnect Delta Sync
+    SYNC_JOURNAL_SIZE = int(os.getenv('SYNC_JOURNAL_SIZE', 20000))  # changes kept for "changes since seq N"
+    SYNC_SNAPSHOT_ATTACKS = 50  # recent attacks included in a full snapshot
+    
+    # Response Cache
+    RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 256))  # encoded responses kept per process
+    
+    # Instrumentation
+    ROUTE_TIMING = os.getenv('ROUTE_TIMING', 'True') == 'True'  # wall/CPU histograms per route and socket event
+    PROFILER_TOKEN = os.getenv('PROFILER_TOKEN', '')  # X-Profiler-Token for /api/admin/profile; empty disables it
+    PROFILER_INTERVAL = float(os.getenv('PROFILER_INTERVAL', 0.005))  # seconds between stack samples
+    PROFILER_MAX_DURATION = 60  # seconds a single profile may run
+    
+    # ESP32 Node Liveness
+    NODE_OFFLINE_TIMEOUT = float(os.getenv('NODE_OFFLINE_TIMEOUT', 30))  # seconds of silence before a node is offline
+    NODE_WHEEL_TICK = 1.0  # seconds per timer wheel slot
+    NODE_WHEEL_SLOTS = 512  # slots in the timer wheel
     
     # ESP32 Node Configuration
     ESP32_NODES = {
@@ -0,0 +1,96 @@
+import heapq
+import logging
+import os
+import socket
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Kernel TCP state codes as they appear in the `st` column of /proc/net/tcp
+TCP_STATES = {
+    '01': 'ESTABLISHED',
+    '02': 'SYN_SENT',
+    '03': 'SYN_RECV',
+    '04': 'FIN_WAIT1',
+    '05': 'FIN_WAIT2',
+    '06': 'TIME_WAIT',
+    '07': 'CLOSE',
+    '08': 'CLOSE_WAIT',
+    '09': 'LAST_ACK',
+    '0A': 'LISTEN',
+    '0B': 'CLOSING',
+    '0C': 'NEW_SYN_RECV'
+}
+
+# IPv4-mapped IPv6 addresses (::ffff:a.b.c.d) as they appear in /proc/net/tcp6
+MAPPED_IPV4_PREFIX = '0000000000000000FFFF0000'
+
+def decode_proc_ip(hex_ip):
+    """Convert a /proc/net/tcp{,6} hex address (without port) to a printable IP"""
+    raw = bytes.fromhex(hex_ip)
+    if len(raw) == 4:
+        return socket.inet_ntop(socket.AF_INET, raw[::-1])
+    # IPv6 is stored as four host-endian 32-bit words
+    words = b''.join(raw[i:i + 4][::-1] for i in range(0, 16, 4))
+    return socket.inet_ntop(socket.AF_INET6, words)
+
+class ConnectionCounter:
+    """Counts TCP connection states by streaming /proc/net/tcp and /proc/net/tcp6"""
+
+    def __init__(self, paths=None, top_n=None):
+        self.paths = paths or Config.PROC_NET_TCP_PATHS
+        self.top_n = top_n or Config.CONNECTION_TOP_N
+
+    def available(self):
+        return any(os.path.exists(path) for path in self.paths)
+
+    def count(self):
+        """Return per-state counts and the busiest remote addresses"""
+        state_counts = {}
+        remote_counts = {}
+        total = 0
+
+        for path in self.paths:
+            try:
+                with open(path, 'r') as f:
+                    next(f, None)  # header
+                    for line in f:
+                        # sl local_address rem_address st ...
+                        fields = line.split(None, 4)
+                        if len(fields) < 4:
+                            continue
+                        state = fields[3]
+                        state_counts[state] = state_counts.get(state, 0) + 1
+                        total += 1
+
+                        if state != '0A':
+                            # Drop the ":PORT" suffix, keep the hex address as the key
+                            remote = fields[2][:-5]
+                            if remote.startswith(MAPPED_IPV4_PREFIX):
+                                remote = remote[24:]
+                            remote_counts[remote] = remote_counts.get(remote, 0) + 1
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.error(f"Error reading {path}: {e}")
+
+        return self._summarise(state_counts, remote_counts, total)
+
+    def _summarise(self, state_counts, remote_counts, total):
+        states = {name: 0 for name in TCP_STATES.values()}
+        for code, count in state_counts.items():
+            states[TCP_STATES.get(code, code)] = count
+
+        # Only the top N addresses are ever decoded
+        top = heapq.nlargest(self.top_n, remote_counts.items(), key=lambda item: item[1])
+        top_remote = [{'ip': decode_proc_ip(hex_ip), 'count': count} for hex_ip, count in top]
+
+        return {
+            'total': total,
+            'established': states['ESTABLISHED'],
+            'syn_recv': states['SYN_RECV'] + states['NEW_SYN_RECV'],
+            'states': states,
+            'unique_remotes': len(remote_counts),
+            'top_remote': top_remote
+        }
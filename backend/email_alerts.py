@@ -1,13 +1,23 @@
 import smtplib
+import html
 import logging
+import queue
+import threading
+import time
+from collections import Counter, deque
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 from config import Config
+from metrics import REGISTRY
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SEND_SECONDS = REGISTRY.histogram('smartcam_email_send_seconds', 'Time for one SMTP send attempt', ('result',))
+SEND_OK = SEND_SECONDS.labels('ok')
+SEND_ERROR = SEND_SECONDS.labels('error')
+
 class EmailAlerts:
     def __init__(self):
         self.smtp_server = Config.SMTP_SERVER
@@ -17,6 +27,25 @@ class EmailAlerts:
         self.admin_email = Config.ADMIN_EMAIL
         self.enabled = False
         
+        # Background outbox with one reused SMTP connection
+        self.outbox = queue.Queue(maxsize=Config.EMAIL_OUTBOX_SIZE)
+        self.outbox_thread = None
+        self.connection = None
+        
+        # Attack alerts waiting to be merged into a digest; past the cap they are only counted
+        self.pending_alerts = []
+        self.pending_counts = Counter()
+        self.digest_timer = None
+        
+        self.stats_lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.retries = 0
+        self.digests = 0
+        self.connections_opened = 0
+        self.latencies = deque(maxlen=1000)
+        
         # Check if email is configured
         if self.email_address and self.email_password:
             self.enabled = True
@@ -25,7 +54,7 @@ class EmailAlerts:
             logger.warning("Email alerts disabled - No credentials configured")
     
     def send_email(self, subject, body, to_email=None):
-        """Send email alert"""
+        """Queue an email for background delivery"""
         if not self.enabled:
             logger.warning("Email not sent - Email alerts disabled")
             return False
@@ -33,30 +62,230 @@ class EmailAlerts:
         if to_email is None:
             to_email = self.admin_email
         
+        # Create message
+        msg = MIMEMultipart()
+        msg['From'] = self.email_address
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        
+        # Add body
+        msg.attach(MIMEText(body, 'html'))
+        
         try:
-            # Create message
-            msg = MIMEMultipart()
-            msg['From'] = self.email_address
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            # Add body
-            msg.attach(MIMEText(body, 'html'))
+            self.outbox.put_nowait((msg, time.monotonic()))
+        except queue.Full:
+            logger.error(f"Email outbox full, dropping: {subject}")
+            with self.stats_lock:
+                self.dropped += 1
+            return False
+        
+        self.start_outbox()
+        return True
+    
+    def start_outbox(self):
+        """Start the outbox worker thread if it is not running"""
+        if self.outbox_thread is not None:
+            return
+        with self.stats_lock:
+            if self.outbox_thread is not None:
+                return
+            self.outbox_thread = threading.Thread(target=self.run_outbox, daemon=True)
+        self.outbox_thread.start()
+        logger.info("Email outbox started")
+    
+    def run_outbox(self):
+        """Deliver queued emails over one reused SMTP connection"""
+        while True:
+            try:
+                msg, queued_at = self.outbox.get(timeout=Config.SMTP_IDLE_TIMEOUT)
+            except queue.Empty:
+                # Don't hold an idle connection open
+                self.close_connection()
+                continue
             
-            # Connect to SMTP server
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
+            try:
+                self.deliver(msg, queued_at)
+            except Exception as e:
+                logger.error(f"Error in email outbox: {e}")
+            finally:
+                self.outbox.task_done()
+    
+    def deliver(self, msg, queued_at):
+        """Send one message, reconnecting and backing off on failure"""
+        for attempt in range(Config.EMAIL_MAX_RETRIES + 1):
+            reused = self.connection is not None
+            start = time.perf_counter()
+            try:
+                self.get_connection().send_message(msg)
+                SEND_OK.observe(time.perf_counter() - start)
+                latency = time.monotonic() - queued_at
+                with self.stats_lock:
+                    self.sent += 1
+                    self.latencies.append(latency)
+                logger.info(f"Email sent successfully to {msg['To']}")
+                return True
+            except (smtplib.SMTPException, OSError) as e:
+                SEND_ERROR.observe(time.perf_counter() - start)
+                self.close_connection()
+                if attempt == Config.EMAIL_MAX_RETRIES:
+                    logger.error(f"Failed to send email: {e}")
+                    with self.stats_lock:
+                        self.failed += 1
+                    return False
+                
+                # A reused connection may simply have been closed by the server, reconnect at once
+                delay = 0 if reused else min(Config.EMAIL_RETRY_BACKOFF * (2 ** attempt), Config.EMAIL_RETRY_BACKOFF_MAX)
+                logger.warning(f"Email send failed ({e}), retrying in {delay}s")
+                with self.stats_lock:
+                    self.retries += 1
+                time.sleep(delay)
+        return False
+    
+    def get_connection(self):
+        """Return the open SMTP connection, connecting and logging in if needed"""
+        if self.connection is not None:
+            return self.connection
+        
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=Config.SMTP_TIMEOUT)
+        try:
+            if Config.SMTP_USE_TLS:
                 server.starttls()
+            server.ehlo_or_helo_if_needed()
+            if server.has_extn('auth'):
                 server.login(self.email_address, self.email_password)
-                server.send_message(msg)
-            
-            logger.info(f"Email sent successfully to {to_email}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Failed to send email: {e}")
-            return False
+        except Exception:
+            server.close()
+            raise
+        
+        self.connection = server
+        with self.stats_lock:
+            self.connections_opened += 1
+        return server
+    
+    def close_connection(self):
+        if self.connection is None:
+            return
+        try:
+            self.connection.quit()
+        except (smtplib.SMTPException, OSError):
+            self.connection.close()
+        self.connection = None
+    
+    def get_outbox_stats(self):
+        """Return outbox delivery statistics"""
+        with self.stats_lock:
+            latencies = sorted(self.latencies)
+            stats = {
+                'queued': self.outbox.qsize(),
+                'sent': self.sent,
+                'failed': self.failed,
+                'dropped': self.dropped,
+                'retries': self.retries,
+                'digests': self.digests,
+                'pending_alerts': sum(self.pending_counts.values()),
+                'connections_opened': self.connections_opened
+            }
+        if latencies:
+            stats['latency_p50_ms'] = round(latencies[len(latencies) // 2] * 1000, 1)
+            stats['latency_p99_ms'] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 1)
+        return stats
+    
+    def collect_metrics(self):
+        """Scrape-time metric families for the metrics registry"""
+        stats = self.get_outbox_stats()
+        return [
+            ('smartcam_email_outbox_depth', 'gauge', 'Emails waiting in the outbox', [({}, stats['queued'])]),
+            ('smartcam_email_messages_total', 'counter', 'Outbox messages by outcome',
+             [({'result': result}, stats[result]) for result in ('sent', 'failed', 'dropped', 'retries')]),
+            ('smartcam_email_digests_total', 'counter', 'Attack digests sent', [({}, stats['digests'])]),
+            ('smartcam_email_connections_total', 'counter', 'SMTP connections opened',
+             [({}, stats['connections_opened'])])
+        ]
     
     def send_attack_alert(self, attack_data):
+        """Queue an attack alert; alerts arriving within the digest window are merged"""
+        with self.stats_lock:
+            self.pending_counts[attack_data['category']] += 1
+            if len(self.pending_alerts) < Config.EMAIL_DIGEST_MAX_PENDING:
+                self.pending_alerts.append(attack_data)
+            if self.digest_timer is not None:
+                return True
+            self.digest_timer = threading.Timer(Config.EMAIL_DIGEST_WINDOW, self.flush_attack_alerts)
+            self.digest_timer.daemon = True
+        self.digest_timer.start()
+        return True
+    
+    def flush_attack_alerts(self):
+        """Send pending attack alerts, as a digest if there is more than one"""
+        with self.stats_lock:
+            alerts = self.pending_alerts
+            counts = self.pending_counts
+            self.pending_alerts = []
+            self.pending_counts = Counter()
+            self.digest_timer = None
+        
+        if not alerts:
+            return False
+        if sum(counts.values()) == 1:
+            return self.send_single_attack_alert(alerts[0])
+        
+        with self.stats_lock:
+            self.digests += 1
+        return self.send_attack_digest(alerts, counts)
+    
+    def send_attack_digest(self, alerts, counts=None):
+        """Send one email summarising several attack alerts by category, listing the first few"""
+        if counts is None:
+            counts = Counter(alert['category'] for alert in alerts)
+        total = sum(counts.values())
+        subject = f"🚨 SECURITY ALERT DIGEST - {total} alerts ({', '.join(sorted(counts))})"
+        
+        summary = ''.join(
+            f"<tr><td>{html.escape(str(category))}</td><td>{count}</td></tr>"
+            for category, count in counts.most_common()
+        )
+        shown = alerts[:Config.EMAIL_DIGEST_ROWS]
+        rows = ''.join(
+            f"<tr><td>{html.escape(str(alert['time']))}</td><td>{html.escape(str(alert['category']))}</td>"
+            f"<td>{html.escape(str(alert['severity']))}</td><td>{html.escape(str(alert.get('source', 'Unknown')))}</td>"
+            f"<td>{html.escape(str(alert['message']))}</td></tr>"
+            for alert in shown
+        )
+        if total > len(shown):
+            rows += f"<tr><td colspan=\"5\"><em>+{total - len(shown)} more</em></td></tr>"
+        
+        body = f"""
+        <html>
+        <head>
+            <style>
+                body {{ font-family: Arial, sans-serif; }}
+                .alert {{ background-color: #fee; padding: 20px; border-left: 5px solid #f00; }}
+                table {{ width: 100%; border-collapse: collapse; background-color: #fff; margin-bottom: 15px; }}
+                th, td {{ padding: 8px; text-align: left; border-bottom: 1px solid #ddd; }}
+                .critical {{ color: #c00; font-weight: bold; }}
+            </style>
+        </head>
+        <body>
+            <div class="alert">
+                <h2 class="critical">{total} Security Alerts Detected</h2>
+                <table>
+                    <tr><th>Type</th><th>Alerts</th></tr>
+                    {summary}
+                </table>
+                <table>
+                    <tr><th>Time</th><th>Type</th><th>Severity</th><th>Source</th><th>Message</th></tr>
+                    {rows}
+                </table>
+                <p>Alerts raised within {Config.EMAIL_DIGEST_WINDOW} seconds are merged into one email.</p>
+                <p><em>RNS Institute of Technology - Raspberry Pi Control Center</em></p>
+            </div>
+        </body>
+        </html>
+        """
+        
+        return self.send_email(subject, body)
+    
+    def send_single_attack_alert(self, attack_data):
         """Send attack alert email"""
         subject = f"🚨 SECURITY ALERT - {attack_data['category']}"
         
@@ -74,11 +303,11 @@ class EmailAlerts:
             <div class="alert">
                 <h2 class="critical">Security Alert Detected</h2>
                 <div class="info">
-                    <p><strong>Type:</strong> {attack_data['category']}</p>
-                    <p><strong>Severity:</strong> {attack_data['severity']}</p>
-                    <p><strong>Time:</strong> {attack_data['time']}</p>
-                    <p><strong>Message:</strong> {attack_data['message']}</p>
-                    <p><strong>Source:</strong> {attack_data.get('source', 'Unknown')}</p>
+                    <p><strong>Type:</strong> {html.escape(str(attack_data['category']))}</p>
+                    <p><strong>Severity:</strong> {html.escape(str(attack_data['severity']))}</p>
+                    <p><strong>Time:</strong> {html.escape(str(attack_data['time']))}</p>
+                    <p><strong>Message:</strong> {html.escape(str(attack_data['message']))}</p>
+                    <p><strong>Source:</strong> {html.escape(str(attack_data.get('source', 'Unknown')))}</p>
                 </div>
                 <p>This is an automated alert from the Smart Campus Security System.</p>
                 <p><em>RNS Institute of Technology - Raspberry Pi Control Center</em></p>
@@ -0,0 +1,125 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from config import Config
+from metrics import SOCKET_EMITS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class EmitScheduler:
+    """Coalesces sensor updates and sends one batched SocketIO frame per tick"""
+
+    def __init__(self, socketio=None, interval=None, event='sensor_batch', rooms=None, journal=None):
+        self.socketio = socketio
+        # Optional ChangeJournal: each frame then carries the seq clients may resume from
+        self.journal = journal
+        # Optional rooms() -> [(room, sectors)]: each room gets a frame with only its sectors
+        self.rooms = rooms
+        self.interval = interval or Config.SOCKET_EMIT_INTERVAL
+        self.event = event
+        self.emit_counter = SOCKET_EMITS.labels(event)
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+
+        # Counters for reporting how much fan-out was avoided
+        self.updates_received = 0
+        self.updates_sent = 0
+        self.frames_sent = 0
+
+    def queue_update(self, sector, sensor, data):
+        """Queue a sensor update, replacing any pending value for the same sensor"""
+        with self.lock:
+            self.pending[(sector, sensor)] = data
+            self.updates_received += 1
+
+    def take_pending(self):
+        with self.lock:
+            pending = self.pending
+            self.pending = {}
+        return pending
+
+    def flush(self):
+        """Emit all pending updates as a single frame"""
+        if self.journal is None:
+            seq, pending = None, self.take_pending()
+        else:
+            # Every change up to seq is either in this frame or was already handed to SocketIO
+            with self.journal.publish_lock:
+                seq, pending = self.journal.seq, self.take_pending()
+        if not pending:
+            return 0
+
+        by_sector = {}
+        for (sector, sensor), data in pending.items():
+            by_sector.setdefault(sector, []).append({'sector': sector, 'sensor': sensor, 'data': data})
+
+        if self.rooms is None:
+            frames = [(None, [update for updates in by_sector.values() for update in updates])]
+        else:
+            frames = []
+            for room, sectors in self.rooms():
+                updates = [update for sector in sectors for update in by_sector.get(sector, ())]
+                if updates:
+                    frames.append((room, updates))
+
+        if self.socketio:
+            timestamp = datetime.now().isoformat()
+            for room, updates in frames:
+                frame = {'updates': updates, 'timestamp': timestamp}
+                if seq is not None:
+                    frame['seq'] = seq
+                self.socketio.emit(self.event, frame, to=room)
+                self.emit_counter.inc()
+
+        with self.lock:
+            self.updates_sent += sum(len(updates) for _, updates in frames)
+            self.frames_sent += len(frames)
+        return len(pending)
+
+    def run(self):
+        """Tick loop, flushing pending updates every interval"""
+        next_tick = time.monotonic()
+        while self.running:
+            next_tick += self.interval
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error emitting sensor batch: {e}")
+
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Fell behind, don't try to catch up with a burst of ticks
+                next_tick = time.monotonic()
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        logger.info(f"Sensor emit scheduler started ({int(self.interval * 1000)} ms tick)")
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=self.interval * 2)
+            self.thread = None
+        self.flush()
+
+    def get_stats(self):
+        """Return emission statistics"""
+        with self.lock:
+            return {
+                'interval_ms': int(self.interval * 1000),
+                'updates_received': self.updates_received,
+                'updates_sent': self.updates_sent,
+                'frames_sent': self.frames_sent,
+                'emits_saved': self.updates_received - len(self.pending) - self.frames_sent,
+                'pending': len(self.pending)
+            }
@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+
+class FailureTracker:
+    """Per-key failure counts over a sliding time window with a hard cap on tracked keys.
+
+    Each key holds a small ring of time buckets, so recording and counting
+    cost O(buckets) regardless of history. Keys live in a segmented LRU:
+    first-time keys sit in a probation segment and move to a protected
+    segment on their second failure, so a flood of one-shot (spoofed)
+    sources only churns probation and cannot evict repeat offenders.
+    Keys idle for longer than the window expire on their own.
+    """
+
+    def __init__(self, window=None, capacity=None, buckets=6):
+        self.window = window or Config.BRUTE_FORCE_WINDOW
+        self.capacity = capacity or Config.BRUTE_FORCE_TRACKER_CAPACITY
+        self.buckets = buckets
+        self.bucket_width = self.window / buckets
+        self.protected_capacity = max(1, self.capacity // 2)
+        # key -> [last_bucket, total, count per ring slot...]
+        self.probation = OrderedDict()
+        self.protected = OrderedDict()
+        self.lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def _advance(self, entry, bucket):
+        steps = bucket - entry[0]
+        if steps <= 0:
+            return
+        if steps >= self.buckets:
+            for i in range(2, self.buckets + 2):
+                entry[i] = 0
+            entry[1] = 0
+        else:
+            for b in range(entry[0] + 1, bucket + 1):
+                slot = 2 + b % self.buckets
+                entry[1] -= entry[slot]
+                entry[slot] = 0
+        entry[0] = bucket
+
+    def _expire(self, segment, bucket):
+        # Oldest entries sit at the front; drop those idle for a whole window
+        while segment:
+            key, entry = next(iter(segment.items()))
+            if bucket - entry[0] < self.buckets:
+                break
+            del segment[key]
+            self.expirations += 1
+
+    def _evict(self):
+        segment = self.probation if self.probation else self.protected
+        segment.popitem(last=False)
+        self.evictions += 1
+
+    def record(self, key, now=None):
+        """Record one failure for key and return its count within the window"""
+        if now is None:
+            now = time.monotonic()
+        bucket = int(now // self.bucket_width)
+
+        with self.lock:
+            entry = self.protected.get(key)
+            if entry is not None:
+                self.protected.move_to_end(key)
+            else:
+                entry = self.probation.pop(key, None)
+                if entry is not None:
+                    # Second failure within the window: promote
+                    if len(self.protected) >= self.protected_capacity:
+                        self._expire(self.protected, bucket)
+                    if len(self.protected) >= self.protected_capacity:
+                        self.protected.popitem(last=False)
+                        self.evictions += 1
+                    self.protected[key] = entry
+                else:
+                    self._expire(self.probation, bucket)
+                    if len(self.probation) + len(self.protected) >= self.capacity:
+                        self._evict()
+                    entry = [bucket, 0] + [0] * self.buckets
+                    self.probation[key] = entry
+
+            self._advance(entry, bucket)
+            entry[2 + bucket % self.buckets] += 1
+            entry[1] += 1
+            return entry[1]
+
+    def count(self, key, now=None):
+        """Return the number of failures for key within the window"""
+        if now is None:
+            now = time.monotonic()
+        with self.lock:
+            entry = self.protected.get(key) or self.probation.get(key)
+            if entry is None:
+                return 0
+            self._advance(entry, int(now // self.bucket_width))
+            return entry[1]
+
+    def reset(self, key):
+        with self.lock:
+            self.protected.pop(key, None)
+            self.probation.pop(key, None)
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'tracked': len(self.probation) + len(self.protected),
+                'protected': len(self.protected),
+                'capacity': self.capacity,
+                'window': self.window,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
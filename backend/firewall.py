@@ -0,0 +1,349 @@
+import ipaddress
+import logging
+import subprocess
+import threading
+import time
+from config import Config
+from metrics import REGISTRY
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BACKEND_SECONDS = REGISTRY.histogram('smartcam_firewall_backend_seconds',
+                                     'Time for one batched firewall backend call', ('backend', 'action'))
+
+def is_valid_ip(ip_address):
+    """Check an address before it is handed to a firewall command"""
+    try:
+        ipaddress.ip_address(ip_address)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+def never_block_networks(extra=None):
+    """Networks block requests are refused for: loopback, the ESP32 nodes and FIREWALL_NEVER_BLOCK"""
+    entries = ['127.0.0.0/8', '::1/128'] + [node['ip'] for node in Config.ESP32_NODES.values()]
+    entries += Config.FIREWALL_NEVER_BLOCK if extra is None else extra
+    networks = []
+    for entry in entries:
+        try:
+            networks.append(ipaddress.ip_network(entry, strict=False))
+        except ValueError:
+            logger.warning(f"Ignoring invalid never-block entry: {entry}")
+    return networks
+
+def is_protected_ip(ip_address, networks):
+    """Check an address against never_block_networks(), IPv4-mapped IPv6 included"""
+    try:
+        address = ipaddress.ip_address(ip_address)
+    except (TypeError, ValueError):
+        return False
+    if address.version == 6 and address.ipv4_mapped is not None:
+        address = address.ipv4_mapped
+    return any(address in network for network in networks)
+
+class FirewallBackend:
+    """Applies block/unblock changes; subclasses return the addresses actually applied"""
+    name = 'base'
+
+    def setup(self):
+        return True
+
+    def block(self, ips):
+        raise NotImplementedError
+
+    def unblock(self, ips):
+        raise NotImplementedError
+
+class UfwBackend(FirewallBackend):
+    """One `ufw` rule per address (the original behaviour)"""
+    name = 'ufw'
+
+    def block(self, ips):
+        applied = []
+        for ip in ips:
+            try:
+                subprocess.run(['sudo', 'ufw', 'deny', 'from', ip], capture_output=True, check=True)
+                applied.append(ip)
+            except subprocess.CalledProcessError as e:
+                logger.error(f"Failed to block IP {ip}: {e}")
+        return applied
+
+    def unblock(self, ips):
+        applied = []
+        for ip in ips:
+            try:
+                subprocess.run(['sudo', 'ufw', 'delete', 'deny', 'from', ip], capture_output=True, check=True)
+                applied.append(ip)
+            except subprocess.CalledProcessError as e:
+                logger.error(f"Failed to unblock IP {ip}: {e}")
+        return applied
+
+class IpsetBackend(FirewallBackend):
+    """Blocked addresses live in ipset sets; each batch is one `ipset restore` call"""
+    name = 'ipset'
+
+    def __init__(self, set_name=None):
+        self.set_name = set_name or Config.FIREWALL_SET_NAME
+        self.sets = {4: self.set_name, 6: f"{self.set_name}6"}
+
+    def setup(self):
+        try:
+            self._restore(
+                f"create {self.sets[4]} hash:ip family inet -exist\n"
+                f"create {self.sets[6]} hash:ip family inet6 -exist\n"
+            )
+            for command, set_name in (('iptables', self.sets[4]), ('ip6tables', self.sets[6])):
+                rule = ['INPUT', '-m', 'set', '--match-set', set_name, 'src', '-j', 'DROP']
+                exists = subprocess.run(['sudo', command, '-C'] + rule, capture_output=True)
+                if exists.returncode != 0:
+                    subprocess.run(['sudo', command, '-I'] + rule, capture_output=True, check=True)
+            return True
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Failed to set up ipset firewall backend: {e}")
+            return False
+
+    def _restore(self, script):
+        subprocess.run(['sudo', 'ipset', 'restore'], input=script, text=True,
+                       capture_output=True, check=True)
+
+    def _apply(self, verb, ips):
+        lines = []
+        for ip in ips:
+            version = ipaddress.ip_address(ip).version
+            lines.append(f"{verb} {self.sets[version]} {ip} -exist\n")
+        try:
+            self._restore(''.join(lines))
+            return list(ips)
+        except subprocess.CalledProcessError as e:
+            logger.error(f"ipset {verb} batch of {len(ips)} failed: {e}")
+            return []
+
+    def block(self, ips):
+        return self._apply('add', ips)
+
+    def unblock(self, ips):
+        return self._apply('del', ips)
+
+class NftablesBackend(FirewallBackend):
+    """Blocked addresses live in nftables sets; each batch is one `nft -f -` transaction"""
+    name = 'nftables'
+
+    def __init__(self, set_name=None, table='smartcam'):
+        self.set_name = set_name or Config.FIREWALL_SET_NAME
+        self.table = table
+
+    def setup(self):
+        script = (
+            f"add table inet {self.table}\n"
+            f"add set inet {self.table} {self.set_name} {{ type ipv4_addr; }}\n"
+            f"add set inet {self.table} {self.set_name}6 {{ type ipv6_addr; }}\n"
+            f"add chain inet {self.table} input {{ type filter hook input priority -10; }}\n"
+            f"flush chain inet {self.table} input\n"
+            f"add rule inet {self.table} input ip saddr @{self.set_name} drop\n"
+            f"add rule inet {self.table} input ip6 saddr @{self.set_name}6 drop\n"
+        )
+        try:
+            self._run(script)
+            return True
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Failed to set up nftables firewall backend: {e}")
+            return False
+
+    def _run(self, script):
+        subprocess.run(['sudo', 'nft', '-f', '-'], input=script, text=True,
+                       capture_output=True, check=True)
+
+    def _apply(self, verb, ips):
+        by_version = {4: [], 6: []}
+        for ip in ips:
+            by_version[ipaddress.ip_address(ip).version].append(ip)
+
+        script = ''
+        for version, suffix in ((4, ''), (6, '6')):
+            if by_version[version]:
+                elements = ', '.join(by_version[version])
+                script += f"{verb} element inet {self.table} {self.set_name}{suffix} {{ {elements} }}\n"
+        try:
+            self._run(script)
+            return list(ips)
+        except subprocess.CalledProcessError as e:
+            # A delete of a missing element fails the whole transaction, retry one by one
+            if verb == 'delete' and len(ips) > 1:
+                return [ip for ip in ips if self._apply(verb, [ip])]
+            logger.error(f"nft {verb} batch of {len(ips)} failed: {e}")
+            return []
+
+    def block(self, ips):
+        return self._apply('add', ips)
+
+    def unblock(self, ips):
+        return self._apply('delete', ips)
+
+class MemoryBackend(FirewallBackend):
+    """In-memory stand-in for tests and development without root.
+
+    `call_latency` simulates the cost of one subprocess call; with
+    `per_ip=True` every address pays it, like the ufw backend.
+    """
+    name = 'memory'
+
+    def __init__(self, call_latency=0.0, per_ip=False):
+        self.call_latency = call_latency
+        self.per_ip = per_ip
+        self.blocked = set()
+        self.calls = 0
+
+    def _call(self, count):
+        calls = count if self.per_ip else 1
+        self.calls += calls
+        if self.call_latency:
+            time.sleep(self.call_latency * calls)
+
+    def block(self, ips):
+        self._call(len(ips))
+        self.blocked.update(ips)
+        return list(ips)
+
+    def unblock(self, ips):
+        self._call(len(ips))
+        self.blocked.difference_update(ips)
+        return list(ips)
+
+FIREWALL_BACKENDS = {
+    'ufw': UfwBackend,
+    'ipset': IpsetBackend,
+    'nftables': NftablesBackend,
+    'memory': MemoryBackend
+}
+
+def create_backend(name=None):
+    """Create the firewall backend named in Config.FIREWALL_BACKEND"""
+    name = name or Config.FIREWALL_BACKEND
+    backend_class = FIREWALL_BACKENDS.get(name)
+    if backend_class is None:
+        logger.error(f"Unknown firewall backend '{name}', falling back to ufw")
+        backend_class = UfwBackend
+    return backend_class()
+
+class FirewallBatch:
+    """Operations flushed together; waiters block on `done`"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.applied = set()
+
+class FirewallQueue:
+    """Coalesces block/unblock operations and applies them to the backend in bulk"""
+
+    def __init__(self, backend, on_applied=None, interval=None, max_batch=None):
+        self.backend = backend
+        self.on_applied = on_applied
+        self.interval = interval or Config.FIREWALL_FLUSH_INTERVAL
+        self.max_batch = max_batch or Config.FIREWALL_MAX_BATCH
+        self.pending = {}
+        self.batch = FirewallBatch()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+        self.batches = 0
+        self.applied = 0
+        self.backend_time = 0.0
+        self.last_rate = 0.0
+
+    def submit(self, action, ips):
+        """Queue `action` ('block' or 'unblock') for ips; the last operation per address wins"""
+        with self.lock:
+            for ip in ips:
+                self.pending[ip] = action
+            batch = self.batch
+            if len(self.pending) >= self.max_batch:
+                self.wakeup.set()
+        self.start()
+        return batch
+
+    def wait(self, batch, ips, timeout=None):
+        """Wait for a batch and return the subset of ips that were applied"""
+        if not batch.done.wait(timeout if timeout is not None else Config.FIREWALL_WAIT_TIMEOUT):
+            return []
+        return [ip for ip in ips if ip in batch.applied]
+
+    def flush(self):
+        """Apply every pending operation with one backend call per action"""
+        with self.lock:
+            pending = self.pending
+            batch = self.batch
+            self.pending = {}
+            self.batch = FirewallBatch()
+
+        if not pending:
+            batch.done.set()
+            return 0
+
+        blocks = [ip for ip, action in pending.items() if action == 'block']
+        unblocks = [ip for ip, action in pending.items() if action == 'unblock']
+
+        try:
+            start = time.perf_counter()
+            applied_blocks = self.backend.block(blocks) if blocks else []
+            blocked_at = time.perf_counter()
+            applied_unblocks = self.backend.unblock(unblocks) if unblocks else []
+            elapsed = time.perf_counter() - start
+            batch.applied.update(applied_blocks)
+            batch.applied.update(applied_unblocks)
+        finally:
+            batch.done.set()
+
+        count = len(applied_blocks) + len(applied_unblocks)
+        with self.lock:
+            self.batches += 1
+            self.applied += count
+            self.backend_time += elapsed
+            self.last_rate = count / elapsed if elapsed > 0 else 0.0
+        if blocks:
+            BACKEND_SECONDS.labels(self.backend.name, 'block').observe(blocked_at - start)
+        if unblocks:
+            BACKEND_SECONDS.labels(self.backend.name, 'unblock').observe(start + elapsed - blocked_at)
+
+        if self.on_applied:
+            if applied_blocks:
+                self.on_applied('block', applied_blocks)
+            if applied_unblocks:
+                self.on_applied('unblock', applied_unblocks)
+
+        logger.info(f"Firewall batch applied: {len(applied_blocks)} blocked, "
+                    f"{len(applied_unblocks)} unblocked in {elapsed * 1000:.1f} ms")
+        return count
+
+    def run(self):
+        self.backend.setup()
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error applying firewall batch: {e}")
+
+    def start(self):
+        if self.thread is not None:
+            return
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def get_stats(self):
+        """Return batching statistics including achieved blocks/second"""
+        with self.lock:
+            return {
+                'backend': self.backend.name,
+                'pending': len(self.pending),
+                'batches': self.batches,
+                'applied': self.applied,
+                'backend_time': round(self.backend_time, 3),
+                'ips_per_second': round(self.applied / self.backend_time, 1) if self.backend_time else 0.0,
+                'last_batch_ips_per_second': round(self.last_rate, 1)
+            }
@@ -0,0 +1,184 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from config import Config
+from metrics import REGISTRY
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ('drop_newest', 'drop_oldest', 'block')
+
+SUBMIT_SECONDS = REGISTRY.histogram('smartcam_mqtt_submit_seconds',
+                                    'Time on the MQTT network thread to hand a message to the pipeline')
+QUEUE_WAIT_SECONDS = REGISTRY.histogram('smartcam_mqtt_queue_wait_seconds',
+                                        'Time a message waited in the ingest queue')
+PROCESS_SECONDS = REGISTRY.histogram('smartcam_mqtt_process_seconds',
+                                     'Time to decode and apply one MQTT message')
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+class StageTimer:
+    """Running count/total/max plus a window of recent samples for one pipeline stage"""
+
+    def __init__(self, window=1024):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=window)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.recent.append(seconds)
+
+    def get_stats(self):
+        recent = list(self.recent)
+        return {
+            'count': self.count,
+            'avg_us': round(self.total / self.count * 1e6, 1) if self.count else 0.0,
+            'p50_us': round(percentile(recent, 0.5) * 1e6, 1),
+            'p99_us': round(percentile(recent, 0.99) * 1e6, 1),
+            'max_us': round(self.max * 1e6, 1)
+        }
+
+class IngestPipeline:
+    """Bounded hand-off from the MQTT network thread to a pool of worker threads.
+
+    Messages are sharded by topic so each topic is always handled by the same
+    worker, which keeps per-sensor updates in order.
+    """
+
+    def __init__(self, handler, workers=None, maxsize=None, overflow=None):
+        self.handler = handler
+        self.workers = workers or Config.MQTT_INGEST_WORKERS
+        self.maxsize = maxsize or Config.MQTT_INGEST_QUEUE_SIZE
+        self.overflow = overflow or Config.MQTT_INGEST_OVERFLOW
+        if self.overflow not in OVERFLOW_POLICIES:
+            logger.error(f"Unknown overflow policy '{self.overflow}', using drop_oldest")
+            self.overflow = 'drop_oldest'
+
+        per_worker = max(1, self.maxsize // self.workers)
+        self.queues = [queue.Queue(maxsize=per_worker) for _ in range(self.workers)]
+        self.threads = []
+        self.lock = threading.Lock()
+
+        self.received = 0
+        self.dropped = 0
+        self.errors = 0
+        self.submit_timer = StageTimer()
+        self.wait_timer = StageTimer()
+        self.process_timer = StageTimer()
+
+    def submit(self, topic, payload):
+        """Called on the network thread: enqueue the raw message and return"""
+        start = time.perf_counter()
+        target = self.queues[hash(topic) % self.workers]
+        item = (topic, payload, start)
+        accepted = True
+        dropped = False
+
+        try:
+            if self.overflow == 'block':
+                target.put(item)
+            else:
+                target.put_nowait(item)
+        except queue.Full:
+            dropped = True
+            accepted = False
+            if self.overflow == 'drop_oldest':
+                # Make room by discarding the oldest queued message
+                try:
+                    target.get_nowait()
+                    target.task_done()
+                except queue.Empty:
+                    pass
+                try:
+                    target.put_nowait(item)
+                    accepted = True
+                except queue.Full:
+                    pass
+
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.received += 1
+            if dropped:
+                self.dropped += 1
+            self.submit_timer.add(elapsed)
+        SUBMIT_SECONDS.observe(elapsed)
+        return accepted
+
+    def run_worker(self, index):
+        work = self.queues[index]
+        while True:
+            topic, payload, queued_at = work.get()
+            started = time.perf_counter()
+            try:
+                self.handler(topic, payload)
+            except Exception as e:
+                with self.lock:
+                    self.errors += 1
+                logger.error(f"Error processing MQTT message on {topic}: {e}")
+            finished = time.perf_counter()
+
+            with self.lock:
+                self.wait_timer.add(started - queued_at)
+                self.process_timer.add(finished - started)
+            QUEUE_WAIT_SECONDS.observe(started - queued_at)
+            PROCESS_SECONDS.observe(finished - started)
+            work.task_done()
+
+    def start(self):
+        if self.threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(target=self.run_worker, args=(index,), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        logger.info(f"MQTT ingest pipeline started with {self.workers} worker(s), "
+                    f"queue size {self.maxsize}, overflow policy {self.overflow}")
+
+    def join(self):
+        """Wait until every queued message has been processed"""
+        for work in self.queues:
+            work.join()
+
+    def collect_metrics(self):
+        """Scrape-time metric families for the metrics registry"""
+        depth = sum(work.qsize() for work in self.queues)
+        with self.lock:
+            received, dropped, errors = self.received, self.dropped, self.errors
+        return [
+            ('smartcam_mqtt_messages_total', 'counter', 'MQTT messages received', [({}, received)]),
+            ('smartcam_mqtt_dropped_total', 'counter', 'MQTT messages dropped on queue overflow', [({}, dropped)]),
+            ('smartcam_mqtt_errors_total', 'counter', 'MQTT messages whose handler raised', [({}, errors)]),
+            ('smartcam_mqtt_queue_depth', 'gauge', 'Messages waiting in the ingest queues', [({}, depth)])
+        ]
+
+    def get_stats(self):
+        """Return queue depth, drop counts and per-stage latency"""
+        depths = [work.qsize() for work in self.queues]
+        with self.lock:
+            return {
+                'workers': self.workers,
+                'queue_size': self.maxsize,
+                'overflow_policy': self.overflow,
+                'queue_depth': sum(depths),
+                'queue_depth_per_worker': depths,
+                'received': self.received,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'latency': {
+                    'submit': self.submit_timer.get_stats(),
+                    'queue_wait': self.wait_timer.get_stats(),
+                    'process': self.process_timer.get_stats()
+                }
+            }
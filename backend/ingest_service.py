@@ -0,0 +1,95 @@
+import logging
+import threading
+from multiprocessing.connection import Client
+from config import Config
+from message_hub import listen, process_authkey
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class IngestService:
+    """Answers queries about state only the ingest process holds (history, detector and journal stats).
+
+    Multi-process mode: worker processes serve HTTP but never see MQTT
+    messages, so routes backed by ingest-only state call this over a Unix
+    socket instead of answering from their own empty copies. The ingest
+    process also owns the security state (blocked IPs, failed logins, the
+    email digest) and the MQTT connection, so workers send those calls here
+    too. Each request is (name, args); the reply is ('ok', result) or
+    ('error', message).
+    """
+
+    def __init__(self, handlers, address=None, authkey=None):
+        self.handlers = handlers
+        self.address = address or Config.INGEST_SERVICE_ADDRESS
+        self.authkey = authkey or process_authkey()
+        self.listener = None
+        self.served = 0
+
+    def start(self):
+        self.listener = listen(self.address, self.authkey)
+        threading.Thread(target=self.run_accept, daemon=True).start()
+        logger.info(f"Ingest query service listening on {self.address}")
+
+    def run_accept(self):
+        while self.listener is not None:
+            try:
+                conn = self.listener.accept()
+            except Exception as e:
+                logger.error(f"Ingest query service accept failed: {e}")
+                continue
+            threading.Thread(target=self.run_connection, args=(conn,), daemon=True).start()
+
+    def run_connection(self, conn):
+        try:
+            while True:
+                name, args = conn.recv()
+                handler = self.handlers.get(name)
+                if handler is None:
+                    conn.send(('error', f"Unknown ingest query {name}"))
+                    continue
+                try:
+                    reply = ('ok', handler(*args))
+                except Exception as e:
+                    reply = ('error', str(e))
+                self.served += 1
+                conn.send(reply)
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    def stop(self):
+        if self.listener is not None:
+            listener, self.listener = self.listener, None
+            listener.close()
+
+class IngestClient:
+    """Worker side of IngestService; one connection per calling thread"""
+
+    def __init__(self, address=None, authkey=None, timeout=None, timeouts=None):
+        self.address = address or Config.INGEST_SERVICE_ADDRESS
+        self.authkey = authkey or process_authkey()
+        self.timeout = timeout or Config.INGEST_QUERY_TIMEOUT
+        # Query name -> timeout, for calls that wait on the firewall or on ESP32 acks
+        self.timeouts = timeouts or {}
+        self.local = threading.local()
+
+    def call(self, name, *args):
+        """Run a named query in the ingest process; raises OSError when it cannot be reached"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = Client(self.address, family='AF_UNIX', authkey=self.authkey)
+        try:
+            conn.send((name, args))
+            if not conn.poll(self.timeouts.get(name, self.timeout)):
+                raise TimeoutError(f"Ingest query {name} timed out")
+            status, result = conn.recv()
+        except (EOFError, OSError) as e:
+            # Drop the connection; a late reply must not be read by the next call
+            self.local.conn = None
+            conn.close()
+            raise OSError(f"Ingest query {name} failed: {e}") from e
+        if status != 'ok':
+            raise RuntimeError(result)
+        return result
@@ -0,0 +1,149 @@
+import logging
+import os
+import threading
+import time
+from multiprocessing.connection import Listener, Client
+import socketio
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def process_authkey():
+    """Authkey for the sockets between backend processes, generated by multiprocess.py for each launch.
+
+    Never SECRET_KEY: it has a well-known default, and these sockets carry
+    pickles, so knowing the key means running code in every process.
+    """
+    if not Config.PROCESS_AUTHKEY:
+        raise RuntimeError("No per-launch process authkey; start multi-process mode with multiprocess.py")
+    return Config.PROCESS_AUTHKEY
+
+def listen(address, authkey):
+    """Unix socket listener only this user can connect to"""
+    if os.path.exists(address):
+        os.unlink(address)
+    listener = Listener(address, family='AF_UNIX', authkey=authkey)
+    os.chmod(address, 0o600)
+    return listener
+
+class MessageHub:
+    """Relays Socket.IO broadcasts between backend processes over a Unix socket.
+
+    A local stand-in for the Redis pub/sub that python-socketio normally uses
+    for multi-process deployments. Each connection says on connect whether it
+    wants broadcasts; every message received is forwarded, still pickled, to
+    all subscribers including the sending process.
+    """
+
+    def __init__(self, address=None, authkey=None):
+        self.address = address or Config.MESSAGE_HUB_ADDRESS
+        self.authkey = authkey or process_authkey()
+        self.listener = None
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.relayed = 0
+
+    def start(self):
+        self.listener = listen(self.address, self.authkey)
+        threading.Thread(target=self.run_accept, daemon=True).start()
+        logger.info(f"Message hub listening on {self.address}")
+
+    def run_accept(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except Exception as e:
+                logger.error(f"Message hub accept failed: {e}")
+                continue
+            threading.Thread(target=self.run_connection, args=(conn,), daemon=True).start()
+
+    def run_connection(self, conn):
+        subscriber = None
+        try:
+            if conn.recv():
+                subscriber = (conn, threading.Lock())
+                with self.lock:
+                    self.subscribers.append(subscriber)
+            while True:
+                self.relay(conn.recv_bytes())
+        except (EOFError, OSError):
+            pass
+        finally:
+            if subscriber is not None:
+                with self.lock:
+                    self.subscribers.remove(subscriber)
+            conn.close()
+
+    def relay(self, message):
+        with self.lock:
+            subscribers = list(self.subscribers)
+            self.relayed += 1
+        for conn, send_lock in subscribers:
+            try:
+                with send_lock:
+                    conn.send_bytes(message)
+            except OSError:
+                pass
+
+    def stop(self):
+        if self.listener is not None:
+            self.listener.close()
+            self.listener = None
+
+class HubManager(socketio.PubSubManager):
+    """python-socketio client manager that fans broadcasts out through the MessageHub"""
+    name = 'hub'
+
+    def __init__(self, address=None, authkey=None, write_only=False, logger=None):
+        super().__init__(write_only=write_only, logger=logger)
+        self.address = address or Config.MESSAGE_HUB_ADDRESS
+        self.authkey = authkey or process_authkey()
+        # Publishing and listening use separate connections, so a process that
+        # has not started listening yet never has broadcasts queued up for it
+        self.publisher = None
+        self.lock = threading.Lock()
+
+    def _connect(self, subscribe):
+        conn = Client(self.address, family='AF_UNIX', authkey=self.authkey)
+        conn.send(subscribe)
+        return conn
+
+    def _publish(self, data):
+        with self.lock:
+            try:
+                if self.publisher is None:
+                    self.publisher = self._connect(False)
+                self.publisher.send(data)
+            except (EOFError, OSError) as e:
+                logger.error(f"Failed to publish to message hub: {e}")
+                if self.publisher is not None:
+                    self.publisher.close()
+                    self.publisher = None
+
+    def _listen(self):
+        while True:
+            try:
+                conn = self._connect(True)
+            except OSError as e:
+                logger.error(f"Cannot reach message hub: {e}")
+                time.sleep(1)
+                continue
+            try:
+                while True:
+                    yield conn.recv()
+            except (EOFError, OSError) as e:
+                logger.error(f"Message hub connection lost: {e}")
+            finally:
+                conn.close()
+            time.sleep(1)
+
+def create_client_manager(role=None):
+    """Socket.IO client manager for a process role; None keeps the default in-process manager"""
+    role = role or Config.PROCESS_ROLE
+    if role == 'ingest':
+        # Only emits; sockets are served by the workers
+        return HubManager(write_only=True)
+    if role == 'worker':
+        return HubManager()
+    return None
@@ -0,0 +1,287 @@
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from config import Config
+
+# Seconds; spans sub-microsecond hot paths up to slow subprocess and SMTP calls
+DEFAULT_BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels) + '}'
+
+class ShardedCells:
+    """Per-thread arrays of cells; only the owning thread writes, so updates need no lock.
+
+    Reading sums every shard. Shards of threads that have exited are folded
+    into a retired total, both when a new shard would grow the list past its
+    bound and at read time, so short-lived request threads do not leak memory
+    even when nothing scrapes /metrics.
+    """
+
+    # Shards kept before dead threads are folded in; doubles if live threads exceed it
+    MIN_PRUNE_AT = 64
+
+    def __init__(self, size):
+        self.size = size
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.shards = []
+        self.retired = [0] * size
+        self.prune_at = self.MIN_PRUNE_AT
+
+    def shard(self):
+        try:
+            return self.local.cells
+        except AttributeError:
+            cells = [0] * self.size
+            with self.lock:
+                if len(self.shards) >= self.prune_at:
+                    self._prune()
+                    self.prune_at = max(self.MIN_PRUNE_AT, 2 * len(self.shards))
+                self.shards.append((threading.current_thread(), cells))
+            self.local.cells = cells
+            return cells
+
+    def _prune(self):
+        """Fold the cells of exited threads into `retired`; call with the lock held"""
+        live = []
+        for thread, cells in self.shards:
+            if thread.is_alive():
+                live.append((thread, cells))
+            else:
+                for i, value in enumerate(cells):
+                    self.retired[i] += value
+        self.shards = live
+
+    def totals(self):
+        with self.lock:
+            self._prune()
+            totals = list(self.retired)
+            for _, cells in self.shards:
+                for i, value in enumerate(cells):
+                    totals[i] += value
+        return totals
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, help_text, labelnames=(), labelvalues=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.labelvalues = tuple(labelvalues)
+        self.children = {}
+        self.lock = threading.Lock()
+
+    def labels(self, *values, **kwargs):
+        """Return the child metric for a label combination; keep a reference on hot paths"""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        values = tuple(str(value) for value in values)
+        child = self.children.get(values)
+        if child is None:
+            with self.lock:
+                child = self.children.get(values)
+                if child is None:
+                    child = self.__class__.__new__(self.__class__)
+                    child._init_child(self, values)
+                    self.children[values] = child
+        return child
+
+    def _init_child(self, parent, values):
+        Metric.__init__(self, parent.name, parent.help, parent.labelnames, values)
+
+    def series(self):
+        """(metric, labels) for every label combination, or this metric if it has no labels"""
+        if not self.labelnames:
+            return [self]
+        return list(self.children.values())
+
+    def label_pairs(self):
+        return list(zip(self.labelnames, self.labelvalues))
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self.cells = ShardedCells(1)
+
+    def _init_child(self, parent, values):
+        super()._init_child(parent, values)
+        self.cells = ShardedCells(1)
+
+    def inc(self, amount=1):
+        self.cells.shard()[0] += amount
+
+    def value(self):
+        return self.cells.totals()[0]
+
+    def samples(self):
+        for child in self.series():
+            yield self.name, child.label_pairs(), child.value()
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self.current = 0
+        self.function = None
+
+    def _init_child(self, parent, values):
+        super()._init_child(parent, values)
+        self.current = 0
+        self.function = None
+
+    def set(self, value):
+        self.current = value
+
+    def set_function(self, function):
+        """Read the value from function() at scrape time instead"""
+        self.function = function
+
+    def value(self):
+        return self.function() if self.function else self.current
+
+    def samples(self):
+        for child in self.series():
+            yield self.name, child.label_pairs(), child.value()
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.bounds = tuple(buckets)
+        # One cell per bucket plus +Inf, then the running sum
+        self.cells = ShardedCells(len(self.bounds) + 2)
+
+    def _init_child(self, parent, values):
+        super()._init_child(parent, values)
+        self.bounds = parent.bounds
+        self.cells = ShardedCells(len(self.bounds) + 2)
+
+    def observe(self, value):
+        cells = self.cells.shard()
+        cells[bisect_left(self.bounds, value)] += 1
+        cells[-1] += value
+
+    def samples(self):
+        for child in self.series():
+            totals = child.cells.totals()
+            labels = child.label_pairs()
+            cumulative = 0
+            for bound, count in zip(child.bounds + (float('inf'),), totals):
+                cumulative += count
+                yield self.name + '_bucket', labels + [('le', format_value(float(bound)))], cumulative
+            yield self.name + '_sum', labels, totals[-1]
+            yield self.name + '_count', labels, cumulative
+
+class Registry:
+    """Holds metrics and scrape-time collectors, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self.register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self.register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def add_collector(self, collector):
+        """collector() returns [(name, kind, help, [(labels dict, value), ...]), ...] at scrape time"""
+        with self.lock:
+            self.collectors.append(collector)
+
+    def render(self):
+        lines = []
+        with self.lock:
+            metrics = list(self.metrics.values())
+            collectors = list(self.collectors)
+
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+
+        for collector in collectors:
+            for name, kind, help_text, samples in collector():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{format_labels(sorted(labels.items()))} {format_value(value)}")
+
+        return '\n'.join(lines) + '\n'
+
+# Process-wide registry served at /metrics
+REGISTRY = Registry()
+
+# Shared across modules: every Socket.IO emit the backend makes
+SOCKET_EMITS = REGISTRY.counter('smartcam_socketio_emits_total', 'Socket.IO events emitted', ('event',))
+
+SOCKET_EVENT_SECONDS = REGISTRY.histogram('smartcam_socketio_event_seconds', 'Socket.IO event handler wall time',
+                                          ('event',))
+SOCKET_EVENT_CPU_SECONDS = REGISTRY.histogram('smartcam_socketio_event_cpu_seconds',
+                                              'Socket.IO event handler CPU time', ('event',))
+
+def timed_event(event):
+    """Decorator recording a Socket.IO handler's wall and CPU time; a no-op when Config.ROUTE_TIMING is off.
+
+    For coroutine handlers the CPU time also includes whatever else ran on
+    the event loop while the handler was awaiting.
+    """
+    def decorate(function):
+        if not Config.ROUTE_TIMING:
+            return function
+        wall = SOCKET_EVENT_SECONDS.labels(event)
+        cpu = SOCKET_EVENT_CPU_SECONDS.labels(event)
+
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                started, cpu_started = time.perf_counter(), time.thread_time()
+                result = await function(*args, **kwargs)
+                cpu.observe(time.thread_time() - cpu_started)
+                wall.observe(time.perf_counter() - started)
+                return result
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started, cpu_started = time.perf_counter(), time.thread_time()
+            result = function(*args, **kwargs)
+            cpu.observe(time.thread_time() - cpu_started)
+            wall.observe(time.perf_counter() - started)
+            return result
+        return wrapper
+    return decorate
@@ -0,0 +1,60 @@
+import asyncio
+import logging
+import paho.mqtt.client as mqtt
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class AsyncioMQTTLoop:
+    """Drives a paho client from an asyncio event loop instead of its network thread.
+
+    Socket reads and writes are registered with the loop, so incoming
+    messages are handled on the loop thread and handed to the ingest
+    pipeline. publish() may still be called from any thread; paho's socket
+    callbacks are marshalled onto the loop with call_soon_threadsafe.
+    """
+
+    def __init__(self, loop, client):
+        self.loop = loop
+        self.client = client
+        self.client.on_socket_open = self.on_socket_open
+        self.client.on_socket_close = self.on_socket_close
+        self.client.on_socket_register_write = self.on_socket_register_write
+        self.client.on_socket_unregister_write = self.on_socket_unregister_write
+
+    def on_socket_open(self, client, userdata, sock):
+        self.loop.call_soon_threadsafe(self.loop.add_reader, sock, client.loop_read)
+
+    def on_socket_close(self, client, userdata, sock):
+        self.loop.call_soon_threadsafe(self.loop.remove_reader, sock)
+        self.loop.call_soon_threadsafe(self.loop.remove_writer, sock)
+
+    def on_socket_register_write(self, client, userdata, sock):
+        self.loop.call_soon_threadsafe(self.loop.add_writer, sock, client.loop_write)
+
+    def on_socket_unregister_write(self, client, userdata, sock):
+        self.loop.call_soon_threadsafe(self.loop.remove_writer, sock)
+
+    async def run(self):
+        """Keep the client connected, reconnecting with exponential backoff"""
+        self.client.connect_async(Config.MQTT_BROKER, Config.MQTT_PORT, Config.MQTT_KEEPALIVE)
+        delay = 1
+        while True:
+            try:
+                # The TCP connect blocks, so do it off the loop
+                await asyncio.to_thread(self.client.reconnect)
+                logger.info(f"MQTT client connected to {Config.MQTT_BROKER}:{Config.MQTT_PORT} (asyncio)")
+                delay = 1
+                # Keepalive pings and retries; stops once the socket is closed
+                while self.client.loop_misc() == mqtt.MQTT_ERR_SUCCESS:
+                    await asyncio.sleep(1)
+                logger.warning("MQTT connection lost")
+            except asyncio.CancelledError:
+                self.client.disconnect()
+                raise
+            except Exception as e:
+                logger.error(f"Failed to connect MQTT client: {e}")
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
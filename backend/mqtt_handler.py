@@ -1,17 +1,46 @@
 import paho.mqtt.client as mqtt
-import json
 import logging
 from datetime import datetime
 from config import Config
+from sensor_history import SensorHistory
+from emit_scheduler import EmitScheduler
+from ingest_pipeline import IngestPipeline
+from payload_codecs import CodecRegistry
+from topic_router import TopicRouter
+from ack_tracker import AckTracker
+from response_cache import StateVersion
+from anomaly_detector import AnomalyDetector
+from node_liveness import NodeLiveness
+from metrics import SOCKET_EMITS
+from subscriptions import EVENT_ROOMS
+from change_journal import ChangeJournal
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class MQTTHandler:
-    def __init__(self, socketio=None):
+    def __init__(self, socketio=None, shared_table=None, subscriptions=None, journal=None):
         self.client = mqtt.Client()
         self.socketio = socketio
         self.sensor_data = {}
+        self.version = StateVersion()
+        # Sequence-numbered changes for reconnect delta sync, possibly shared with SecurityMonitor
+        self.journal = journal or ChangeJournal()
+        # Multi-process mode: the ingest process writes the shared table, workers only read it
+        self.shared_table = shared_table
+        self.ingest = shared_table is None or shared_table.writable
+        self.history = SensorHistory()
+        self.codecs = CodecRegistry()
+        self.acks = AckTracker()
+        self.router = self.build_router()
+        # With a SubscriptionRegistry, sensor batches only go to rooms subscribed to their sectors
+        self.emitter = EmitScheduler(socketio=socketio, rooms=subscriptions.sensor_rooms if subscriptions else None,
+                                     journal=self.journal)
+        self.anomalies = AnomalyDetector(on_anomaly=self.handle_anomalies)
+        # Called with each batch of anomalies after they are emitted, e.g. to log them as alerts
+        self.on_anomaly = None
+        self.liveness = NodeLiveness(on_change=self.handle_node_change)
+        self.pipeline = IngestPipeline(self.process_message)
         self.is_connected = False
         
         # Set up callbacks
@@ -25,9 +54,14 @@ class MQTTHandler:
             self.is_connected = True
             
             # Subscribe to all campus topics
-            for sector, topic in Config.MQTT_TOPICS.items():
-                client.subscribe(topic)
-                logger.info(f"Subscribed to {topic}")
+            if self.ingest:
+                for sector, topic in Config.MQTT_TOPICS.items():
+                    client.subscribe(topic)
+                    logger.info(f"Subscribed to {topic}")
+            
+            # Control command acknowledgements
+            client.subscribe(Config.MQTT_ACK_TOPIC, qos=1)
+            logger.info(f"Subscribed to {Config.MQTT_ACK_TOPIC}")
         else:
             logger.error(f"Failed to connect to MQTT Broker. Return code: {rc}")
             self.is_connected = False
@@ -37,42 +71,144 @@ class MQTTHandler:
         self.is_connected = False
         
     def on_message(self, client, userdata, msg):
-        try:
-            # Parse topic: campus/sector/sensor_type
-            topic_parts = msg.topic.split('/')
-            if len(topic_parts) >= 3:
-                sector = topic_parts[1]
-                sensor_type = topic_parts[2]
-                
-                # Parse payload
-                payload = json.loads(msg.payload.decode())
-                
-                # Update sensor data
-                if sector not in self.sensor_data:
-                    self.sensor_data[sector] = {}
-                
-                self.sensor_data[sector][sensor_type] = {
-                    'value': payload.get('value', 0),
-                    'unit': payload.get('unit', ''),
-                    'active': payload.get('active', True),
-                    'timestamp': datetime.now().isoformat()
-                }
-                
-                # Emit to frontend via SocketIO
-                if self.socketio:
-                    self.socketio.emit('sensor_update', {
-                        'sector': sector,
-                        'sensor': sensor_type,
-                        'data': self.sensor_data[sector][sensor_type]
-                    })
-                
-                logger.info(f"Sensor update: {sector}/{sensor_type} = {payload.get('value')}")
-                
-        except Exception as e:
-            logger.error(f"Error processing MQTT message: {e}")
+        """Runs on paho's network thread: hand the raw message to the ingest pipeline"""
+        self.pipeline.submit(msg.topic, msg.payload)
+    
+    def build_router(self):
+        """Compile Config.MQTT_TOPICS into topic routes"""
+        router = TopicRouter()
+        router.add_route(Config.MQTT_ACK_TOPIC, self.handle_ack)
+        for sector, pattern in Config.MQTT_TOPICS.items():
+            base = pattern[:-2] if pattern.endswith('/#') else pattern
+            # Our own control commands echoed back by the broker
+            router.add_route(f"{base}/{{sensor}}/control", self.handle_control_echo, sector=sector)
+            router.add_route(f"{base}/{{sensor}}", self.handle_sensor_reading, sector=sector)
+            # Deeper topics keep their full path, e.g. floor2/room12/temp
+            router.add_route(f"{base}/{{sensor#}}", self.handle_sensor_reading, sector=sector)
+        return router
+    
+    def add_topic_handler(self, pattern, handler, **defaults):
+        """Register handler(topic, captures, raw_payload) for a topic pattern; see TopicRouter"""
+        return self.router.add_route(pattern, handler, **defaults)
+    
+    def process_message(self, topic, raw_payload):
+        """Route a message to its handler (runs on a pipeline worker, which counts and logs handler errors)"""
+        if not self.router.dispatch(topic, raw_payload):
+            logger.debug(f"No route for MQTT topic {topic}")
+    
+    def handle_control_echo(self, topic, captures, raw_payload):
+        logger.debug(f"Ignoring control echo on {topic}")
+    
+    def handle_ack(self, topic, captures, raw_payload):
+        """Match a control acknowledgement from an ESP32 to its command"""
+        payload = self.codecs.decode(topic, raw_payload)
+        cid = payload.get('cid')
+        if cid is not None:
+            self.acks.acknowledge(cid, payload.get('status', 'ok'))
+    
+    def handle_sensor_reading(self, topic, captures, raw_payload):
+        """Decode a sensor reading and update sensor state"""
+        sector = captures['sector']
+        sensor_type = captures['sensor']
+        if not sensor_type or sensor_type.endswith('/control'):
+            return
+        
+        # Parse payload
+        payload = self.codecs.decode(topic, raw_payload)
+        
+        # Update sensor data
+        sector_data = self.sensor_data.setdefault(sector, {})
+        record = {
+            'value': payload.get('value', 0),
+            'unit': payload.get('unit', ''),
+            'active': payload.get('active', True),
+            'timestamp': datetime.now().isoformat()
+        }
+        # Stamped and queued under the publish lock, so a frame's seq never passes an update still unsent
+        with self.journal.publish_lock:
+            record['seq'] = self.journal.record('sensor', (sector, sensor_type), record)
+            sector_data[sensor_type] = record
+            # Queue for the next batched SocketIO frame
+            if self.socketio:
+                self.emitter.queue_update(sector, sensor_type, record)
+        self.version.bump()
+        if self.shared_table is not None:
+            self.shared_table.update(sector, sensor_type, payload.get('value', 0),
+                                     payload.get('unit', ''), payload.get('active', True))
+        self.history.record(sector, sensor_type, payload.get('value', 0))
+        self.liveness.seen(sector, sensor_type)
+        if self.anomalies.enabled:
+            self.anomalies.add(sector, sensor_type, payload.get('value', 0))
+        
+        logger.debug(f"Sensor update: {sector}/{sensor_type} = {payload.get('value')}")
+    
+    def collect_metrics(self):
+        """Scrape-time metric families for the metrics registry"""
+        emitter = self.emitter.get_stats()
+        acks = self.acks.get_stats()
+        anomalies = self.anomalies.get_stats()
+        nodes = self.liveness.get_stats()
+        return self.pipeline.collect_metrics() + [
+            ('smartcam_mqtt_connected', 'gauge', 'Whether the MQTT client is connected',
+             [({}, int(self.is_connected))]),
+            ('smartcam_sensor_updates_coalesced_total', 'counter', 'Sensor updates merged into a later emit',
+             [({}, max(0, emitter['emits_saved']))]),
+            ('smartcam_sensor_emit_pending', 'gauge', 'Sensor updates waiting for the next batched emit',
+             [({}, emitter['pending'])]),
+            ('smartcam_control_commands_total', 'counter', 'Control commands by outcome',
+             [({'result': 'sent'}, acks['sent']), ({'result': 'acked'}, acks['acked']),
+              ({'result': 'timeout'}, acks['timeouts']), ({'result': 'late_ack'}, acks['late_acks'])]),
+            ('smartcam_sensor_anomalies_total', 'counter', 'Sensor anomalies raised by kind',
+             [({'kind': 'spike'}, anomalies['spikes']), ({'kind': 'stuck'}, anomalies['stuck'])]),
+            ('smartcam_anomaly_readings_dropped_total', 'counter', 'Readings not scored because the queue was full',
+             [({}, anomalies['dropped'])]),
+            ('smartcam_nodes', 'gauge', 'ESP32 nodes by liveness status',
+             [({'status': status}, nodes[status]) for status in ('online', 'offline', 'never_seen')]),
+            ('smartcam_node_transitions_total', 'counter', 'ESP32 nodes going offline or coming back online',
+             [({'to': 'offline'}, nodes['went_offline']), ({'to': 'online'}, nodes['came_online'])])
+        ]
+    
+    def handle_anomalies(self, anomalies):
+        """Push a scoring pass's anomalies to the dashboard (runs on the detector thread)"""
+        if self.socketio:
+            self.socketio.emit('sensor_anomaly', {
+                'anomalies': anomalies,
+                'timestamp': datetime.now().isoformat()
+            }, to=EVENT_ROOMS['anomalies'])
+            SOCKET_EMITS.labels('sensor_anomaly').inc()
+        if self.on_anomaly:
+            self.on_anomaly(anomalies)
+        logger.warning(f"{len(anomalies)} sensor anomaly(ies), first: {anomalies[0]['sector']}/"
+                       f"{anomalies[0]['sensor']} {anomalies[0]['kind']}")
+    
+    def handle_node_change(self, event_name, node):
+        """Push a node_online/node_offline transition to the dashboard"""
+        if self.socketio:
+            self.socketio.emit(event_name, {**node, 'timestamp': datetime.now().isoformat()}, to=EVENT_ROOMS['nodes'])
+            SOCKET_EMITS.labels(event_name).inc()
+    
+    def get_node_health(self, sector=None):
+        """Liveness of every ESP32 node and the age of each of its sensors"""
+        if not self.ingest:
+            return self.liveness.report_snapshot(self.shared_table.snapshot(), sector)
+        return self.liveness.report(sector)
+    
+    def get_ingest_stats(self):
+        """Return ingest pipeline metrics"""
+        return self.pipeline.get_stats()
+    
+    def start_workers(self):
+        """Start the ingest workers and the batched SocketIO emitter"""
+        self.pipeline.start()
+        if self.ingest:
+            self.anomalies.start()
+            self.liveness.start()
+        if self.socketio:
+            self.emitter.start()
     
     def connect(self):
         try:
+            self.start_workers()
             self.client.connect(Config.MQTT_BROKER, Config.MQTT_PORT, Config.MQTT_KEEPALIVE)
             self.client.loop_start()
             logger.info(f"MQTT client started, connecting to {Config.MQTT_BROKER}:{Config.MQTT_PORT}")
@@ -82,12 +218,15 @@ class MQTTHandler:
     def disconnect(self):
         self.client.loop_stop()
         self.client.disconnect()
+        self.emitter.stop()
+        self.anomalies.stop()
+        self.liveness.stop()
         logger.info("MQTT client disconnected")
     
     def publish(self, topic, payload):
         """Publish control commands to ESP32 nodes"""
         try:
-            self.client.publish(topic, json.dumps(payload))
+            self.client.publish(topic, self.codecs.encode(topic, payload))
             logger.info(f"Published to {topic}: {payload}")
             return True
         except Exception as e:
@@ -96,10 +235,80 @@ class MQTTHandler:
     
     def get_sensor_data(self):
         """Return all current sensor data"""
+        if not self.ingest:
+            return self.shared_table.snapshot()
         return self.sensor_data
     
+    def get_sensor_version(self):
+        """Version that changes whenever get_sensor_data() would"""
+        if not self.ingest:
+            return self.shared_table.sequence
+        return self.version.value
+    
+    def get_sensor_history(self, sector=None, sensor=None, start=None, end=None, resolution=None):
+        """Return downsampled sensor history"""
+        return self.history.query(sector, sensor, start, end, resolution)
+    
     def control_sensor(self, sector, sensor, action):
         """Send control command to ESP32"""
         topic = f"campus/{sector}/{sensor}/control"
         payload = {'action': action, 'timestamp': datetime.now().isoformat()}
-        return self.publish(topic, payload)
\ No newline at end of file
+        return self.publish(topic, payload)
+    
+    def control_sensors(self, commands, qos=None, timeout=None):
+        """Publish a batch of control commands and wait for ESP32 acknowledgements"""
+        if qos is None:
+            qos = Config.MQTT_CONTROL_QOS
+        
+        results = []
+        published = []
+        timestamp = datetime.now().isoformat()
+        
+        for command in commands:
+            sector = command.get('sector')
+            sensor = command.get('sensor')
+            action = command.get('action')
+            result = {'sector': sector, 'sensor': sensor, 'action': action}
+            results.append(result)
+            
+            if not sector or not sensor or action is None:
+                result['status'] = 'invalid'
+                continue
+            
+            topic = f"campus/{sector}/{sensor}/control"
+            cid = self.acks.next_cid()
+            payload = {'action': action, 'timestamp': timestamp, 'cid': cid, 'reply_to': Config.MQTT_ACK_TOPIC}
+            result['cid'] = cid
+            
+            # Track before publishing so a fast ack can't arrive first
+            pending = self.acks.track(cid, sector, sensor, action)
+            try:
+                info = self.client.publish(topic, self.codecs.encode(topic, payload), qos=qos)
+            except Exception as e:
+                logger.error(f"Failed to publish to {topic}: {e}")
+                info = None
+            
+            if info is None or info.rc != mqtt.MQTT_ERR_SUCCESS:
+                self.acks.discard(cid)
+                result['status'] = 'failed'
+                continue
+            published.append((pending, info, result))
+        
+        self.acks.wait([pending for pending, _, _ in published], timeout)
+        
+        for pending, info, result in published:
+            if pending.acked:
+                result['status'] = 'acked' if pending.ack_status == 'ok' else pending.ack_status
+                result['latency_ms'] = round(pending.latency_ms, 2)
+            elif qos > 0 and info.is_published():
+                # The broker has it but the node never answered
+                result['status'] = 'delivered'
+            else:
+                result['status'] = 'timeout'
+        
+        logger.info(f"Published {len(published)}/{len(commands)} control commands with QoS {qos}")
+        return results
+    
+    def get_control_stats(self):
+        """Return control acknowledgement counters and latency distribution"""
+        return self.acks.get_stats()
\ No newline at end of file
@@ -0,0 +1,111 @@
+"""Multi-process entry point: one MQTT ingest process plus N HTTP/socket workers.
+
+The launcher creates the shared sensor table and the message hub, binds
+the listening socket once, and then starts:
+
+- ingest: subscribes to the campus topics and writes every reading to the
+  shared table. It is the only process with an MQTT connection, the system
+  and packet samplers and background monitoring. Its socket broadcasts
+  (sensor_batch, system_stats, attacks) go through the hub.
+- worker x HTTP_WORKERS: serve the REST routes and Socket.IO clients on the
+  shared socket. /api/sensors reads the shared table without copying the
+  state between processes.
+
+Everything else a worker needs from the ingest process goes through
+IngestService on INGEST_SERVICE_ADDRESS. That covers sensor history,
+anomaly, node, emit and journal stats, and system stats. It also covers
+sensor control and the security state: blocked IPs, failed-login counts and
+attacks a worker detects, so brute-force thresholds and email digests are
+shared. Attack counts and the attack-log cache version come from the shared
+SQLite database.
+
+The hub and ingest sockets are only accessible to this user, and they
+authenticate with a random key generated for each launch.
+
+Socket.IO clients must use the websocket transport. Long-polling needs
+sticky sessions, and the kernel spreads connections across workers.
+
+Run with: python multiprocess.py
+"""
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def run_ingest(authkey):
+    Config.PROCESS_AUTHKEY = authkey
+    import app
+
+    app.start_services()
+    while True:
+        time.sleep(3600)
+
+def run_worker(listen_socket, authkey):
+    from werkzeug.serving import make_server
+    Config.PROCESS_AUTHKEY = authkey
+    # MQTT, the samplers and monitoring all run in the ingest process
+    import app
+
+    server = make_server(Config.FLASK_HOST, Config.FLASK_PORT, app.app, threaded=True,
+                         fd=listen_socket.fileno())
+    logger.info(f"Worker {os.getpid()} serving on {Config.FLASK_HOST}:{Config.FLASK_PORT}")
+    server.serve_forever()
+
+def handle_sigterm(signum, frame):
+    raise KeyboardInterrupt
+
+def start_process(context, role, target, args=()):
+    # Config reads PROCESS_ROLE at import, and spawned children inherit the environment
+    os.environ['PROCESS_ROLE'] = role
+    process = context.Process(target=target, args=args, name=role, daemon=True)
+    process.start()
+    return process
+
+def main():
+    from shared_state import SharedSensorTable
+    from message_hub import MessageHub
+
+    # Set before anything connects; children get it as an argument, never through the environment
+    Config.PROCESS_AUTHKEY = os.urandom(32)
+    table = SharedSensorTable.create()
+    hub = MessageHub()
+    hub.start()
+
+    listen_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listen_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listen_socket.bind((Config.FLASK_HOST, Config.FLASK_PORT))
+    listen_socket.listen(1024)
+
+    # spawn, not fork: the launcher already runs hub threads
+    context = multiprocessing.get_context('spawn')
+    processes = [start_process(context, 'ingest', run_ingest, (Config.PROCESS_AUTHKEY,))]
+    for _ in range(Config.HTTP_WORKERS):
+        processes.append(start_process(context, 'worker', run_worker, (listen_socket, Config.PROCESS_AUTHKEY)))
+    logger.info(f"Started ingest process and {Config.HTTP_WORKERS} worker(s) on "
+                f"{Config.FLASK_HOST}:{Config.FLASK_PORT}")
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    try:
+        while all(process.is_alive() for process in processes):
+            time.sleep(1)
+        logger.error("A backend process exited, shutting down")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join(timeout=5)
+        hub.stop()
+        listen_socket.close()
+        table.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from config import Config
+from subscriptions import alias_key
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class TimerWheel:
+    """Hashed timer wheel: O(1) schedule and cancel, expiry cost proportional to what expires.
+
+    Deadlines are rounded up to the next tick and hashed into slots by tick
+    number. Deadlines further out than one turn of the wheel share a slot with
+    nearer ones and are skipped until their own tick comes round.
+    """
+
+    def __init__(self, tick=None, slots=None, now=None):
+        self.tick = tick or Config.NODE_WHEEL_TICK
+        self.size = slots or Config.NODE_WHEEL_SLOTS
+        self.slots = [{} for _ in range(self.size)]
+        # key -> slot index, so a key can be moved or cancelled without searching
+        self.where = {}
+        self.current = int((time.monotonic() if now is None else now) // self.tick)
+
+    def schedule(self, key, deadline):
+        """(Re)schedule key to expire at monotonic time `deadline`"""
+        self.cancel(key)
+        expires = max(-int(-deadline // self.tick), self.current + 1)
+        index = expires % self.size
+        self.slots[index][key] = expires
+        self.where[key] = index
+
+    def cancel(self, key):
+        index = self.where.pop(key, None)
+        if index is not None:
+            del self.slots[index][key]
+
+    def advance(self, now):
+        """Move the wheel to `now` and return the keys whose deadline has passed"""
+        target = int(now // self.tick)
+        expired = []
+        # After a long stall one full turn visits every slot
+        for step in range(1, min(target - self.current, self.size) + 1):
+            index = (self.current + step) % self.size
+            bucket = self.slots[index]
+            if not bucket:
+                continue
+            due = [key for key, expires in bucket.items() if expires <= target]
+            if len(due) == len(bucket):
+                self.slots[index] = {}
+            else:
+                for key in due:
+                    del bucket[key]
+            for key in due:
+                del self.where[key]
+            expired += due
+        self.current = max(self.current, target)
+        return expired
+
+    def __len__(self):
+        return len(self.where)
+
+class NodeState:
+    __slots__ = ('node', 'sector', 'info', 'status', 'last_seen', 'changed_at', 'messages', 'sensors')
+
+    def __init__(self, node, sector, info=None):
+        self.node = node
+        self.sector = sector
+        self.info = info or {}
+        self.status = 'never_seen'
+        self.last_seen = None
+        self.changed_at = None
+        self.messages = 0
+        # sensor -> monotonic last-seen time
+        self.sensors = {}
+
+class NodeLiveness:
+    """Tracks when each ESP32 node and sensor was last heard from.
+
+    Every message only writes a monotonic timestamp. Each online node has one
+    entry in a TimerWheel at last_seen + timeout; when it fires the node is
+    re-armed from its latest timestamp if it has spoken since, otherwise it
+    goes offline. Detection therefore costs one wheel operation per node per
+    timeout, not a scan of every node each tick.
+    """
+
+    def __init__(self, on_change=None, timeout=None, tick=None, slots=None):
+        self.on_change = on_change
+        self.timeout = timeout or Config.NODE_OFFLINE_TIMEOUT
+        self.wheel = TimerWheel(tick, slots)
+        self.nodes = {}
+        # (sector, sensor) -> node id
+        self.node_ids = {}
+        # Sectors whose flat sensor topics belong to a configured ESP32 node
+        self.sector_nodes = {}
+        # Sector key, ESP32 node key or node display name -> sector
+        self.aliases = {}
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+        self.went_offline = 0
+        self.came_online = 0
+
+        configured = {alias_key(node): (node, info) for node, info in Config.ESP32_NODES.items()}
+        for sector in Config.MQTT_TOPICS:
+            node, info = configured.get(alias_key(sector), (sector, None))
+            self.sector_nodes[sector] = node
+            self.aliases[alias_key(sector)] = sector
+            if info is not None:
+                self.nodes[node] = NodeState(node, sector, info)
+                self.aliases[alias_key(info['name'])] = sector
+
+    def node_id(self, sector, sensor):
+        """'node12/temperature' belongs to node 'sector/node12'; a flat sensor to the sector's ESP32 node"""
+        key = (sector, sensor)
+        node = self.node_ids.get(key)
+        if node is None:
+            head, sep, _ = sensor.partition('/')
+            node = f"{sector}/{head}" if sep else self.sector_nodes.get(sector, sector)
+            self.node_ids[key] = node
+        return node
+
+    def seen(self, sector, sensor, now=None):
+        """Record a message (runs on the ingest workers)"""
+        if now is None:
+            now = time.monotonic()
+        node = self.nodes.get(self.node_id(sector, sensor))
+        # New nodes, new sensors and offline nodes take the lock; the rest is a few attribute writes
+        if node is None or node.status != 'online' or sensor not in node.sensors:
+            self.mark_online(sector, sensor, now)
+            return
+        node.last_seen = now
+        # check() may have marked the node offline since the status test above; it sets the status
+        # before reading last_seen, so either it sees this write or this read sees 'offline'
+        if node.status != 'online':
+            self.mark_online(sector, sensor, now)
+            return
+        node.messages += 1
+        node.sensors[sensor] = now
+
+    def mark_online(self, sector, sensor, now):
+        node_id = self.node_id(sector, sensor)
+        with self.lock:
+            node = self.nodes.get(node_id)
+            if node is None:
+                node = self.nodes[node_id] = NodeState(node_id, sector)
+            node.last_seen = now
+            node.messages += 1
+            node.sensors[sensor] = now
+            if node.status == 'online':
+                return
+            previous = node.status
+            node.status = 'online'
+            node.changed_at = now
+            self.came_online += 1
+            self.wheel.schedule(node_id, now + self.timeout)
+            event = self.describe(node, now)
+        if previous == 'offline':
+            logger.info(f"ESP32 node {node_id} is back online")
+        self.notify('node_online', event)
+
+    def check(self, now=None):
+        """Advance the wheel; re-arm nodes heard from since, mark the rest offline"""
+        if now is None:
+            now = time.monotonic()
+        events = []
+        with self.lock:
+            for node_id in self.wheel.advance(now):
+                node = self.nodes[node_id]
+                # Status first: seen() updates last_seen without the lock and re-reads the status after
+                node.status = 'offline'
+                if now - node.last_seen < self.timeout:
+                    node.status = 'online'
+                    self.wheel.schedule(node_id, node.last_seen + self.timeout)
+                    continue
+                node.changed_at = now
+                self.went_offline += 1
+                events.append(self.describe(node, now))
+        for event in events:
+            logger.warning(f"ESP32 node {event['node']} offline, silent for {event['silent_seconds']} s")
+            self.notify('node_offline', event)
+        return events
+
+    def notify(self, event_name, event):
+        if self.on_change:
+            try:
+                self.on_change(event_name, event)
+            except Exception as e:
+                logger.error(f"Error in node liveness callback: {e}")
+
+    def describe(self, node, now, wall=None):
+        """JSON view of a node; monotonic times become ISO timestamps and ages"""
+        if wall is None:
+            wall = time.time()
+        view = {
+            'node': node.node,
+            'sector': node.sector,
+            'name': node.info.get('name', node.node),
+            'esp32_id': node.info.get('esp32_id'),
+            'status': node.status,
+            'last_seen': None,
+            'silent_seconds': None,
+            'messages': node.messages
+        }
+        if node.last_seen is not None:
+            view['last_seen'] = datetime.fromtimestamp(wall - (now - node.last_seen)).isoformat()
+            view['silent_seconds'] = round(now - node.last_seen, 1)
+        return view
+
+    def describe_sensors(self, node, now):
+        return {
+            sensor: {'silent_seconds': round(now - seen, 1), 'stale': now - seen >= self.timeout}
+            for sensor, seen in sorted(node.sensors.items())
+        }
+
+    def report(self, sector=None, nodes=None, now=None):
+        """Health of every node (or one sector's), with per-sensor ages and a status summary"""
+        if now is None:
+            now = time.monotonic()
+        wall = time.time()
+        with self.lock:
+            if nodes is None:
+                nodes = list(self.nodes.values())
+            wanted = None if sector is None else self.aliases.get(alias_key(sector), sector)
+            selected = [node for node in nodes if wanted is None or node.sector == wanted]
+            views = []
+            for node in sorted(selected, key=lambda node: node.node):
+                view = self.describe(node, now, wall)
+                view['sensors'] = self.describe_sensors(node, now)
+                views.append(view)
+        summary = dict.fromkeys(('online', 'offline', 'never_seen'), 0)
+        for view in views:
+            summary[view['status']] += 1
+        return {'timeout_seconds': self.timeout, 'summary': summary, 'nodes': views}
+
+    def report_snapshot(self, data, sector=None):
+        """report() built from a sensor snapshot's timestamps, for processes that don't ingest"""
+        now = time.monotonic()
+        wall = time.time()
+        nodes = {node: NodeState(node, state.sector, state.info) for node, state in self.nodes.items()}
+        for sector_name, sensors in data.items():
+            for sensor, record in sensors.items():
+                timestamp = record.get('timestamp')
+                if not timestamp:
+                    continue
+                node_id = self.node_id(sector_name, sensor)
+                node = nodes.get(node_id)
+                if node is None:
+                    node = nodes[node_id] = NodeState(node_id, sector_name)
+                seen = now - (wall - datetime.fromisoformat(timestamp).timestamp())
+                node.sensors[sensor] = seen
+                if node.last_seen is None or seen > node.last_seen:
+                    node.last_seen = seen
+        for node in nodes.values():
+            if node.last_seen is not None:
+                node.status = 'online' if now - node.last_seen < self.timeout else 'offline'
+        # Message counts are only known to the ingest process
+        return self.report(sector, list(nodes.values()), now)
+
+    def run(self):
+        while self.running:
+            time.sleep(self.wheel.tick)
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Error checking node liveness: {e}")
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        logger.info(f"Node liveness checker started (offline after {self.timeout} s)")
+
+    def stop(self):
+        self.running = False
+
+    def get_stats(self):
+        with self.lock:
+            statuses = [node.status for node in self.nodes.values()]
+            scheduled = len(self.wheel)
+        return {
+            'nodes': len(statuses),
+            'online': statuses.count('online'),
+            'offline': statuses.count('offline'),
+            'never_seen': statuses.count('never_seen'),
+            'went_offline': self.went_offline,
+            'came_online': self.came_online,
+            'scheduled': scheduled
+        }
@@ -0,0 +1,150 @@
+import json
+import logging
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+class JsonCodec:
+    """Standard library JSON, always available"""
+    name = 'stdlib_json'
+    marker = b'\x03'
+
+    def decode(self, data):
+        return json.loads(data)
+
+    def encode(self, obj):
+        return json.dumps(obj, separators=(',', ':')).encode()
+
+class OrjsonCodec:
+    name = 'orjson'
+    marker = b'\x03'
+
+    def decode(self, data):
+        return orjson.loads(data)
+
+    def encode(self, obj):
+        return orjson.dumps(obj)
+
+class MsgpackCodec:
+    name = 'msgpack'
+    marker = b'\x01'
+
+    def decode(self, data):
+        return msgpack.unpackb(data, raw=False)
+
+    def encode(self, obj):
+        return msgpack.packb(obj, use_bin_type=True)
+
+class CborCodec:
+    name = 'cbor'
+    marker = b'\x02'
+
+    def decode(self, data):
+        return cbor2.loads(data)
+
+    def encode(self, obj):
+        return cbor2.dumps(obj)
+
+def topic_matches(pattern, topic):
+    """MQTT-style topic match supporting '+' and '#' wildcards"""
+    pattern_parts = pattern.split('/')
+    topic_parts = topic.split('/')
+    for i, part in enumerate(pattern_parts):
+        if part == '#':
+            return True
+        if i >= len(topic_parts) or (part != '+' and part != topic_parts[i]):
+            return False
+    return len(pattern_parts) == len(topic_parts)
+
+class CodecRegistry:
+    """Chooses a payload codec per message.
+
+    A payload starting with a codec marker byte (0x01 MessagePack, 0x02 CBOR,
+    0x03 JSON) is decoded with that codec; JSON text can never start with these
+    bytes. Otherwise the codec configured for the topic in MQTT_TOPIC_CODECS is
+    used, falling back to MQTT_DEFAULT_CODEC. 'json' means orjson when it is
+    installed and the standard library otherwise.
+    """
+
+    # Topics cached before the cache is cleared; '#' patterns match any number of distinct topics
+    TOPIC_CACHE_SIZE = 4096
+
+    def __init__(self, topic_codecs=None, default=None):
+        self.codecs = {}
+        self.register('stdlib_json', JsonCodec())
+        self.register('json', OrjsonCodec() if orjson else JsonCodec())
+        if orjson:
+            self.register('orjson', OrjsonCodec())
+        if msgpack:
+            self.register('msgpack', MsgpackCodec())
+        if cbor2:
+            self.register('cbor', CborCodec())
+
+        # Marker byte -> codec; JSON markers use the preferred JSON codec
+        self.markers = {}
+        for name in ('msgpack', 'cbor', 'json'):
+            codec = self.codecs.get(name)
+            if codec is not None:
+                self.markers[codec.marker[0]] = codec
+
+        self.topic_codecs = topic_codecs if topic_codecs is not None else Config.MQTT_TOPIC_CODECS
+        self.default = self.get(default or Config.MQTT_DEFAULT_CODEC)
+        # topic -> codec, cleared when it reaches TOPIC_CACHE_SIZE
+        self.topic_cache = {}
+
+    def register(self, name, codec):
+        self.codecs[name] = codec
+
+    def get(self, name):
+        codec = self.codecs.get(name)
+        if codec is None:
+            logger.warning(f"Codec '{name}' is not available, using JSON")
+            codec = self.codecs['json']
+        return codec
+
+    def codec_for_topic(self, topic):
+        if not self.topic_codecs:
+            return self.default
+        codec = self.topic_cache.get(topic)
+        if codec is None:
+            codec = self.default
+            for pattern, name in self.topic_codecs.items():
+                if topic_matches(pattern, topic):
+                    codec = self.get(name)
+                    break
+            if len(self.topic_cache) >= self.TOPIC_CACHE_SIZE:
+                self.topic_cache.clear()
+            self.topic_cache[topic] = codec
+        return codec
+
+    def decode(self, topic, data):
+        """Decode a raw MQTT payload"""
+        if data:
+            codec = self.markers.get(data[0])
+            if codec is not None:
+                return codec.decode(data[1:])
+        return self.codec_for_topic(topic).decode(data)
+
+    def encode(self, topic, obj, codec_name=None):
+        """Encode an object for publishing; binary codecs are prefixed with their marker byte"""
+        codec = self.get(codec_name) if codec_name else self.codec_for_topic(topic)
+        data = codec.encode(obj)
+        if codec.marker != JsonCodec.marker:
+            return codec.marker + data
+        return data
@@ -0,0 +1,104 @@
+import logging
+import re
+import threading
+import time
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def load_signatures(path):
+    """Load extra signatures from a file, one per line ('#' starts a comment)"""
+    signatures = []
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    signatures.append(line)
+    except OSError as e:
+        logger.error(f"Failed to load payload signatures from {path}: {e}")
+    return signatures
+
+def build_trie_pattern(signatures):
+    """Build a regex whose alternations share prefixes, so matching at a position is O(signature length)"""
+    trie = {}
+    for signature in signatures:
+        if not signature:
+            continue
+        node = trie
+        for char in signature:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def emit(node):
+        # Any match is enough, so a signature ending here makes longer ones redundant
+        if '' in node:
+            return ''
+        branches = [re.escape(char) + emit(node[char]) for char in sorted(node)]
+        return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+
+    if not trie:
+        return '(?!)'
+    return emit(trie)
+
+class PayloadScanner:
+    """Single-pass, case-insensitive multi-signature matcher"""
+
+    def __init__(self, signatures=None):
+        if signatures is None:
+            signatures = list(Config.SQL_INJECTION_PATTERNS)
+            if Config.PAYLOAD_SIGNATURES_FILE:
+                signatures += load_signatures(Config.PAYLOAD_SIGNATURES_FILE)
+
+        # Map each lowercased signature back to its original spelling for alerts
+        self.signatures = {}
+        for signature in signatures:
+            self.signatures.setdefault(signature.lower(), signature)
+        # Patterns are lowercased up front and inputs lowercased once per scan, which keeps
+        # the regex case-sensitive so the engine can skip ahead on its first-character set
+        self.pattern = re.compile(build_trie_pattern(self.signatures))
+
+        self.lock = threading.Lock()
+        self.scans = 0
+        self.matches = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def find(self, text):
+        """Return the first signature found in text, or None"""
+        match = self.pattern.search(text.lower())
+        if match is None:
+            return None
+        return self.signatures[match.group(0)]
+
+    def scan(self, *texts):
+        """Scan several texts in one timed call, returning the first signature found"""
+        start = time.perf_counter()
+        found = None
+        for text in texts:
+            if text:
+                found = self.find(text)
+                if found is not None:
+                    break
+        elapsed = time.perf_counter() - start
+
+        with self.lock:
+            self.scans += 1
+            self.total_time += elapsed
+            if elapsed > self.max_time:
+                self.max_time = elapsed
+            if found is not None:
+                self.matches += 1
+        return found
+
+    def get_stats(self):
+        """Return signature count and per-scan overhead"""
+        with self.lock:
+            return {
+                'signatures': len(self.signatures),
+                'scans': self.scans,
+                'matches': self.matches,
+                'avg_us': round(self.total_time / self.scans * 1e6, 2) if self.scans else 0.0,
+                'max_us': round(self.max_time * 1e6, 2)
+            }
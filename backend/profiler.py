@@ -0,0 +1,82 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def thread_group(name):
+    """'Thread-12 (process_request_thread)' -> 'Thread (process_request_thread)', so pools merge"""
+    return re.sub(r'-\d+', '', name)
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def collapse(frame):
+    """Root-first 'outer;...;inner' stack of a frame, as used by flamegraph.pl and speedscope"""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+class SamplingProfiler:
+    """Wall-clock sampling profiler over every thread in the process.
+
+    Samples are taken by the thread that asked for the profile, so nothing
+    runs between profiles and leaving it enabled costs nothing. Only one
+    profile runs at a time.
+    """
+
+    def __init__(self, interval=None, max_duration=None):
+        self.interval = interval or Config.PROFILER_INTERVAL
+        self.max_duration = max_duration or Config.PROFILER_MAX_DURATION
+        self.lock = threading.Lock()
+
+    def busy(self):
+        return self.lock.locked()
+
+    def profile(self, duration):
+        """Sample for `duration` seconds and return a result dict, or None if a profile is already running"""
+        if not self.lock.acquire(blocking=False):
+            return None
+        try:
+            duration = max(0.1, min(float(duration), self.max_duration))
+            own = threading.get_ident()
+            stacks = Counter()
+            samples = 0
+            sampling_time = 0.0
+            start = time.monotonic()
+            deadline = start + duration
+
+            while time.monotonic() < deadline:
+                sample_start = time.perf_counter()
+                names = {thread.ident: thread_group(thread.name) for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident != own:
+                        stacks[f"{names.get(ident, 'thread')};{collapse(frame)}"] += 1
+                samples += 1
+                sampling_time += time.perf_counter() - sample_start
+                time.sleep(self.interval)
+
+            elapsed = time.monotonic() - start
+            logger.info(f"Profiled {samples} samples over {elapsed:.1f}s")
+            return {
+                'duration': round(elapsed, 3),
+                'samples': samples,
+                'stacks': stacks,
+                'overhead': round(sampling_time / elapsed, 4) if elapsed else 0.0
+            }
+        finally:
+            self.lock.release()
+
+    @staticmethod
+    def format_collapsed(stacks):
+        """One 'stack count' line per unique stack, heaviest first"""
+        return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
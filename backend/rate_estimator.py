@@ -0,0 +1,80 @@
+import threading
+import time
+from array import array
+
+class RateEstimator:
+    """Sliding-window event rate over several windows using a ring of fixed-width buckets.
+
+    Both add() and rate() are O(1): each window keeps a running sum, and a
+    bucket is subtracted from a window's sum as it slides out of that window.
+    """
+
+    def __init__(self, windows=(1, 10, 60), bucket_width=0.5):
+        self.bucket_width = bucket_width
+        self.windows = tuple(sorted(windows))
+        # Width of each window in buckets
+        self.window_buckets = {w: max(1, int(round(w / bucket_width))) for w in self.windows}
+        self.capacity = max(self.window_buckets.values())
+        self.buckets = array('d', [0.0]) * self.capacity
+        self.sums = {w: 0.0 for w in self.windows}
+        self.current = None
+        self.started = None
+        self.lock = threading.Lock()
+
+    def _advance(self, bucket):
+        if self.current is None:
+            self.current = bucket
+            return
+
+        steps = bucket - self.current
+        if steps <= 0:
+            return
+
+        if steps >= self.capacity:
+            # Everything we hold is older than the largest window
+            for i in range(self.capacity):
+                self.buckets[i] = 0.0
+            for w in self.windows:
+                self.sums[w] = 0.0
+        else:
+            for b in range(self.current + 1, bucket + 1):
+                for w, n in self.window_buckets.items():
+                    self.sums[w] -= self.buckets[(b - n) % self.capacity]
+                self.buckets[b % self.capacity] = 0.0
+        self.current = bucket
+
+    def add(self, count=1, now=None):
+        """Record `count` events at time `now`"""
+        if now is None:
+            now = time.monotonic()
+        with self.lock:
+            if self.started is None:
+                self.started = now
+            self._advance(int(now // self.bucket_width))
+            self.buckets[self.current % self.capacity] += count
+            for w in self.windows:
+                self.sums[w] += count
+
+    def rate(self, window, now=None):
+        """Return events per second over the last `window` seconds"""
+        if now is None:
+            now = time.monotonic()
+        with self.lock:
+            if self.started is None:
+                return 0.0
+            self._advance(int(now // self.bucket_width))
+
+            # The current bucket is only partially elapsed
+            n = self.window_buckets[window]
+            partial = now - self.current * self.bucket_width
+            span = (n - 1) * self.bucket_width + partial
+            span = min(span, now - self.started)
+            if span < self.bucket_width:
+                span = self.bucket_width
+            return self.sums[window] / span
+
+    def rates(self, now=None):
+        """Return the rate for every configured window"""
+        if now is None:
+            now = time.monotonic()
+        return {f"{w}s": round(self.rate(w, now), 2) for w in self.windows}
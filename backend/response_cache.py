@@ -0,0 +1,91 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from config import Config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def encode_json(data):
+    if orjson:
+        return orjson.dumps(data, default=str)
+    return json.dumps(data, separators=(',', ':'), default=str).encode()
+
+class StateVersion:
+    """Monotonic counter bumped whenever the owning component's state changes"""
+
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def bump(self):
+        with self.lock:
+            self.value += 1
+            return self.value
+
+class ResponseCache:
+    """Encoded JSON bodies keyed by endpoint, reused while the state version is unchanged.
+
+    The ETag is a hash of the encoded body, so it is a valid strong validator
+    even across restarts or when a version bump left the content unchanged.
+    """
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity or Config.RESPONSE_CACHE_SIZE
+        # key -> (version, etag, body)
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key, version, build):
+        """Return (etag, body) for key, calling build() only when version has moved on"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], entry[2]
+
+        # Build outside the lock; version was read before the state, so a
+        # concurrent mutation only makes this entry newer than its version
+        body = encode_json(build())
+        etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+
+        with self.lock:
+            self.entries[key] = (version, etag, body)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+            self.misses += 1
+        return etag, body
+
+    def count_not_modified(self):
+        with self.lock:
+            self.not_modified += 1
+
+    def collect_metrics(self):
+        """Scrape-time metric families for the metrics registry"""
+        stats = self.get_stats()
+        return [
+            ('smartcam_response_cache_requests_total', 'counter', 'Cached route lookups by outcome',
+             [({'result': 'hit'}, stats['hits']), ({'result': 'miss'}, stats['misses']),
+              ({'result': 'not_modified'}, stats['not_modified'])]),
+            ('smartcam_response_cache_entries', 'gauge', 'Encoded responses held', [({}, stats['entries'])])
+        ]
+
+    def get_stats(self):
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'capacity': self.capacity,
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'hit_rate': round(self.hits / requests, 3) if requests else 0.0
+            }
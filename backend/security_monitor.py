@@ -1,39 +1,91 @@
 import logging
 import subprocess
-import re
-from datetime import datetime, timedelta
-from collections import defaultdict
+import threading
+import time
+import psutil
+from datetime import datetime
 from config import Config
+from rate_estimator import RateEstimator
+from payload_scanner import PayloadScanner
+from attack_store import AttackStore
+from firewall import FirewallQueue, create_backend, is_valid_ip, never_block_networks, is_protected_ip
+from failure_tracker import FailureTracker
+from metrics import SOCKET_EMITS
+from subscriptions import EVENT_ROOMS
+from change_journal import ChangeJournal
+from arp_watcher import ArpWatcher
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Stats keys that differ from the normalised alert category
+CATEGORY_ALIASES = {
+    'dos_attack': 'dos'
+}
+
 class SecurityMonitor:
-    def __init__(self, socketio=None):
+    def __init__(self, socketio=None, email_alerts=None, journal=None):
         self.socketio = socketio
-        self.attack_log = []
+        self.email_alerts = email_alerts
+        self.attack_store = AttackStore()
+        self.journal = journal or ChangeJournal()
         self.blocked_ips = set()
-        self.failed_logins = defaultdict(int)
-        self.last_packet_count = 0
-        self.packet_timestamps = []
-        
-    def detect_dos_attack(self, packet_count):
-        """Detect DoS attack based on packet rate"""
-        current_time = datetime.now()
-        self.packet_timestamps.append(current_time)
+        self.never_block = never_block_networks()
+        self.firewall = FirewallQueue(create_backend(), on_applied=self.on_firewall_applied)
+        self.failed_logins = FailureTracker()
+        self.last_packet_count = None
+        self.packet_samples = 0
+        self.packet_rate = RateEstimator(windows=Config.DOS_RATE_WINDOWS)
+        self.packet_sampler_thread = None
+        self.payload_scanner = PayloadScanner()
+        self.arp_watcher = ArpWatcher(on_finding=self.log_arp_finding)
+        # Multi-process workers: callable(alert) that logs the attack in the ingest process instead
+        self.forward_attack = None
         
-        # Keep only last 60 seconds
-        one_minute_ago = current_time - timedelta(seconds=60)
-        self.packet_timestamps = [t for t in self.packet_timestamps if t > one_minute_ago]
+    def record_packets(self, packet_count):
+        """Feed a cumulative packet counter; the delta since the last call is recorded"""
+        if self.last_packet_count is not None and packet_count >= self.last_packet_count:
+            self.packet_rate.add(packet_count - self.last_packet_count)
+            self.packet_samples += 1
+        self.last_packet_count = packet_count
+    
+    def sample_packets(self):
+        """Sample received packets from the network interface counters"""
+        self.record_packets(psutil.net_io_counters().packets_recv)
+    
+    def run_packet_sampler(self):
+        while True:
+            try:
+                self.sample_packets()
+            except Exception as e:
+                logger.error(f"Error sampling packet counters: {e}")
+            time.sleep(Config.PACKET_SAMPLE_INTERVAL)
+    
+    def start_packet_sampler(self):
+        """Start the background packet-rate sampler thread"""
+        if self.packet_sampler_thread is not None:
+            return
+        self.packet_sampler_thread = threading.Thread(target=self.run_packet_sampler, daemon=True)
+        self.packet_sampler_thread.start()
+        logger.info("Packet rate sampler started")
+    
+    def get_packet_rates(self):
+        """Get packets per second for every configured window"""
+        return self.packet_rate.rates()
+    
+    def detect_dos_attack(self, connection_summary=None):
+        """Detect DoS attack based on packet rate and connection states"""
+        if connection_summary and self.detect_connection_flood(connection_summary):
+            return True
         
-        packets_per_second = len(self.packet_timestamps) / 60
+        packets_per_second = self.packet_rate.rate(Config.DOS_RATE_WINDOW)
         
-        if packets_per_second > Config.DOS_PACKET_THRESHOLD / 60:
+        if packets_per_second > Config.DOS_PACKET_THRESHOLD:
             alert = {
                 'type': 'critical',
                 'category': 'DoS Attack',
-                'message': f'High packet rate detected: {int(packets_per_second * 60)} packets/min',
-                'time': current_time.strftime('%H:%M:%S'),
+                'message': f'High packet rate detected: {int(packets_per_second)} packets/sec over {Config.DOS_RATE_WINDOW}s',
+                'time': datetime.now().strftime('%H:%M:%S'),
                 'severity': 'CRITICAL',
                 'source': 'Network Monitor'
             }
@@ -41,39 +93,99 @@ class SecurityMonitor:
             return True
         return False
     
-    def detect_sql_injection(self, input_string):
-        """Detect SQL injection patterns"""
-        for pattern in Config.SQL_INJECTION_PATTERNS:
-            if pattern.lower() in input_string.lower():
+    def detect_connection_flood(self, connection_summary):
+        """Detect SYN floods and single sources holding too many connections"""
+        if connection_summary['syn_recv'] > Config.SYN_FLOOD_THRESHOLD:
+            alert = {
+                'type': 'critical',
+                'category': 'DoS Attack',
+                'message': f'SYN flood suspected: {connection_summary["syn_recv"]} half-open connections',
+                'time': datetime.now().strftime('%H:%M:%S'),
+                'severity': 'CRITICAL',
+                'source': 'Network Monitor'
+            }
+            self.log_attack(alert)
+            return True
+        
+        for remote in connection_summary['top_remote']:
+            if remote['count'] > Config.CONNECTIONS_PER_IP_THRESHOLD:
                 alert = {
-                    'type': 'warning',
-                    'category': 'SQL Injection',
-                    'message': f'SQL injection pattern detected: {pattern}',
+                    'type': 'critical',
+                    'category': 'DoS Attack',
+                    'message': f'{remote["count"]} connections from {remote["ip"]}',
                     'time': datetime.now().strftime('%H:%M:%S'),
-                    'severity': 'HIGH',
-                    'source': 'Input Validation'
+                    'severity': 'CRITICAL',
+                    'source': remote['ip']
                 }
                 self.log_attack(alert)
                 return True
         return False
     
-    def detect_brute_force(self, ip_address):
-        """Detect brute force attacks"""
-        self.failed_logins[ip_address] += 1
+    def detect_sql_injection(self, *inputs, source='Input Validation'):
+        """Detect SQL injection patterns in one or more input strings"""
+        pattern = self.payload_scanner.scan(*inputs)
+        if pattern is not None:
+            alert = {
+                'type': 'warning',
+                'category': 'SQL Injection',
+                'message': f'SQL injection pattern detected: {pattern}',
+                'time': datetime.now().strftime('%H:%M:%S'),
+                'severity': 'HIGH',
+                'source': source
+            }
+            self.log_attack(alert)
+            return True
+        return False
+    
+    def log_sensor_anomaly(self, anomaly):
+        """Record a sensor anomaly from the detector in the attack log"""
+        if anomaly['kind'] == 'stuck':
+            message = f"Sensor stuck at {anomaly['value']} for {anomaly['readings']} readings"
+            severity = 'MEDIUM'
+        else:
+            message = f"Reading {anomaly['value']} is {anomaly['z']} standard deviations from the mean {anomaly['mean']}"
+            # Far outside the normal range is more likely tampering or a failing node than noise
+            severity = 'HIGH' if anomaly['z'] >= 2 * Config.ANOMALY_Z_THRESHOLD else 'MEDIUM'
+        alert = {
+            'type': 'warning',
+            'category': 'Sensor Anomaly',
+            'message': message,
+            'time': datetime.now().strftime('%H:%M:%S'),
+            'severity': severity,
+            'source': f"{anomaly['sector']}/{anomaly['sensor']}"
+        }
+        self.log_attack(alert)
+    
+    def get_inspection_stats(self):
+        """Get payload inspection overhead statistics"""
+        return self.payload_scanner.get_stats()
+    
+    def record_failed_login(self, ip_address):
+        """Record a failed login and flag a brute force attack once the windowed count hits the threshold"""
+        return self.count_failed_login(ip_address)[1]
+    
+    def count_failed_login(self, ip_address):
+        """Record a failed login; returns (failures in the window, brute force detected)"""
+        failures = self.failed_logins.record(ip_address)
         
-        if self.failed_logins[ip_address] >= Config.BRUTE_FORCE_THRESHOLD:
+        if failures >= Config.BRUTE_FORCE_THRESHOLD:
             alert = {
                 'type': 'warning',
                 'category': 'Brute Force',
-                'message': f'Multiple failed login attempts from {ip_address}',
+                'message': f'{failures} failed login attempts from {ip_address} in the last {Config.BRUTE_FORCE_WINDOW}s',
                 'time': datetime.now().strftime('%H:%M:%S'),
                 'severity': 'HIGH',
                 'source': ip_address
             }
             self.log_attack(alert)
-            self.block_ip(ip_address)
-            return True
-        return False
+            self.block_ip(ip_address, wait=False)
+            self.failed_logins.reset(ip_address)
+            return failures, True
+        return failures, False
+    
+    def detect_brute_force(self, ip_address):
+        """Detect brute force attacks"""
+        return self.record_failed_login(ip_address)
     
     def detect_port_scan(self, ip_address):
         """Detect port scanning activity"""
@@ -88,77 +200,157 @@ class SecurityMonitor:
         self.log_attack(alert)
         return True
     
+    def start_arp_watcher(self):
+        """Start watching the kernel ARP cache for spoofing"""
+        self.arp_watcher.start()
+    
     def detect_arp_spoofing(self):
-        """Detect ARP spoofing using arp command"""
-        try:
-            result = subprocess.run(['arp', '-a'], capture_output=True, text=True)
-            # Check for duplicate MAC addresses (simple detection)
-            mac_addresses = re.findall(r'([0-9A-Fa-f]{2}[:-]){5}([0-9A-Fa-f]{2})', result.stdout)
-            
-            if len(mac_addresses) != len(set(mac_addresses)):
-                alert = {
-                    'type': 'critical',
-                    'category': 'ARP Spoofing',
-                    'message': 'Duplicate MAC addresses detected - Possible ARP poisoning',
-                    'time': datetime.now().strftime('%H:%M:%S'),
-                    'severity': 'CRITICAL',
-                    'source': 'ARP Monitor'
-                }
-                self.log_attack(alert)
-                return True
-        except Exception as e:
-            logger.error(f"Error checking ARP table: {e}")
-        return False
+        """Re-read the ARP table now; True if any MAC answers for several IPs"""
+        self.arp_watcher.scan()
+        return bool(self.arp_watcher.get_stats()['conflicts'])
     
-    def block_ip(self, ip_address):
-        """Block an IP address using UFW"""
-        if ip_address not in self.blocked_ips:
-            try:
-                subprocess.run(['sudo', 'ufw', 'deny', 'from', ip_address], 
-                             capture_output=True, check=True)
-                self.blocked_ips.add(ip_address)
-                logger.info(f"Blocked IP: {ip_address}")
-                
-                if self.socketio:
-                    self.socketio.emit('ip_blocked', {
-                        'ip': ip_address,
-                        'time': datetime.now().isoformat()
-                    })
-                return True
-            except subprocess.CalledProcessError as e:
-                logger.error(f"Failed to block IP {ip_address}: {e}")
-        return False
+    def log_arp_finding(self, finding):
+        """Record an ARP cache change from the watcher in the attack log"""
+        if finding['kind'] == 'mac_changed':
+            message = (f"MAC for {finding['ip']} on {finding['device']} changed from {finding['old_mac']} "
+                       f"to {finding['mac']} - Possible ARP poisoning")
+            source = finding['ip']
+        else:
+            message = f"MAC {finding['mac']} claims {', '.join(finding['ips'])} - Possible ARP poisoning"
+            source = finding['mac']
+        alert = {
+            'type': 'critical',
+            'category': 'ARP Spoofing',
+            'message': message,
+            'time': datetime.now().strftime('%H:%M:%S'),
+            'severity': 'CRITICAL',
+            'source': source
+        }
+        self.log_attack(alert)
+    
+    def block_ip(self, ip_address, wait=True):
+        """Block an IP address through the batched firewall queue"""
+        if wait:
+            return ip_address in self.block_ips([ip_address])
+        if not self.can_block(ip_address) or ip_address in self.blocked_ips:
+            return False
+        self.firewall.submit('block', [ip_address])
+        return True
+    
+    def can_block(self, ip_address):
+        """Valid addresses outside the never-block list (loopback, ESP32 nodes, FIREWALL_NEVER_BLOCK)"""
+        if not is_valid_ip(ip_address):
+            return False
+        if is_protected_ip(ip_address, self.never_block):
+            logger.warning(f"Refusing to block protected address {ip_address}")
+            return False
+        return True
     
     def unblock_ip(self, ip_address):
         """Unblock an IP address"""
-        if ip_address in self.blocked_ips:
-            try:
-                subprocess.run(['sudo', 'ufw', 'delete', 'deny', 'from', ip_address], 
-                             capture_output=True, check=True)
-                self.blocked_ips.remove(ip_address)
-                logger.info(f"Unblocked IP: {ip_address}")
-                return True
-            except subprocess.CalledProcessError as e:
-                logger.error(f"Failed to unblock IP {ip_address}: {e}")
-        return False
+        return ip_address in self.unblock_ips([ip_address])
+    
+    def block_ips(self, ip_addresses):
+        """Block many IP addresses in one firewall batch, returning those blocked"""
+        ips = [ip for ip in dict.fromkeys(ip_addresses) if ip not in self.blocked_ips and self.can_block(ip)]
+        if not ips:
+            return []
+        batch = self.firewall.submit('block', ips)
+        return self.firewall.wait(batch, ips)
+    
+    def unblock_ips(self, ip_addresses):
+        """Unblock many IP addresses in one firewall batch, returning those unblocked"""
+        ips = [ip for ip in dict.fromkeys(ip_addresses) if ip in self.blocked_ips]
+        if not ips:
+            return []
+        batch = self.firewall.submit('unblock', ips)
+        return self.firewall.wait(batch, ips)
+    
+    def on_firewall_applied(self, action, ips):
+        """Track applied firewall changes and notify the frontend"""
+        blocked = action == 'block'
+        if blocked:
+            self.blocked_ips.update(ips)
+            logger.info(f"Blocked {len(ips)} IP(s)")
+        else:
+            self.blocked_ips.difference_update(ips)
+            logger.info(f"Unblocked {len(ips)} IP(s)")
+        
+        # Recorded and emitted under the publish lock, so no sensor_batch cursor passes these changes first
+        with self.journal.publish_lock:
+            for ip in ips:
+                seq = self.journal.record('blocked_ip', ip, blocked)
+            if blocked and self.socketio:
+                event = {'time': datetime.now().isoformat(), 'seq': seq}
+                if len(ips) == 1:
+                    self.socketio.emit('ip_blocked', {'ip': ips[0], **event}, to=EVENT_ROOMS['security'])
+                    SOCKET_EMITS.labels('ip_blocked').inc()
+                else:
+                    self.socketio.emit('ips_blocked', {'ips': ips, **event}, to=EVENT_ROOMS['security'])
+                    SOCKET_EMITS.labels('ips_blocked').inc()
+    
+    def get_firewall_stats(self):
+        """Get firewall batching statistics"""
+        stats = self.firewall.get_stats()
+        stats['blocked'] = len(self.blocked_ips)
+        return stats
     
     def log_attack(self, alert):
         """Log attack and emit to frontend"""
-        self.attack_log.append(alert)
-        
-        # Keep only last 100 attacks
-        if len(self.attack_log) > 100:
-            self.attack_log = self.attack_log[-100:]
+        if self.forward_attack is not None:
+            try:
+                return self.forward_attack(alert)
+            except OSError as e:
+                logger.error(f"Cannot forward attack to the ingest process ({e}), logging it here")
+        try:
+            alert['id'] = self.attack_store.add(alert)
+        except Exception as e:
+            logger.error(f"Failed to persist attack: {e}")
+        # Recorded and emitted under the publish lock, so no sensor_batch cursor passes the attack first
+        with self.journal.publish_lock:
+            alert['seq'] = self.journal.record('attack', alert.get('id', id(alert)), dict(alert))
+            # Emit to frontend
+            if self.socketio:
+                self.socketio.emit('attack_detected', alert, to=EVENT_ROOMS['security'])
+                SOCKET_EMITS.labels('attack_detected').inc()
         
-        # Emit to frontend
-        if self.socketio:
-            self.socketio.emit('attack_detected', alert)
+        # Email serious alerts; bursts are merged into a digest by the outbox
+        if self.email_alerts and self.email_alerts.enabled and alert.get('severity') in ('CRITICAL', 'HIGH'):
+            self.email_alerts.send_attack_alert(alert)
         
         logger.warning(f"Attack detected: {alert['category']} - {alert['message']}")
     
-    def get_attack_log(self):
-        """Return attack log"""
-        return self.attack_log
+    def collect_metrics(self):
+        """Scrape-time metric families for the metrics registry"""
+        firewall = self.firewall.get_stats()
+        inspection = self.get_inspection_stats()
+        arp = self.arp_watcher.get_stats()
+        return [
+            ('smartcam_attacks_total', 'counter', 'Attacks logged by category',
+             [({'category': category}, count) for category, count in self.get_attack_stats().items()]),
+            ('smartcam_blocked_ips', 'gauge', 'IP addresses currently blocked', [({}, len(self.blocked_ips))]),
+            ('smartcam_firewall_pending', 'gauge', 'Firewall operations waiting for the next batch',
+             [({}, firewall['pending'])]),
+            ('smartcam_firewall_applied_total', 'counter', 'Firewall operations applied',
+             [({'backend': firewall['backend']}, firewall['applied'])]),
+            ('smartcam_packet_rate', 'gauge', 'Received packets per second by window',
+             [({'window': window}, rate) for window, rate in self.get_packet_rates().items()]),
+            ('smartcam_payload_scans_total', 'counter', 'Payloads scanned for injection signatures',
+             [({}, inspection['scans'])]),
+            ('smartcam_payload_matches_total', 'counter', 'Payloads matching an injection signature',
+             [({}, inspection['matches'])]),
+            ('smartcam_arp_entries', 'gauge', 'Resolved entries in the watched ARP table', [({}, arp['entries'])]),
+            ('smartcam_arp_findings_total', 'counter', 'ARP cache changes flagged by kind',
+             [({'kind': kind}, count) for kind, count in arp['findings'].items()])
+        ]
+    
+    def get_attack_log(self, limit=100, before=None, category=None, source=None, since=None):
+        """Return attack log, newest first, paginated by id cursor"""
+        return self.attack_store.query(limit, before, category, source, since)
+    
+    def get_attack_version(self):
+        """Version of the attack log shared by every backend process, for response caching"""
+        return self.attack_store.latest_id()
     
     def get_attack_stats(self):
         """Get attack statistics"""
@@ -171,10 +363,9 @@ class SecurityMonitor:
             'mitm': 0
         }
         
-        for attack in self.attack_log:
-            category = attack['category'].lower().replace(' ', '_')
-            if category in stats:
-                stats[category] += 1
+        for category, count in self.attack_store.get_counts().items():
+            category = CATEGORY_ALIASES.get(category, category)
+            stats[category] = stats.get(category, 0) + count
         
         return stats
     
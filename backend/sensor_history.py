@@ -0,0 +1,153 @@
+import logging
+import threading
+import time
+from array import array
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SensorSeries:
+    """Fixed-size ring of pre-aggregated min/max/sum/count buckets for one sensor"""
+
+    def __init__(self, capacity, resolution):
+        self.capacity = capacity
+        self.resolution = resolution
+        # One slot per bucket; the slot's bucket id tells whether it is still current
+        self.bucket_ids = array('I', [0]) * capacity
+        self.mins = array('f', [0.0]) * capacity
+        self.maxs = array('f', [0.0]) * capacity
+        self.sums = array('f', [0.0]) * capacity
+        self.counts = array('I', [0]) * capacity
+
+    def add(self, value, timestamp):
+        """Fold a reading into the bucket covering timestamp"""
+        bucket = int(timestamp // self.resolution)
+        slot = bucket % self.capacity
+
+        if self.bucket_ids[slot] != bucket or self.counts[slot] == 0:
+            self.bucket_ids[slot] = bucket
+            self.mins[slot] = value
+            self.maxs[slot] = value
+            self.sums[slot] = value
+            self.counts[slot] = 1
+            return
+
+        if value < self.mins[slot]:
+            self.mins[slot] = value
+        if value > self.maxs[slot]:
+            self.maxs[slot] = value
+        self.sums[slot] += value
+        self.counts[slot] += 1
+
+    def query(self, start, end, resolution, now):
+        """Aggregate stored buckets into buckets of `resolution` seconds"""
+        # Never look further back than the ring holds, or past the current bucket
+        newest = int(now // self.resolution)
+        first = max(int(start // self.resolution), newest - self.capacity + 1)
+        last = min(int(end // self.resolution), newest)
+        step = max(1, int(resolution // self.resolution))
+
+        results = []
+        current = None
+        for bucket in range(first, last + 1):
+            slot = bucket % self.capacity
+            if self.bucket_ids[slot] != bucket or self.counts[slot] == 0:
+                continue
+
+            group = bucket // step
+            if current is None or current['group'] != group:
+                if current is not None:
+                    results.append(self._finish(current, step))
+                current = {
+                    'group': group,
+                    'min': self.mins[slot],
+                    'max': self.maxs[slot],
+                    'sum': self.sums[slot],
+                    'count': self.counts[slot]
+                }
+            else:
+                current['min'] = min(current['min'], self.mins[slot])
+                current['max'] = max(current['max'], self.maxs[slot])
+                current['sum'] += self.sums[slot]
+                current['count'] += self.counts[slot]
+
+        if current is not None:
+            results.append(self._finish(current, step))
+        return results
+
+    def _finish(self, current, step):
+        return {
+            'time': current['group'] * step * self.resolution,
+            'min': round(current['min'], 3),
+            'max': round(current['max'], 3),
+            'avg': round(current['sum'] / current['count'], 3),
+            'count': current['count']
+        }
+
+    def memory_bytes(self):
+        """Approximate memory held by the ring arrays"""
+        arrays = (self.bucket_ids, self.mins, self.maxs, self.sums, self.counts)
+        return sum(a.itemsize * len(a) for a in arrays)
+
+class SensorHistory:
+    """In-memory downsampled history for every (sector, sensor) pair"""
+
+    def __init__(self, retention=None, resolution=None):
+        self.retention = retention or Config.SENSOR_HISTORY_RETENTION
+        self.resolution = resolution or Config.SENSOR_HISTORY_RESOLUTION
+        self.capacity = max(1, self.retention // self.resolution)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def record(self, sector, sensor, value, timestamp=None):
+        """Record a numeric sensor reading, ignoring non-numeric values"""
+        if isinstance(value, bool):
+            value = float(value)
+        elif isinstance(value, (int, float)):
+            value = float(value)
+        else:
+            return False
+
+        if timestamp is None:
+            timestamp = time.time()
+
+        key = (sector, sensor)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = SensorSeries(self.capacity, self.resolution)
+                self.series[key] = series
+            series.add(value, timestamp)
+        return True
+
+    def query(self, sector=None, sensor=None, start=None, end=None, resolution=None):
+        """Return min/max/avg buckets grouped by sector and sensor"""
+        now = time.time()
+        if end is None:
+            end = now
+        if start is None:
+            start = end - 3600
+        if resolution is None or resolution < self.resolution:
+            resolution = self.resolution
+
+        results = {}
+        with self.lock:
+            for (series_sector, series_sensor), series in self.series.items():
+                if sector is not None and series_sector != sector:
+                    continue
+                if sensor is not None and series_sensor != sensor:
+                    continue
+                results.setdefault(series_sector, {})[series_sensor] = series.query(start, end, resolution, now)
+        return results
+
+    def get_stats(self):
+        """Return storage statistics for the history store"""
+        with self.lock:
+            memory = sum(series.memory_bytes() for series in self.series.values())
+            return {
+                'series': len(self.series),
+                'retention': self.retention,
+                'resolution': self.resolution,
+                'memory_bytes': memory
+            }
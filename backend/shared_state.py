@@ -0,0 +1,208 @@
+import fcntl
+import logging
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from multiprocessing import shared_memory
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# sequence, record count
+HEADER = struct.Struct('<QI4x')
+# Name fields are never truncated: a cut name could collide with another sensor's slot
+SECTOR_BYTES = 48
+SENSOR_BYTES = 128
+# sector, sensor, unit, text value, numeric value, timestamp, active, value kind
+RECORD = struct.Struct(f'<{SECTOR_BYTES}s{SENSOR_BYTES}s16s24sdd?B6x')
+
+KIND_NONE = 0
+KIND_NUMBER = 1
+KIND_BOOL = 2
+KIND_TEXT = 3
+
+def table_size(slots):
+    return HEADER.size + slots * RECORD.size
+
+def encode_value(value):
+    """Split a reading into (kind, number, text) for the fixed-layout record"""
+    if isinstance(value, bool):
+        return KIND_BOOL, float(value), b''
+    if isinstance(value, (int, float)):
+        return KIND_NUMBER, float(value), b''
+    if value is None:
+        return KIND_NONE, 0.0, b''
+    return KIND_TEXT, 0.0, str(value).encode()[:24]
+
+def decode_text(field):
+    # 'replace' because a field may be cut mid-character or read mid-write
+    return field.rstrip(b'\0').decode('utf-8', 'replace')
+
+def decode_value(kind, number, text):
+    if kind == KIND_NUMBER:
+        return int(number) if number.is_integer() else number
+    if kind == KIND_BOOL:
+        return bool(number)
+    if kind == KIND_TEXT:
+        return decode_text(text)
+    return None
+
+def lock_path(name):
+    return os.path.join(tempfile.gettempdir(), f"{name}.lock")
+
+def open_segment(name, create=False, size=0):
+    if create:
+        return shared_memory.SharedMemory(name=name, create=True, size=size)
+    try:
+        # Attaching processes must not unlink the segment when they exit (3.13+)
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+class SharedSensorTable:
+    """Latest sensor readings in a shared memory segment, one fixed-size record per sensor.
+
+    A single ingest process writes; any number of worker processes read.
+    Access goes through flock() on a lock file next to the segment: shared
+    for reads, exclusive for writes. A lock-free seqlock would need memory
+    barriers between the data and sequence accesses, which Python can't
+    issue, and ARM (the Raspberry Pi) reorders those accesses. Taking and
+    releasing the lock are system calls, and the kernel's locking orders
+    memory on every architecture. An uncontended flock pair costs about
+    2 us, and readers only decode the table when the sequence has moved. The header sequence is the sensor state version for response
+    caching.
+    """
+
+    def __init__(self, segment, writable=False, owner=False):
+        self.segment = segment
+        self.buf = segment.buf
+        self.slots = (segment.size - HEADER.size) // RECORD.size
+        self.writable = writable
+        self.owner = owner
+        # In-process lock first: flock locks belong to the open file, which all threads share
+        self.lock = threading.Lock()
+        self.lock_file = open(lock_path(segment.name.lstrip('/')), 'a+b')
+        # Writer side: (sector, sensor) -> slot
+        self.index = {}
+        # Reader side: decoded table cached per sequence
+        self.cached_sequence = None
+        self.cached = {}
+        # Names too long for the record, logged once each (up to a bound)
+        self.rejected = set()
+
+        if writable:
+            with self.locked(fcntl.LOCK_SH):
+                count = HEADER.unpack_from(self.buf, 0)[1]
+                for slot, (sector, sensor, *_) in enumerate(self._records(count)):
+                    self.index[(sector, sensor)] = slot
+
+    @contextmanager
+    def locked(self, operation):
+        with self.lock:
+            fcntl.flock(self.lock_file, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+
+    @classmethod
+    def create(cls, name=None, slots=None):
+        """Create and zero a new segment (launcher process)"""
+        slots = slots or Config.SENSOR_TABLE_SLOTS
+        segment = open_segment(name or Config.SENSOR_TABLE_NAME, create=True, size=table_size(slots))
+        segment.buf[:HEADER.size] = bytes(HEADER.size)
+        return cls(segment, owner=True)
+
+    @classmethod
+    def attach(cls, name=None, writable=False):
+        return cls(open_segment(name or Config.SENSOR_TABLE_NAME), writable=writable)
+
+    @property
+    def sequence(self):
+        with self.locked(fcntl.LOCK_SH):
+            return HEADER.unpack_from(self.buf, 0)[0]
+
+    @property
+    def count(self):
+        with self.locked(fcntl.LOCK_SH):
+            return HEADER.unpack_from(self.buf, 0)[1]
+
+    def _records(self, count):
+        for slot in range(count):
+            sector, sensor, unit, text, number, timestamp, active, kind = \
+                RECORD.unpack_from(self.buf, HEADER.size + slot * RECORD.size)
+            yield (decode_text(sector), decode_text(sensor), decode_text(unit),
+                   decode_value(kind, number, text), timestamp, active)
+
+    def update(self, sector, sensor, value, unit='', active=True, timestamp=None):
+        """Write the latest reading for a sensor; returns False when the table is full"""
+        if timestamp is None:
+            timestamp = time.time()
+        kind, number, text = encode_value(value)
+
+        with self.locked(fcntl.LOCK_EX):
+            sequence, count = HEADER.unpack_from(self.buf, 0)
+            slot = self.index.get((sector, sensor))
+            if slot is None:
+                sector_bytes, sensor_bytes = sector.encode(), sensor.encode()
+                if len(sector_bytes) > SECTOR_BYTES or len(sensor_bytes) > SENSOR_BYTES:
+                    if (sector, sensor) not in self.rejected and len(self.rejected) < 1000:
+                        self.rejected.add((sector, sensor))
+                        logger.warning(f"Sensor name {sector}/{sensor} is longer than the shared table allows "
+                                       f"({SECTOR_BYTES}/{SENSOR_BYTES} bytes), not sharing it with workers")
+                    return False
+                if count >= self.slots:
+                    logger.warning(f"Shared sensor table full, dropping {sector}/{sensor}")
+                    return False
+                slot = self.index[(sector, sensor)] = count
+
+            RECORD.pack_into(self.buf, HEADER.size + slot * RECORD.size,
+                             sector.encode(), sensor.encode(), str(unit).encode()[:16],
+                             text, number, timestamp, bool(active), kind)
+            HEADER.pack_into(self.buf, 0, sequence + 1, max(count, slot + 1))
+        return True
+
+    def snapshot(self):
+        """Return the table as the nested {sector: {sensor: reading}} dict MQTTHandler serves"""
+        with self.locked(fcntl.LOCK_SH):
+            sequence, count = HEADER.unpack_from(self.buf, 0)
+            if sequence == self.cached_sequence:
+                return self.cached
+            records = list(self._records(count))
+
+        data = {}
+        for sector, sensor, unit, value, timestamp, active in records:
+            data.setdefault(sector, {})[sensor] = {
+                'value': value,
+                'unit': unit,
+                'active': active,
+                'timestamp': datetime.fromtimestamp(timestamp).isoformat()
+            }
+        self.cached_sequence = sequence
+        self.cached = data
+        return data
+
+    def close(self):
+        self.buf = None
+        self.segment.close()
+        self.lock_file.close()
+        if self.owner:
+            self.segment.unlink()
+            try:
+                os.unlink(self.lock_file.name)
+            except OSError:
+                pass
+
+def open_sensor_table(role=None):
+    """Shared sensor table for a process role; None in standalone mode"""
+    role = role or Config.PROCESS_ROLE
+    if role == 'ingest':
+        return SharedSensorTable.attach(writable=True)
+    if role == 'worker':
+        return SharedSensorTable.attach()
+    return None
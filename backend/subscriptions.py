@@ -0,0 +1,131 @@
+import logging
+import threading
+from itertools import combinations
+from config import Config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Subscribable event types and the Socket.IO events each one carries
+EVENT_TYPES = {
+    'sensors': ('sensor_batch',),
+    'system': ('system_stats', 'system_warning'),
+    'security': ('attack_detected', 'ip_blocked', 'ips_blocked'),
+    'anomalies': ('sensor_anomaly',),
+    'nodes': ('node_online', 'node_offline')
+}
+
+# Room for every event type except sensors, which are routed by sector
+EVENT_ROOMS = {event_type: f"events:{event_type}" for event_type in EVENT_TYPES if event_type != 'sensors'}
+
+def alias_key(name):
+    """'building_a', 'buildingA' and 'Building A' all become 'buildinga'"""
+    return ''.join(ch for ch in name.lower() if ch.isalnum())
+
+class SubscriptionRegistry:
+    """Maps each client's sector and event-type subscription onto Socket.IO rooms.
+
+    Sensor batches go to one room per distinct set of subscribed sectors, so
+    every client receives at most one frame per tick holding only its
+    sectors. Other event types have one room each. A client that never
+    subscribes gets everything, as before.
+    """
+
+    def __init__(self, local=None):
+        self.sectors = tuple(Config.MQTT_TOPICS)
+        self.aliases = {alias_key(sector): sector for sector in self.sectors}
+        # ESP32_NODES keys ('buildingA') already match; their display names ('Parking Area') are aliases too
+        for node, info in Config.ESP32_NODES.items():
+            sector = self.aliases.get(alias_key(node))
+            if sector is not None:
+                self.aliases[alias_key(info['name'])] = sector
+        # In the multi-process ingest process the clients live in other processes
+        self.local = Config.PROCESS_ROLE != 'ingest' if local is None else local
+        self.clients = {}
+        self.room_members = {}
+        self.lock = threading.Lock()
+
+    def resolve_sectors(self, names):
+        """Canonical sector names for a list of sector or node names; None means every sector"""
+        if names is None:
+            return frozenset(self.sectors)
+        resolved = set()
+        for name in names:
+            sector = self.aliases.get(alias_key(str(name)))
+            if sector is None:
+                logger.debug(f"Ignoring subscription to unknown sector {name}")
+                continue
+            resolved.add(sector)
+        return frozenset(resolved)
+
+    def resolve_events(self, names):
+        if names is None:
+            return frozenset(EVENT_TYPES)
+        return frozenset(name for name in names if name in EVENT_TYPES)
+
+    def sensor_room(self, sectors):
+        if sectors == frozenset(self.sectors):
+            return 'sensors:*'
+        return 'sensors:' + '+'.join(sorted(sectors))
+
+    def rooms_for(self, sectors, events):
+        rooms = {EVENT_ROOMS[event_type] for event_type in events if event_type in EVENT_ROOMS}
+        if 'sensors' in events and sectors:
+            rooms.add(self.sensor_room(sectors))
+        return rooms
+
+    def subscribe(self, sid, sectors=None, events=None):
+        """Set a client's subscription; returns (rooms to join, rooms to leave, resolved subscription)"""
+        sectors = self.resolve_sectors(sectors)
+        events = self.resolve_events(events)
+        rooms = self.rooms_for(sectors, events)
+        with self.lock:
+            previous = self.clients.get(sid)
+            old_rooms = previous[2] if previous else set()
+            self.clients[sid] = (sectors, events, rooms)
+            for room in rooms - old_rooms:
+                self.room_members[room] = self.room_members.get(room, 0) + 1
+            for room in old_rooms - rooms:
+                self.release(room)
+        return rooms - old_rooms, old_rooms - rooms, {'sectors': sorted(sectors), 'events': sorted(events)}
+
+    def unsubscribe(self, sid):
+        with self.lock:
+            previous = self.clients.pop(sid, None)
+            if previous:
+                for room in previous[2]:
+                    self.release(room)
+
+    def release(self, room):
+        count = self.room_members.get(room, 0) - 1
+        if count > 0:
+            self.room_members[room] = count
+        else:
+            self.room_members.pop(room, None)
+
+    def sensor_rooms(self):
+        """(room, sectors) for every sensor room that should get this tick's batch"""
+        if not self.local:
+            # Membership is unknown here, so cover every possible sector set
+            return [(self.sensor_room(frozenset(combo)), frozenset(combo))
+                    for size in range(1, len(self.sectors) + 1)
+                    for combo in combinations(self.sectors, size)]
+        with self.lock:
+            rooms = [room for room in self.room_members if room.startswith('sensors:')]
+        everything = frozenset(self.sectors)
+        return [(room, everything if room == 'sensors:*' else frozenset(room[8:].split('+'))) for room in rooms]
+
+    def filter_sensor_data(self, sid, data):
+        """Restrict a sensor snapshot to the sectors a client subscribed to"""
+        with self.lock:
+            subscription = self.clients.get(sid)
+        if subscription is None or subscription[0] == frozenset(self.sectors):
+            return data
+        return {sector: sensors for sector, sensors in data.items() if sector in subscription[0]}
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'clients': len(self.clients),
+                'rooms': dict(self.room_members)
+            }
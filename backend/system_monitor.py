@@ -1,18 +1,37 @@
 import psutil
 import logging
+import threading
+import time
 from datetime import datetime
 from config import Config
+from connection_counter import ConnectionCounter
+from metrics import REGISTRY, SOCKET_EMITS
+from subscriptions import EVENT_ROOMS
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+COLLECT_SECONDS = REGISTRY.histogram('smartcam_system_collect_seconds', 'Time to take a fresh system stats sample')
+READ_SECONDS = REGISTRY.histogram('smartcam_system_read_seconds', 'Time to serve system stats from the snapshot')
+WARNING_EMITS = SOCKET_EMITS.labels('system_warning')
+
 class SystemMonitor:
     def __init__(self, socketio=None):
         self.socketio = socketio
+        self.sample_interval = Config.SYSTEM_STATS_INTERVAL
+        # (stats, monotonic sample time); replaced wholesale, never mutated
+        self.snapshot = None
+        self.refresh_lock = threading.Lock()
+        self.sampler_thread = None
+        self.connection_counter = ConnectionCounter()
         
     def get_cpu_usage(self):
-        """Get CPU usage percentage"""
-        return psutil.cpu_percent(interval=1)
+        """Get CPU usage percentage from the latest snapshot"""
+        return self.get_snapshot()[0]['cpu']
+    
+    def sample_cpu_usage(self):
+        """Get CPU usage percentage since the previous sample (non-blocking)"""
+        return psutil.cpu_percent(interval=None)
     
     def get_memory_usage(self):
         """Get memory usage percentage"""
@@ -46,20 +65,42 @@ class SystemMonitor:
     
     def get_network_connections(self):
         """Get active network connections"""
-        connections = psutil.net_connections(kind='inet')
-        return len([conn for conn in connections if conn.status == 'ESTABLISHED'])
+        return self.get_connection_summary()['established']
     
-    def get_all_stats(self):
-        """Get all system statistics"""
+    def get_connection_summary(self):
+        """Get TCP connection counts per state and the busiest remote addresses"""
+        if self.connection_counter.available():
+            return self.connection_counter.count()
+        
+        # Fallback for systems without /proc/net/tcp
+        states = {}
+        remotes = {}
+        for conn in psutil.net_connections(kind='tcp'):
+            states[conn.status] = states.get(conn.status, 0) + 1
+            if conn.raddr:
+                remotes[conn.raddr.ip] = remotes.get(conn.raddr.ip, 0) + 1
+        top = sorted(remotes.items(), key=lambda item: item[1], reverse=True)[:Config.CONNECTION_TOP_N]
+        return {
+            'total': sum(states.values()),
+            'established': states.get('ESTABLISHED', 0),
+            'syn_recv': states.get('SYN_RECV', 0),
+            'states': states,
+            'unique_remotes': len(remotes),
+            'top_remote': [{'ip': ip, 'count': count} for ip, count in top]
+        }
+    
+    def collect_stats(self):
+        """Collect fresh system statistics (slow path, used by the sampler)"""
         stats = {
-            'cpu': self.get_cpu_usage(),
+            'cpu': self.sample_cpu_usage(),
             'memory': self.get_memory_usage(),
             'disk': self.get_disk_usage(),
             'temperature': self.get_temperature(),
             'network': self.get_network_stats(),
-            'connections': self.get_network_connections(),
+            'connection_summary': self.get_connection_summary(),
             'timestamp': datetime.now().isoformat()
         }
+        stats['connections'] = stats['connection_summary']['established']
         
         # Check for warnings
         warnings = []
@@ -73,16 +114,82 @@ class SystemMonitor:
             warnings.append(f"High disk usage: {stats['disk']}%")
         
         stats['warnings'] = warnings
+        return stats
+    
+    def refresh_stats(self):
+        """Take a new sample and publish it as the current snapshot"""
+        with self.refresh_lock:
+            start = time.perf_counter()
+            stats = self.collect_stats()
+            COLLECT_SECONDS.observe(time.perf_counter() - start)
+            self.snapshot = (stats, time.monotonic())
         
         # Emit to frontend
-        if self.socketio and warnings:
+        if self.socketio and stats['warnings']:
             self.socketio.emit('system_warning', {
-                'warnings': warnings,
+                'warnings': stats['warnings'],
                 'stats': stats
-            })
+            }, to=EVENT_ROOMS['system'])
+            WARNING_EMITS.inc()
         
         return stats
     
+    def get_snapshot(self):
+        """Return the latest (stats, sample time) pair, sampling once if none exists yet"""
+        snapshot = self.snapshot
+        if snapshot is None:
+            self.refresh_stats()
+            snapshot = self.snapshot
+        return snapshot
+    
+    def get_all_stats(self):
+        """Get all system statistics from the cached snapshot"""
+        start = time.perf_counter()
+        stats, sampled_at = self.get_snapshot()
+        result = {
+            **stats,
+            'age': round(time.monotonic() - sampled_at, 3)
+        }
+        READ_SECONDS.observe(time.perf_counter() - start)
+        return result
+    
+    def collect_metrics(self):
+        """Scrape-time metric families for the metrics registry"""
+        snapshot = self.snapshot
+        if snapshot is None:
+            return []
+        stats, sampled_at = snapshot
+        return [
+            ('smartcam_system_cpu_percent', 'gauge', 'CPU usage', [({}, stats['cpu'])]),
+            ('smartcam_system_memory_percent', 'gauge', 'Memory usage', [({}, stats['memory'])]),
+            ('smartcam_system_disk_percent', 'gauge', 'Disk usage', [({}, stats['disk'])]),
+            ('smartcam_system_temperature_celsius', 'gauge', 'CPU temperature', [({}, stats['temperature'])]),
+            ('smartcam_system_connections', 'gauge', 'TCP connections by state',
+             [({'state': state}, count) for state, count in stats['connection_summary']['states'].items()]),
+            ('smartcam_system_snapshot_age_seconds', 'gauge', 'Age of the system stats snapshot',
+             [({}, round(time.monotonic() - sampled_at, 3))])
+        ]
+    
+    def run_sampler(self):
+        """Sampler loop refreshing the stats snapshot every interval"""
+        while True:
+            try:
+                self.refresh_stats()
+            except Exception as e:
+                logger.error(f"Error sampling system stats: {e}")
+            time.sleep(self.sample_interval)
+    
+    def start_sampler(self):
+        """Start the background stats sampler thread"""
+        if self.sampler_thread is not None:
+            return
+        # Prime cpu_percent so the first sample covers a real interval
+        self.sample_cpu_usage()
+        time.sleep(0.1)
+        self.sampler_thread = threading.Thread(target=self.run_sampler, daemon=True)
+        self.sampler_thread.start()
+        logger.info(f"System stats sampler started ({self.sample_interval}s interval)")
+    
     def get_process_info(self):
         """Get information about running processes"""
         processes = []
@@ -0,0 +1,122 @@
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class TopicNode:
+    __slots__ = ('children', 'plus', 'plus_name', 'hash', 'hash_name', 'route')
+
+    def __init__(self):
+        self.children = {}
+        self.plus = None       # single-level wildcard child ('+' or '{name}')
+        self.plus_name = None
+        self.hash = None       # multi-level wildcard route ('#' or '{name#}')
+        self.hash_name = None
+        self.route = None
+
+class Route:
+    __slots__ = ('pattern', 'handler', 'defaults')
+
+    def __init__(self, pattern, handler, defaults):
+        self.pattern = pattern
+        self.handler = handler
+        self.defaults = defaults
+
+class TopicRouter:
+    """Trie of MQTT topic patterns mapped to handlers.
+
+    Pattern levels are literals, '+' (any one level), '{name}' (any one level,
+    captured), '#' (any remaining levels) or '{name#}' (remaining levels,
+    captured as a '/'-joined string). When several patterns match, literal
+    levels win over single-level wildcards, which win over multi-level ones.
+    Dispatch walks the trie once per topic level.
+    """
+
+    def __init__(self):
+        self.root = TopicNode()
+        self.routes = []
+
+    def add_route(self, pattern, handler, **defaults):
+        """Register handler(topic, captures, payload) for an MQTT topic pattern"""
+        node = self.root
+        levels = pattern.split('/')
+        for i, level in enumerate(levels):
+            if level == '#' or (level.startswith('{') and level.endswith('#}')):
+                if i != len(levels) - 1:
+                    raise ValueError(f"Multi-level wildcard must be last in {pattern}")
+                if node.hash is not None:
+                    logger.warning(f"Route {pattern} replaces {node.hash.pattern}")
+                node.hash = Route(pattern, handler, defaults)
+                node.hash_name = level[1:-2] if level != '#' else None
+                self.routes.append(node.hash)
+                return node.hash
+
+            if level == '+' or (level.startswith('{') and level.endswith('}')):
+                name = level[1:-1] if level != '+' else None
+                if node.plus is None:
+                    node.plus = TopicNode()
+                    node.plus_name = name
+                elif node.plus_name != name:
+                    raise ValueError(f"Conflicting capture names at level {i} of {pattern}")
+                node = node.plus
+            else:
+                child = node.children.get(level)
+                if child is None:
+                    child = node.children[level] = TopicNode()
+                node = child
+
+        if node.route is not None:
+            logger.warning(f"Route {pattern} replaces {node.route.pattern}")
+        node.route = Route(pattern, handler, defaults)
+        self.routes.append(node.route)
+        return node.route
+
+    def match(self, topic):
+        """Return (route, captures) for the most specific matching pattern, or (None, None)"""
+        levels = topic.split('/')
+        found = self._match(self.root, levels, 0)
+        if found is None:
+            return None, None
+
+        route, captured = found
+        captures = dict(route.defaults) if route.defaults else {}
+        for name, value in captured:
+            captures[name] = value
+        return route, captures
+
+    def _match(self, node, levels, depth):
+        if depth == len(levels):
+            if node.route is not None:
+                return node.route, ()
+            # 'a/#' also matches 'a' itself
+            if node.hash is not None:
+                return node.hash, ((node.hash_name, ''),) if node.hash_name else ()
+            return None
+
+        level = levels[depth]
+        child = node.children.get(level)
+        if child is not None:
+            found = self._match(child, levels, depth + 1)
+            if found is not None:
+                return found
+
+        if node.plus is not None:
+            found = self._match(node.plus, levels, depth + 1)
+            if found is not None:
+                if node.plus_name:
+                    return found[0], ((node.plus_name, level),) + found[1]
+                return found
+
+        if node.hash is not None:
+            if node.hash_name:
+                return node.hash, ((node.hash_name, '/'.join(levels[depth:])),)
+            return node.hash, ()
+        return None
+
+    def dispatch(self, topic, payload):
+        """Route a message to its handler; returns False if no pattern matches"""
+        route, captures = self.match(topic)
+        if route is None:
+            return False
+        route.handler(topic, captures, payload)
+        return True
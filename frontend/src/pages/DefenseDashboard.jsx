@@ -81,9 +81,9 @@ const DefenseDashboard = ({ onNavigate }) => {
     }, 5000);
 
     return () => {
-      socket.off('attack_detected');
-      socket.off('system_stats');
-      socket.off('system_warning');
+      socket.off('attack_detected', handleAttackDetected);
+      socket.off('system_stats', handleSystemStats);
+      socket.off('system_warning', handleSystemWarning);
       clearInterval(interval);
     };
   }, []);
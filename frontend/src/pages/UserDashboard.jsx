@@ -73,22 +73,44 @@ const UserDashboard = ({ onNavigate }) => {
       })
       .catch(error => console.error('Error fetching sensors:', error));
 
-    // Listen for sensor updates
-    socket.on('sensor_update', (data) => {
-      setSectors(prev => ({
-        ...prev,
-        [data.sector]: {
-          ...prev[data.sector],
-          sensors: {
-            ...prev[data.sector].sensors,
-            [data.sensor]: data.data
-          }
-        }
-      }));
-    });
+    // Listen for batched sensor updates (one frame per backend tick)
+    const handleSensorBatch = (batch) => {
+      setSectors(prev => {
+        const next = { ...prev };
+        batch.updates.forEach((data) => {
+          if (!next[data.sector]) return;
+          next[data.sector] = {
+            ...next[data.sector],
+            sensors: {
+              ...next[data.sector].sensors,
+              [data.sensor]: data.data
+            }
+          };
+        });
+        return next;
+      });
+    };
+    socket.on('sensor_batch', handleSensorBatch);
+
+    // After a reconnect: a delta (or full snapshot) of sensors changed while offline
+    const handleSync = (payload) => {
+      setSectors(prev => {
+        const next = { ...prev };
+        Object.entries(payload.sensors || {}).forEach(([sector, sensors]) => {
+          if (!next[sector]) return;
+          next[sector] = {
+            ...next[sector],
+            sensors: { ...next[sector].sensors, ...sensors }
+          };
+        });
+        return next;
+      });
+    };
+    socket.on('sync', handleSync);
 
     return () => {
-      socket.off('sensor_update');
+      socket.off('sensor_batch', handleSensorBatch);
+      socket.off('sync', handleSync);
     };
   }, []);
 
@@ -46,15 +46,53 @@ export const socket = io(SOCKET_URL, {
 >>>>>>> 4513f3dbe49a135911df4895bf01bc2e063e2c0f
 });
 
+// Sector/event-type subscription; the backend forgets it on disconnect, so it is re-sent on connect
+let socketSubscription = null;
+
+// sectors: e.g. ['parking'] and events: any of 'sensors', 'system', 'security', 'anomalies';
+// leave either undefined to receive all of them
+export const subscribeSocket = (sectors, events) => {
+  socketSubscription = { sectors, events };
+  socket.emit('subscribe', socketSubscription);
+};
+
 // Socket connection handlers
 socket.on('connect', () => {
   console.log('Connected to backend:', socket.id);
+  if (socketSubscription) {
+    socket.emit('subscribe', socketSubscription);
+  }
 });
 
 socket.on('disconnect', () => {
   console.log('Disconnected from backend');
 });
 
+// Delta sync cursor: the seq every change up to which has been received. After a reconnect the
+// backend sends only what changed since then (a 'sync' event), or a full snapshot if the cursor
+// is too old. Only sensor_batch frames move it: their seq covers every earlier change, while the
+// seq on an attack or block event may be ahead of sensor updates still waiting for a frame.
+const syncCursor = { epoch: null, seq: 0 };
+const advanceCursor = (seq) => {
+  if (seq > syncCursor.seq) syncCursor.seq = seq;
+};
+
+socket.on('connection_status', (status) => {
+  if (syncCursor.epoch === null) {
+    syncCursor.epoch = status.epoch;
+    syncCursor.seq = status.seq;
+  } else {
+    socket.emit('sync', { since: syncCursor.seq, epoch: syncCursor.epoch });
+  }
+});
+
+socket.on('sync', (payload) => {
+  syncCursor.epoch = payload.epoch;
+  syncCursor.seq = payload.seq;
+});
+
+socket.on('sensor_batch', (batch) => advanceCursor(batch.seq || 0));
+
 socket.on('connect_error', (error) => {
   console.error('Socket connection error:', error);
 });
@@ -63,8 +101,12 @@ socket.on('connect_error', (error) => {
 export const apiService = {
   // Sensor APIs
   getSensors: () => api.get('/sensors'),
+  getSensorHistory: (params) => api.get('/sensors/history', { params }),
   controlSensor: (sector, sensor, action) => 
     api.post('/sensors/control', { sector, sensor, action }),
+  controlSensorsBulk: (commands, qos, timeout) =>
+    api.post('/sensors/control/bulk', { commands, qos, timeout }),
+  getControlLatency: () => api.get('/sensors/control/latency'),
   
   // System APIs
   getSystemStats: () => api.get('/system/stats'),
@@ -74,6 +116,7 @@ export const apiService = {
   getSecurityStats: () => api.get('/security/stats'),
   blockIP: (ip) => api.post('/security/block-ip', { ip }),
   unblockIP: (ip) => api.post('/security/unblock-ip', { ip }),
+  blockIPs: (ips, action = 'block') => api.post('/security/block-ips', { ips, action }),
   
   // Mitigation APIs
   toggleMitigation: (measure, enabled) => 